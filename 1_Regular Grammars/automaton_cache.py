@@ -0,0 +1,182 @@
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from finite_automaton import CompiledDFA, convert_grammar_to_fa
+
+# magic, byte order, state count, symbol count, start, names size
+_HEADER = struct.Struct('<4sc3xqqqq')
+_MAGIC = b'DFA1'
+_BYTE_ORDER = sys.byteorder[0].encode('ascii')
+# Bumped whenever a conversion changes, so old entries stop matching
+VERSION = 1
+
+
+def _pad(size):
+    return -size % 8
+
+
+# File layout, every section starting on an 8-byte boundary:
+# header | table (int32, row-major) | accepting (int8) |
+# name offsets (int64, states then symbols, one more than names) | names (UTF-8)
+def dfa_to_bytes(dfa):
+    names = list(dfa.states) + list(dfa.symbols)
+    if not all(isinstance(name, str) for name in names):
+        raise ValueError('Only automata with string states and symbols can be serialized')
+    encoded = [name.encode('utf-8') for name in names]
+    offsets = [0]
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    table = bytes(memoryview(dfa.table).cast('B'))
+    accepting = bytes(memoryview(dfa.accepting).cast('B'))
+    return b''.join([
+        _HEADER.pack(_MAGIC, _BYTE_ORDER, len(dfa.states), dfa.n_symbols, dfa.start, offsets[-1]),
+        table, b'\0' * _pad(len(table)),
+        accepting, b'\0' * _pad(len(accepting)),
+        struct.pack(f'={len(offsets)}q', *offsets),
+        b''.join(encoded),
+    ])
+
+
+# CompiledDFA over a buffer written by dfa_to_bytes. The table and the
+# accepting flags are memoryviews into the buffer, not copies; only the
+# name tables are decoded.
+def dfa_from_buffer(buffer):
+    view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+        raise ValueError('Truncated automaton file')
+    magic, byte_order, n_states, n_symbols, start, names_size = _HEADER.unpack_from(view)
+    if magic != _MAGIC:
+        raise ValueError('Not a serialized automaton')
+    if byte_order != _BYTE_ORDER:
+        raise ValueError('Automaton was serialized with another byte order')
+    offset = _HEADER.size
+    table_size = 4 * n_states * n_symbols
+    table = view[offset:offset + table_size].cast('i')
+    offset += table_size + _pad(table_size)
+    accepting = view[offset:offset + n_states].cast('b')
+    offset += n_states + _pad(n_states)
+    n_names = n_states + n_symbols
+    offsets = view[offset:offset + 8 * (n_names + 1)].cast('q')
+    offset += 8 * (n_names + 1)
+    if len(table) != n_states * n_symbols or len(offsets) != n_names + 1 or len(view) < offset + names_size:
+        raise ValueError('Truncated automaton file')
+    blob = view[offset:offset + names_size]
+    names = [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(n_names)]
+    return CompiledDFA(names[:n_states], names[n_states:], table, start, accepting)
+
+
+def dump_dfa(dfa, path):
+    # Written to a temporary file and renamed, so readers never see half a file
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(dfa_to_bytes(dfa))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_dfa(path):
+    # Memory-mapped read-only: processes loading the same file share its
+    # pages, and the mapping lives as long as the returned automaton
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError('Empty automaton file')
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    dfa = dfa_from_buffer(mapped)
+    dfa.mapped = mapped
+    return dfa
+
+
+# Hex SHA-256 of the repr of a source already put in canonical form by
+# grammar_source or nfa_source: sets sorted, lists kept in their order
+# (a later production for the same (state, symbol) overwrites an earlier one)
+def content_hash(kind, source):
+    return hashlib.sha256(repr((VERSION, kind, source)).encode('utf-8')).hexdigest()
+
+
+def grammar_source(grammar):
+    productions = sorted(((head, [tuple(body) for body in bodies]) for head, bodies in grammar.P.items()),
+                         key=lambda item: str(item[0]))
+    return sorted(grammar.VN, key=str), sorted(grammar.VT, key=str), productions
+
+
+# Sets iterate in an order that depends on PYTHONHASHSEED, so they are
+# sorted; lists and tuples keep the order they were given in
+def _ordered(items):
+    if isinstance(items, (set, frozenset)):
+        return sorted(items, key=str)
+    return list(items)
+
+
+def nfa_source(Q, Sigma, F, delta, start):
+    transitions = sorted(((key, _ordered(next_states)) for key, next_states in delta.items()), key=str)
+    return _ordered(Q), _ordered(Sigma), sorted(F, key=str), transitions, start
+
+
+# CompiledDFA from the (states, Sigma, F, delta) tuples of the DFA lab,
+# delta being {state: {symbol: next}} or {(state, symbol): [next]}; the
+# start state is the first one unless given
+def dfa_from_tuple(states, Sigma, F, delta, start=None):
+    transitions = {}
+    for key, value in delta.items():
+        if isinstance(key, tuple):
+            if isinstance(value, (list, tuple, set, frozenset)):
+                if len(value) != 1:
+                    raise ValueError(f'{key} has {len(value)} successors, expected a DFA')
+                value = next(iter(value))
+            transitions[key] = value
+        else:
+            for symbol, next_state in value.items():
+                transitions[(key, symbol)] = next_state
+    return CompiledDFA.from_transitions(states, Sigma, transitions, states[0] if start is None else start, F)
+
+
+class AutomatonCache:
+    # Directory of serialized automata named by the content hash of what
+    # they were converted from; a missing, stale or unreadable entry is
+    # rebuilt and written back
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, key + '.dfa')
+
+    def get_or_build(self, key, build):
+        path = self.path(key)
+        try:
+            dfa = load_dfa(path)
+        except (OSError, ValueError):
+            pass
+        else:
+            self.hits += 1
+            return dfa
+        self.misses += 1
+        dfa = build()
+        dump_dfa(dfa, path)
+        return dfa
+
+    # Compiled convert_grammar_to_fa(grammar)
+    def grammar_dfa(self, grammar):
+        key = content_hash('grammar', grammar_source(grammar))
+        return self.get_or_build(key, lambda: convert_grammar_to_fa(grammar).compiled)
+
+    # Compiled DFA of an NFA; `convert` is the subset construction to use
+    # (the DFA lab's ndfa_to_dfa), called only on a miss. The key names the
+    # converter by module and qualified name, so another converter of the
+    # same NFA gets its own entry; pass `tag` to tell apart converters
+    # sharing a name (lambdas) or to drop entries after changing one.
+    def nfa_dfa(self, Q, Sigma, F, delta, convert, start='q0', tag=None):
+        if tag is None:
+            tag = f'{convert.__module__}.{convert.__qualname__}'
+        key = content_hash('nfa', (tag, nfa_source(Q, Sigma, F, delta, start)))
+        return self.get_or_build(key, lambda: dfa_from_tuple(*convert(Q, Sigma, F, delta, start)))
@@ -0,0 +1,160 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from grammar import Grammar
+from earley import EarleyParser
+from automaton_cache import AutomatonCache, content_hash, grammar_source
+from finite_automaton import convert_grammar_to_fa
+
+# Right recursion (quadratic for plain Earley, linear with Leo), a
+# left-recursive expression grammar, and an ambiguous one
+GRAMMARS = {
+    'right': Grammar({'S'}, {'a'}, {'S': [['a', 'S'], ['a']]}),
+    'expr': Grammar({'E', 'T', 'F'}, {'+', '*', '(', ')', 'a'}, {
+        'E': [['E', '+', 'T'], ['T']],
+        'T': [['T', '*', 'F'], ['F']],
+        'F': [['(', 'E', ')'], ['a']],
+    }),
+    'ambiguous': Grammar({'S'}, {'a'}, {'S': [['S', 'S'], ['a']]}),
+}
+STARTS = {'right': 'S', 'expr': 'E', 'ambiguous': 'S'}
+
+
+def random_expr(n, rng):
+    parts = []
+    depth = 0
+    while True:
+        while rng.random() < 0.2:
+            parts.append('(')
+            depth += 1
+        parts.append('a')
+        while depth and rng.random() < 0.3:
+            parts.append(')')
+            depth -= 1
+        if len(parts) + depth >= n:
+            break
+        parts.append(rng.choice('+*'))
+    parts.extend(')' * depth)
+    return ''.join(parts)
+
+
+def make_word(name, n, rng):
+    return random_expr(n, rng) if name == 'expr' else 'a' * n
+
+
+def bench_earley(sizes, ambiguous_sizes, seed):
+    rng = random.Random(seed)
+    print(f"{'grammar':>10} {'symbols':>8} {'leo s':>8} {'no leo s':>9} {'forest s':>9} {'nodes':>8} {'trees':>10}")
+    for name, grammar in GRAMMARS.items():
+        for n in ambiguous_sizes if name == 'ambiguous' else sizes:
+            word = make_word(name, n, rng)
+            times = []
+            for leo in (True, False):
+                parser = EarleyParser(grammar, STARTS[name], leo=leo)
+                t0 = time.perf_counter()
+                assert parser.accepts(word)
+                times.append(time.perf_counter() - t0)
+            parser = EarleyParser(grammar, STARTS[name])
+            t0 = time.perf_counter()
+            forest = parser.parse(word)
+            times.append(time.perf_counter() - t0)
+            trees = forest.count()
+            trees = f'{trees:.3g}' if trees > 10 ** 6 else str(trees)
+            print(f'{name:>10} {len(word):>8} {times[0]:>8.3f} {times[1]:>9.3f} {times[2]:>9.3f} '
+                  f'{len(forest.families):>8} {trees:>10}')
+
+
+# The lab 1 grammar and balanced parentheses, for string generation
+GENERATE_GRAMMARS = {
+    'lab1': (Grammar({'S', 'B', 'D'}, {'a', 'b', 'c'}, {
+        'S': [['a', 'B']],
+        'B': [['a', 'D'], ['b', 'B'], ['c', 'S']],
+        'D': [['a', 'D'], ['b', 'S'], ['c']],
+    }), 'S'),
+    'dyck': (Grammar({'S'}, {'(', ')'}, {'S': [['(', 'S', ')', 'S'], ['']]}), 'S'),
+}
+
+
+def bench_generate(count, lengths, seed):
+    # Strings per second of Grammar.generate (random.choice, recursive)
+    # against the count-table sampler, with the mean length and how many
+    # distinct strings came out. generate only stops expanding symbols
+    # without rules, so on the Dyck grammar it runs out of stack.
+    print(f"{'grammar':>8} {'generator':>12} {'length':>7} {'strings/s':>11} {'mean len':>9} {'distinct':>9}")
+    for name, (grammar, start) in GENERATE_GRAMMARS.items():
+        random.seed(seed)
+        t0 = time.perf_counter()
+        try:
+            strings = [grammar.generate(start) for _ in range(count)]
+        except RecursionError:
+            print(f"{name:>8} {'generate':>12} {'-':>7} {'recursion':>11}")
+        else:
+            elapsed = time.perf_counter() - t0
+            print(f"{name:>8} {'generate':>12} {'-':>7} {count / elapsed:>11.0f} "
+                  f'{sum(map(len, strings)) / count:>9.1f} {len(set(strings)):>9}')
+        for length in lengths:
+            t0 = time.perf_counter()
+            strings = list(grammar.generate_uniform(start, length, count, seed))
+            elapsed = time.perf_counter() - t0
+            print(f"{name:>8} {'uniform':>12} {length:>7} {count / elapsed:>11.0f} "
+                  f'{sum(map(len, strings)) / count:>9.1f} {len(set(strings)):>9}')
+
+
+def random_regular_grammar(n_vars, n_symbols=26, seed=0):
+    # Right-linear grammar with one production per (variable, symbol),
+    # a few of them final
+    rng = random.Random(seed)
+    variables = ['S'] + [f'A{i}' for i in range(1, n_vars)]
+    symbols = [chr(ord('a') + i) for i in range(n_symbols)]
+    P = {}
+    for variable in variables:
+        P[variable] = [[symbol] if rng.random() < 0.05 else [symbol, rng.choice(variables)] for symbol in symbols]
+    return Grammar(set(variables), set(symbols), P)
+
+
+def bench_cache(sizes, seed):
+    # Grammar -> compiled DFA from scratch against a hit in the on-disk
+    # cache, split into hashing the grammar and mapping the file. Building
+    # this FA is linear, so hashing costs about as much as converting; the
+    # load itself stays in milliseconds however slow the conversion is.
+    print(f"{'variables':>10} {'convert s':>10} {'hash s':>8} {'load s':>8} {'file KiB':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AutomatonCache(directory)
+        for n in sizes:
+            grammar = random_regular_grammar(n, seed=seed)
+            t0 = time.perf_counter()
+            dfa = convert_grammar_to_fa(grammar).compiled
+            convert = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            key = content_hash('grammar', grammar_source(grammar))
+            hashing = time.perf_counter() - t0
+            cache.get_or_build(key, lambda: dfa)
+            t0 = time.perf_counter()
+            cached = cache.get_or_build(key, None)
+            load = time.perf_counter() - t0
+            assert cached.states == dfa.states and cached.table.tobytes() == dfa.table.tobytes()
+            print(f'{n:>10} {convert:>10.3f} {hashing:>8.3f} {load:>8.3f} {os.path.getsize(cache.path(key)) / 1024:>9.0f}')
+
+
+BENCHMARKS = {
+    'earley': lambda args: bench_earley(args.sizes, args.ambiguous_sizes, args.seed),
+    'generate': lambda args: bench_generate(args.count, args.lengths, args.seed),
+    'cache': lambda args: bench_cache(args.grammar_sizes, args.seed),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Grammar benchmarks')
+    parser.add_argument('benchmarks', nargs='*', choices=[[]] + list(BENCHMARKS), default=[])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 4000])
+    parser.add_argument('--ambiguous-sizes', type=int, nargs='+', default=[50, 100, 200])
+    parser.add_argument('--count', type=int, default=200000)
+    parser.add_argument('--lengths', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--grammar-sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for name in args.benchmarks or BENCHMARKS:
+        print(f'== {name}')
+        BENCHMARKS[name](args)
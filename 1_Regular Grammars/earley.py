@@ -0,0 +1,412 @@
+from collections import defaultdict, deque
+
+EPSILON = 'ε'
+AUGMENTED_START = ("S'",)   # head of the added rule S' -> start
+
+# collections.Counter for Earley items and Leo jumps per chart, or None
+counters = None
+
+
+class EarleyParser:
+    # Earley recognizer/parser over a Grammar's VN, VT and P, for any
+    # context-free grammar. Items are (rule, dot) pairs numbered once up
+    # front; an Earley set holds (item, origin) pairs.
+    #
+    # - The items a nonterminal predicts (through left corners and over
+    #   nullable prefixes) are computed once per nonterminal, so prediction
+    #   adds one precomputed list per set.
+    # - Nullable symbols are stepped over as soon as they are expected
+    #   (Aycock and Horspool), so nothing ever completes into its own set.
+    # - With leo=True, completions that run up a deterministic chain of
+    #   right-recursive items jump straight to the top item (Leo), which
+    #   keeps right recursion linear instead of quadratic.
+    #
+    # parse() builds a shared packed parse forest from the same chart; the
+    # completed items a Leo jump went past are recovered per set, only for
+    # the sets the forest asks about.
+    def __init__(self, grammar, start, leo=True):
+        self.start = start
+        self.leo = leo
+        self.nonterminals = set(grammar.VN) | set(grammar.P)
+        self.rules = []
+        self.rules_of = defaultdict(list)
+        for head, bodies in grammar.P.items():
+            for body in bodies:
+                body = tuple(symbol for symbol in body if symbol not in ('', EPSILON))
+                self.rules_of[head].append(len(self.rules))
+                self.rules.append((head, body))
+        # S' -> start is never waited on, so a Leo chain always stops at
+        # the start symbol instead of skipping its completed item
+        self.start_rule = len(self.rules)
+        self.rules_of[AUGMENTED_START].append(self.start_rule)
+        self.rules.append((AUGMENTED_START, (start,)))
+        self.nonterminals.add(AUGMENTED_START)
+
+        # Item numbering: rule r, dot d is item first_item[r] + d
+        self.first_item = []
+        self.item_rule = []
+        self.item_next = []   # symbol after the dot, None when complete
+        for r, (head, body) in enumerate(self.rules):
+            self.first_item.append(len(self.item_rule))
+            for dot in range(len(body) + 1):
+                self.item_rule.append(r)
+                self.item_next.append(body[dot] if dot < len(body) else None)
+
+        self.nullable = self.find_nullable()
+        self.predictions = {symbol: self.predict(symbol) for symbol in self.nonterminals}
+
+    def find_nullable(self):
+        # Worklist over the rules, each waiting on its remaining symbols
+        nullable = set()
+        pending = [len(body) for _, body in self.rules]
+        occurrences = defaultdict(list)
+        queue = deque()
+        for r, (head, body) in enumerate(self.rules):
+            for symbol in body:
+                occurrences[symbol].append(r)
+            if not body and head not in nullable:
+                nullable.add(head)
+                queue.append(head)
+        while queue:
+            symbol = queue.popleft()
+            for r in occurrences.pop(symbol, ()):
+                pending[r] -= 1
+                head = self.rules[r][0]
+                if pending[r] == 0 and head not in nullable:
+                    nullable.add(head)
+                    queue.append(head)
+        return nullable
+
+    def predict(self, symbol):
+        # Every item an expected `symbol` brings into a set: the rules of
+        # its left corners, with the dot also past each nullable prefix
+        items = []
+        seen = {symbol}
+        queue = deque([symbol])
+        while queue:
+            for r in self.rules_of.get(queue.popleft(), ()):
+                item = self.first_item[r]
+                while True:
+                    items.append(item)
+                    next_symbol = self.item_next[item]
+                    if next_symbol is None:
+                        break
+                    if next_symbol in self.nonterminals and next_symbol not in seen:
+                        seen.add(next_symbol)
+                        queue.append(next_symbol)
+                    if next_symbol not in self.nullable:
+                        break
+                    item += 1
+        return items
+
+    def chart(self, word, leo=None):
+        leo = self.leo if leo is None else leo
+        word = list(word)
+        n = len(word)
+        item_next = self.item_next
+        nonterminals = self.nonterminals
+        nullable = self.nullable
+        chart = EarleyChart(n)
+        sets, seens, waitings = chart.sets, chart.seens, chart.waitings
+
+        def add(i, item, origin):
+            key = (item, origin)
+            if key not in seens[i]:
+                seens[i].add(key)
+                sets[i].append(key)
+
+        for item in self.predictions[AUGMENTED_START]:
+            add(0, item, 0)
+        for i in range(n + 1):
+            items = sets[i]
+            waiting = waitings[i]
+            predicted = set()
+            symbol_in = word[i] if i < n else None
+            j = 0
+            while j < len(items):
+                item, origin = items[j]
+                j += 1
+                next_symbol = item_next[item]
+                if next_symbol is None:
+                    if origin == i:
+                        continue
+                    head = self.rules[self.item_rule[item]][0]
+                    top = self._leo_item(chart, origin, head) if leo else None
+                    if top is not None:
+                        add(i, *top)
+                        chart.leo_jumps[i].append((origin, head))
+                    else:
+                        for waiting_item, waiting_origin in waitings[origin].get(head, ()):
+                            add(i, waiting_item + 1, waiting_origin)
+                elif next_symbol in nonterminals:
+                    waiting[next_symbol].append((item, origin))
+                    if next_symbol not in predicted:
+                        predicted.add(next_symbol)
+                        for predicted_item in self.predictions[next_symbol]:
+                            add(i, predicted_item, i)
+                    if next_symbol in nullable:
+                        add(i, item + 1, origin)
+                elif next_symbol == symbol_in:
+                    add(i + 1, item + 1, origin)
+            if i < n and not sets[i + 1]:
+                # Nothing can read word[i]: the rest stays empty
+                break
+        if counters is not None:
+            counters['charts'] += 1
+            counters['earley_items'] += sum(map(len, sets))
+            counters['leo_jumps'] += sum(map(len, chart.leo_jumps))
+        return chart
+
+    def _leo_item(self, chart, j, symbol):
+        # Topmost item of the deterministic reduction path above `symbol`
+        # completing at set j, or None. Walks the chain iteratively and
+        # memoizes every step of it; a chain that runs into itself (unit
+        # cycles through nullable symbols) gets no shortcut.
+        memos, waitings = chart.leo_memos, chart.waitings
+        path = []
+        on_path = set()
+        result = None
+        while True:
+            memo = memos[j]
+            if symbol in memo:
+                result = memo[symbol]
+                break
+            if (j, symbol) in on_path:
+                for j, symbol, _ in path:
+                    memos[j][symbol] = None
+                return None
+            waiting = waitings[j].get(symbol, ())
+            if len(waiting) != 1 or self.item_next[waiting[0][0] + 1] is not None:
+                break
+            item, origin = waiting[0]
+            path.append((j, symbol, (item + 1, origin)))
+            on_path.add((j, symbol))
+            j, symbol = origin, self.rules[self.item_rule[item]][0]
+        for j, symbol, own in reversed(path):
+            if result is None:
+                result = own
+            memos[j][symbol] = result
+        return result
+
+    def completed(self, chart, j):
+        # Completed (item, origin) pairs of set j, including the ones a Leo
+        # jump went past, recovered by walking each chain again
+        items = [key for key in chart.seens[j] if self.item_next[key[0]] is None]
+        for origin, symbol in chart.leo_jumps[j]:
+            top = chart.leo_memos[origin][symbol]
+            while True:
+                item, next_origin = chart.waitings[origin][symbol][0]
+                own = (item + 1, next_origin)
+                if own == top:
+                    break
+                items.append(own)
+                origin, symbol = next_origin, self.rules[self.item_rule[item]][0]
+        return items
+
+    def accepts(self, word):
+        word = list(word)
+        return self.accepts_chart(self.chart(word), len(word))
+
+    def parse(self, word):
+        # Shared packed parse forest of the word, None when it is rejected
+        word = list(word)
+        chart = self.chart(word)
+        if not self.accepts_chart(chart, len(word)):
+            return None
+        return ParseForest(self, word, chart)
+
+    # Whether set n holds the completed S' -> start begun at 0
+    def accepts_chart(self, chart, n):
+        return (self.first_item[self.start_rule] + 1, 0) in chart.seens[n]
+
+
+class EarleyChart:
+    # Earley sets as lists of (item, origin) with a set for lookups, the
+    # items of each set waiting on each nonterminal, the memoized Leo items
+    # and the completions where a Leo jump was taken
+    def __init__(self, n):
+        self.sets = [[] for _ in range(n + 1)]
+        self.seens = [set() for _ in range(n + 1)]
+        self.waitings = [defaultdict(list) for _ in range(n + 1)]
+        self.leo_memos = [{} for _ in range(n + 1)]
+        self.leo_jumps = [[] for _ in range(n + 1)]
+
+
+class ParseForest:
+    # Nodes are (symbol, i, j) for a symbol deriving word[i:j], and
+    # (rule, dot, i, j) for the first `dot` symbols of a rule deriving
+    # word[i:j]. families[node] lists its alternatives (packed nodes) as
+    # (rule, left, right): left is the node of the preceding symbols (None
+    # at the first symbol), right the node of the last one (None for ε).
+    # Equal sub-derivations are built once and shared.
+    def __init__(self, parser, word, chart):
+        self.parser = parser
+        self.word = word
+        self.chart = chart
+        self.root = (parser.start, 0, len(word))
+        self.families = {}
+        self._completed = {}
+        # Sets holding each incomplete (item, origin)
+        self._positions = defaultdict(list)
+        for m, items in enumerate(chart.sets):
+            for key in items:
+                if parser.item_next[key[0]] is not None:
+                    self._positions[key].append(m)
+
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node in self.families:
+                continue
+            families = self.families[node] = []
+            if len(node) == 3:
+                symbol, i, j = node
+                if symbol not in parser.nonterminals:
+                    continue
+                completed = self._completed_in(j)
+                for r in parser.rules_of[symbol]:
+                    body = parser.rules[r][1]
+                    if (parser.first_item[r] + len(body), i) not in completed:
+                        continue
+                    if not body:
+                        families.append((r, None, None))
+                    else:
+                        families.extend(self._splits(r, len(body), i, j))
+            else:
+                families.extend(self._splits(*node))
+            for _, left, right in families:
+                for child in (left, right):
+                    if child is not None and child not in self.families:
+                        stack.append(child)
+
+    def _completed_in(self, j):
+        if j not in self._completed:
+            self._completed[j] = set(self.parser.completed(self.chart, j))
+        return self._completed[j]
+
+    def _splits(self, r, dot, i, j):
+        # Ways the first `dot` symbols of rule r derive word[i:j]: the
+        # prefix up to m, where the item before `symbol` sits, then
+        # `symbol` over word[m:j]
+        parser = self.parser
+        symbol = parser.rules[r][1][dot - 1]
+        previous = (parser.first_item[r] + dot - 1, i)
+        if symbol in parser.nonterminals:
+            completed = self._completed_in(j)
+            first_items = [parser.first_item[s] + len(parser.rules[s][1]) for s in parser.rules_of[symbol]]
+            middles = [m for m in self._positions.get(previous, ()) if m <= j and
+                       any((item, m) in completed for item in first_items)]
+        elif j > i and self.word[j - 1] == symbol and j - 1 in self._positions.get(previous, ()):
+            middles = [j - 1]
+        else:
+            middles = []
+        for m in middles:
+            yield r, (r, dot - 1, i, m) if dot > 1 else None, (symbol, m, j)
+
+    def is_ambiguous(self):
+        return any(len(families) > 1 for families in self.families.values())
+
+    def count(self):
+        # Number of parse trees, float('inf') when the forest has a cycle
+        counts = {}
+        stack = [(self.root, False)]
+        active = set()
+        while stack:
+            node, visited = stack.pop()
+            if node in counts:
+                continue
+            families = self.families.get(node, [])
+            if not families and len(node) == 3 and node[0] not in self.parser.nonterminals:
+                counts[node] = 1
+                continue
+            if not visited:
+                if node in active:
+                    return float('inf')
+                active.add(node)
+                stack.append((node, True))
+                for _, left, right in families:
+                    for child in (left, right):
+                        if child is not None and child not in counts:
+                            if child in active:
+                                return float('inf')
+                            stack.append((child, False))
+                continue
+            active.discard(node)
+            total = 0
+            for _, left, right in families:
+                total += (counts[left] if left else 1) * (counts[right] if right else 1)
+            counts[node] = total
+        return counts[self.root]
+
+    def _witnesses(self):
+        # For every node, an alternative whose children all have finite
+        # trees, found bottom-up like productive symbols: children ground
+        # before parents, so following witnesses never loops
+        witness = {}
+        waiting = defaultdict(list)
+        pending = {}
+        queue = deque()
+        for node, families in self.families.items():
+            if not families and len(node) == 3 and node[0] not in self.parser.nonterminals:
+                witness[node] = None
+                queue.append(node)
+                continue
+            for index, (_, left, right) in enumerate(families):
+                children = [child for child in (left, right) if child is not None]
+                pending[node, index] = len(children)
+                for child in children:
+                    waiting[child].append((node, index))
+                if not children and node not in witness:
+                    witness[node] = families[index]
+                    queue.append(node)
+        while queue:
+            child = queue.popleft()
+            for node, index in waiting.pop(child, ()):
+                pending[node, index] -= 1
+                if pending[node, index] == 0 and node not in witness:
+                    witness[node] = self.families[node][index]
+                    queue.append(node)
+        return witness
+
+    def tree(self):
+        # One parse tree as nested tuples (symbol, child, ...), terminals
+        # as plain strings
+        nonterminals = self.parser.nonterminals
+        witness = self._witnesses()
+        root = []
+        stack = [(self.root, root)]
+        while stack:
+            node, parent = stack.pop()
+            symbol = node[0]
+            if symbol not in nonterminals:
+                parent.append(symbol)
+                continue
+            tree_node = [symbol]
+            parent.append(tree_node)
+            # Collect the symbol nodes of the witness, right to left
+            _, left, right = witness[node]
+            while right is not None:
+                stack.append((right, tree_node))
+                if left is None:
+                    break
+                _, left, right = witness[left]
+        return _freeze(root[0])
+
+
+def _freeze(node):
+    # Nested lists -> nested tuples, without recursion
+    stack = [(node, False)]
+    results = []
+    while stack:
+        current, visited = stack.pop()
+        if not isinstance(current, list):
+            results.append(current)
+        elif not visited:
+            stack.append((current, True))
+            stack.extend((child, False) for child in reversed(current))
+        else:
+            n = len(current)
+            items = results[-n:]
+            del results[-n:]
+            results.append(tuple(items))
+    return results.pop()
@@ -1,3 +1,134 @@
+from array import array
+
+# Sentinel id for the implicit dead (trap) state of a compiled automaton
+DEAD = -1
+
+# Instrumentation: a collections.Counter here makes the accept methods
+# count calls and symbols read; None (the default) skips it
+counters = None
+
+
+class CompiledDFA:
+    # Table-driven form of a DFA: states and symbols are interned to dense
+    # integer ids and transitions live in one flat row-major table, so
+    # table[state * n_symbols + symbol] is the next state (or DEAD)
+    def __init__(self, states, symbols, table, start, accepting):
+        self.states = states                # id -> state name
+        self.symbols = symbols              # id -> symbol
+        self.state_ids = {state: i for i, state in enumerate(states)}
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+        self.n_symbols = len(symbols)
+        self.table = table
+        self.start = start
+        self.accepting = accepting          # accepting[state_id] -> 0/1
+        self._np_tables = None
+
+    @classmethod
+    def from_transitions(cls, states, alphabet, transition_function, start_state, accept_states):
+        # Intern every state and symbol, including ones that only appear
+        # in the transition function
+        state_list = sorted(set(states) | {start_state} | set(accept_states)
+                            | {s for s, _ in transition_function} | set(transition_function.values()), key=str)
+        symbol_list = sorted(set(alphabet) | {a for _, a in transition_function}, key=str)
+        state_ids = {state: i for i, state in enumerate(state_list)}
+        symbol_ids = {symbol: i for i, symbol in enumerate(symbol_list)}
+
+        n_symbols = len(symbol_list)
+        table = array('i', [DEAD]) * (len(state_list) * n_symbols)
+        for (state, symbol), next_state in transition_function.items():
+            table[state_ids[state] * n_symbols + symbol_ids[symbol]] = state_ids[next_state]
+
+        accepting = array('b', [0]) * len(state_list)
+        for state in accept_states:
+            accepting[state_ids[state]] = 1
+
+        return cls(state_list, symbol_list, table, state_ids[start_state], accepting)
+
+    def step(self, state, symbol):
+        symbol_id = self.symbol_ids.get(symbol)
+        if state == DEAD or symbol_id is None:
+            return DEAD
+        return self.table[state * self.n_symbols + symbol_id]
+
+    def run(self, input_string, state=None):
+        # Walk the table from `state` (the start state by default) and
+        # return the state reached, or DEAD as soon as the input is rejected
+        table = self.table
+        symbol_ids = self.symbol_ids
+        n_symbols = self.n_symbols
+        if state is None:
+            state = self.start
+        for symbol in input_string:
+            symbol_id = symbol_ids.get(symbol)
+            if symbol_id is None or state == DEAD:
+                return DEAD
+            state = table[state * n_symbols + symbol_id]
+        return state
+
+    def is_accepting(self, state):
+        return state != DEAD and self.accepting[state] == 1
+
+    def accepts(self, input_string):
+        if counters is not None:
+            counters['accepts'] += 1
+            counters['symbols'] += len(input_string)
+        return self.is_accepting(self.run(input_string))
+
+    # NumPy view of the table: DEAD becomes a real absorbing row and an extra
+    # column catches symbols outside the alphabet, so no step needs a branch
+    def numpy_table(self):
+        import numpy as np
+        if self._np_tables is None:
+            n_states = len(self.states)
+            dead = n_states
+            table = np.full((n_states + 1, self.n_symbols + 1), dead, dtype=np.int32)
+            flat = np.frombuffer(self.table, dtype=np.int32).reshape(n_states, self.n_symbols)
+            table[:n_states, :self.n_symbols] = np.where(flat == DEAD, dead, flat)
+            accepting = np.zeros(n_states + 1, dtype=bool)
+            accepting[:n_states] = np.frombuffer(self.accepting, dtype=np.int8) == 1
+            self._np_tables = table, accepting
+        return self._np_tables
+
+    def accepts_many(self, strings):
+        # Step every string through the table in lockstep, one column of
+        # characters per step; strings that already ended are masked out
+        import numpy as np
+        if any(not isinstance(symbol, str) or len(symbol) != 1 for symbol in self.symbols):
+            raise ValueError('accepts_many needs an alphabet of single characters')
+        table, accepting = self.numpy_table()
+
+        strings = np.asarray(strings, dtype=str)
+        if strings.ndim != 1:
+            strings = strings.reshape(-1)
+        if strings.size == 0:
+            return np.zeros(0, dtype=bool)
+        width = strings.dtype.itemsize // 4
+        codes = np.ascontiguousarray(strings).view(np.uint32).reshape(len(strings), width)
+        lengths = np.char.str_len(strings)
+        if counters is not None:
+            counters['accepts'] += len(strings)
+            counters['symbols'] += int(lengths.sum())
+        if not self.n_symbols:
+            # No symbol to look up: only the empty string can be accepted
+            return (lengths == 0) & accepting[self.start]
+
+        # Translate code points to symbol ids with a sorted lookup; anything
+        # not in the alphabet maps to the catch-all column
+        symbol_codes = np.array([ord(symbol) for symbol in self.symbols], dtype=np.uint32)
+        order = np.argsort(symbol_codes)
+        sorted_codes = symbol_codes[order]
+        unknown = self.n_symbols
+
+        state = np.full(len(strings), self.start, dtype=np.int32)
+        for t in range(int(lengths.max())):
+            column = codes[:, t]
+            pos = np.searchsorted(sorted_codes, column)
+            pos[pos == len(sorted_codes)] = 0
+            symbol = np.where(sorted_codes[pos] == column, order[pos], unknown)
+            state = np.where(lengths > t, table[state, symbol], state)
+        return accepting[state]
+
+
 class FiniteAutomaton:
     def __init__(self, states, alphabet, transition_function, start_state, accept_states):
         self.states = states
@@ -5,15 +136,25 @@ class FiniteAutomaton:
         self.transition_function = transition_function
         self.start_state = start_state
         self.accept_states = accept_states
+        self._compiled = None
+
+    # Build (or rebuild, after editing the transition function) the compiled form
+    def compile(self):
+        self._compiled = CompiledDFA.from_transitions(self.states, self.alphabet, self.transition_function,
+                                                      self.start_state, self.accept_states)
+        return self._compiled
+
+    @property
+    def compiled(self):
+        if self._compiled is None:
+            self.compile()
+        return self._compiled
 
     def accepts(self, input_string):
-        current_state = self.start_state
-        for symbol in input_string:
-            if (current_state, symbol) in self.transition_function:
-                current_state = self.transition_function[(current_state, symbol)]
-            else:
-                return False
-        return current_state in self.accept_states
+        return self.compiled.accepts(input_string)
+
+    def accepts_many(self, strings):
+        return self.compiled.accepts_many(strings)
 
 def convert_grammar_to_fa(grammar):
     states = grammar.VN.union({ 'F' })  # F is a new accept state
@@ -1,10 +1,17 @@
 import random
+from bisect import bisect_right
+from collections import defaultdict, deque
+
+# Set to a collections.Counter to count sampled strings, symbols and
+# count-table lengths; left None it costs one check per call
+counters = None
 
 class Grammar:
     def __init__(self, VN, VT, P):
         self.VN = VN
         self.VT = VT
         self.P = P
+        self._samplers = {}
 
     def generate(self, start, depth=5):
         if start not in self.VN or (depth == 0 and start not in self.P):
@@ -13,6 +20,14 @@ class Grammar:
             production = random.choice(self.P.get(start, ['']))
             return ''.join(self.generate(s, depth - 1) for s in production)
 
+    # Uniform random strings of exactly `length` symbols, `count` of them
+    # (endless when None); the count tables are built once per start
+    # symbol and grow with the longest length asked for
+    def generate_uniform(self, start, length, count=None, seed=None):
+        if start not in self._samplers:
+            self._samplers[start] = UniformSampler(self, start)
+        return self._samplers[start].strings(length, count, seed)
+
     def classify(self):
         regular = True
         context_free = True
@@ -34,3 +49,261 @@ class Grammar:
             return "Type 1 (Context-Sensitive)"
         else:
             return "Type 0 (Recursively Enumerable)"
+
+
+class UniformSampler:
+    # counts[X][n] is the number of derivation trees of X whose yield has n
+    # symbols; a terminal t counts 1 at len(t), so '' works as ε. Sampling
+    # picks a rule with probability proportional to its count and then the
+    # length of every body symbol the same way, which draws derivations
+    # uniformly: strings are uniform whenever the grammar is unambiguous.
+    #
+    # suffixes[r, i][n] counts the ways symbols i.. of rule r derive n
+    # symbols. Within one length, X depends on Y when some rule of X has Y
+    # with everything else nullable; the tables are filled in that order,
+    # and a cycle in it (A =>+ A) would mean infinitely many derivations.
+    def __init__(self, grammar, start):
+        self.start = start
+        self.nonterminals = set(grammar.VN) | set(grammar.P)
+        self.rules = []
+        self.rules_of = defaultdict(list)
+        for head, bodies in grammar.P.items():
+            for body in bodies:
+                self.rules_of[head].append(len(self.rules))
+                self.rules.append((head, tuple(body)))
+        self.terminals = {symbol for _, body in self.rules for symbol in body} - self.nonterminals
+        self.order = self._fill_order()
+        self.counts = {symbol: [] for symbol in self.nonterminals | self.terminals}
+        self.suffixes = {(r, i): [] for r, (_, body) in enumerate(self.rules) for i in range(len(body) + 1)}
+        self._expansions = {}
+        self._splits = {}
+
+    def find_nullable(self):
+        nullable = set()
+        pending = []
+        occurrences = defaultdict(list)
+        queue = deque()
+        for r, (head, body) in enumerate(self.rules):
+            pending.append(sum(1 for symbol in body if symbol not in self.terminals or symbol != ''))
+            for symbol in body:
+                if symbol in self.nonterminals:
+                    occurrences[symbol].append(r)
+            if pending[r] == 0 and head not in nullable:
+                nullable.add(head)
+                queue.append(head)
+        while queue:
+            symbol = queue.popleft()
+            for r in occurrences.pop(symbol, ()):
+                pending[r] -= 1
+                head = self.rules[r][0]
+                if pending[r] == 0 and head not in nullable:
+                    nullable.add(head)
+                    queue.append(head)
+        return nullable
+
+    # Nonterminals with the ones each depends on at the same length first
+    def _fill_order(self):
+        nullable = self.find_nullable() | {''}
+        depends = defaultdict(set)
+        for head, body in self.rules:
+            for i, symbol in enumerate(body):
+                if symbol in self.nonterminals and all(other in nullable for other in body[:i] + body[i + 1:]):
+                    depends[head].add(symbol)
+        order = []
+        state = {}   # 1: on the DFS path, 2: placed
+        for root in sorted(self.nonterminals):
+            if root in state:
+                continue
+            state[root] = 1
+            stack = [(root, iter(sorted(depends[root])))]
+            while stack:
+                symbol, children = stack[-1]
+                for child in children:
+                    if state.get(child) == 1:
+                        raise ValueError(f'{child} derives itself, its strings have infinitely many derivations')
+                    if child not in state:
+                        state[child] = 1
+                        stack.append((child, iter(sorted(depends[child]))))
+                        break
+                else:
+                    stack.pop()
+                    state[symbol] = 2
+                    order.append(symbol)
+        return order
+
+    def extend(self, length):
+        counts = self.counts
+        if counters is not None:
+            counters['table_lengths'] += max(0, length + 1 - len(counts[self.start]))
+        for n in range(len(counts[self.start]), length + 1):
+            for terminal in self.terminals:
+                counts[terminal].append(1 if n == len(terminal) else 0)
+            stale = []
+            for head in self.order:
+                total = 0
+                for r in self.rules_of[head]:
+                    if not self._fill_suffixes(r, n):
+                        stale.append(r)
+                    total += self.suffixes[r, 0][n]
+                counts[head].append(total)
+            # A body symbol after a non-nullable one may come later in the
+            # order; its stand-in 0 never reached a total, but the suffix
+            # tables are also used for sampling, so fill them in properly
+            for r in stale:
+                body = self.rules[r][1]
+                for i in range(len(body) + 1):
+                    self.suffixes[r, i].pop()
+                self._fill_suffixes(r, n)
+
+    # suffixes[r, i][n] for every i, False when a count at length n was
+    # not there yet and 0 was used in its place
+    def _fill_suffixes(self, r, n):
+        body = self.rules[r][1]
+        suffixes = self.suffixes
+        complete = True
+        suffixes[r, len(body)].append(1 if n == 0 else 0)
+        for i in range(len(body) - 1, -1, -1):
+            symbol = body[i]
+            rest = suffixes[r, i + 1]
+            if symbol in self.terminals:
+                size = len(symbol)
+                ways = rest[n - size] if n >= size else 0
+            else:
+                column = self.counts[symbol]
+                ways = sum(column[m] * rest[n - m] for m in range(n) if column[m])
+                if rest[0]:
+                    if len(column) > n:
+                        ways += column[n] * rest[0]
+                    else:
+                        complete = False
+            suffixes[r, i].append(ways)
+        return complete
+
+    def count(self, length, symbol=None):
+        symbol = self.start if symbol is None else symbol
+        self.extend(length)
+        return self.counts[symbol][length]
+
+    # Rule choices of head at length n: cumulative counts and, per rule,
+    # either its expansion (terminals before the first nonterminal, then
+    # the rest reversed for the stack) when the lengths of its symbols are
+    # forced, or the rule number when they depend on the rank
+    def _expansion(self, head, n):
+        cumulative, options = [], []
+        total = 0
+        for r in self.rules_of[head]:
+            ways = self.suffixes[r, 0][n]
+            if not ways:
+                continue
+            total += ways
+            cumulative.append(total)
+            body = self.rules[r][1]
+            if sum(1 for symbol in body if symbol not in self.terminals) > 1:
+                options.append(r)
+                continue
+            rest = n - sum(len(symbol) for symbol in body if symbol in self.terminals)
+            options.append(self._parts(body, [len(symbol) if symbol in self.terminals else rest for symbol in body]))
+        self._expansions[head, n] = entry = (cumulative, options)
+        return entry
+
+    # (prefix, parts): a nonterminal part is (symbol, length, count)
+    def _parts(self, body, sizes):
+        i = 0
+        while i < len(body) and body[i] in self.terminals:
+            i += 1
+        parts = [symbol if symbol in self.terminals else (symbol, size, self.counts[symbol][size])
+                 for symbol, size in zip(body[i:], sizes[i:])]
+        return ''.join(body[:i]), parts[::-1]
+
+    # Cumulative counts over the lengths symbol i of rule r can take when
+    # symbols i.. derive n symbols
+    def _split_choices(self, r, i, n):
+        key = (r, i, n)
+        if key not in self._splits:
+            column = self.counts[self.rules[r][1][i]]
+            rest = self.suffixes[r, i + 1]
+            cumulative, sizes = [], []
+            total = 0
+            for m in range(n + 1):
+                ways = column[m] * rest[n - m]
+                if ways:
+                    total += ways
+                    cumulative.append(total)
+                    sizes.append(m)
+            self._splits[key] = (cumulative, sizes)
+        return self._splits[key]
+
+    # Lengths of the symbols of rule r for the rank-th derivation of n
+    # symbols, and the rank left for the derivations with those lengths.
+    # Once a symbol's length is picked, divmod splits the rank into the
+    # symbol's own subtree and the rest of the body; the subtree ranks are
+    # put back together in the order sample() takes them apart.
+    def _unrank_sizes(self, r, n, rank):
+        body = self.rules[r][1]
+        sizes = []
+        subtrees = 0
+        for i, symbol in enumerate(body):
+            if symbol in self.terminals:
+                size = len(symbol)
+            else:
+                if i == len(body) - 1:
+                    size = n
+                else:
+                    cumulative, choices = self._split_choices(r, i, n)
+                    k = bisect_right(cumulative, rank)
+                    if k:
+                        rank -= cumulative[k - 1]
+                    size = choices[k]
+                own, rank = divmod(rank, self.suffixes[r, i + 1][n - size])
+                subtrees = subtrees * self.counts[symbol][size] + own
+            sizes.append(size)
+            n -= size
+        return self._parts(body, sizes), subtrees
+
+    # The derivations of length n are numbered 0 .. count(n) - 1 and one
+    # random rank is decoded top-down: a bisect picks the rule (and the
+    # lengths of its symbols), divmod splits what is left of the rank
+    # among the subtrees
+    def sample(self, length, rng=random):
+        total = self.count(length)
+        if not total:
+            raise ValueError(f'{self.start} derives no string of length {length}')
+        if counters is not None:
+            counters['samples'] += 1
+            counters['sampled_symbols'] += length
+        expansions = self._expansions
+        out = []
+        stack = [(self.start, length, rng.randrange(total))]
+        while stack:
+            item = stack.pop()
+            if item.__class__ is str:
+                out.append(item)
+                continue
+            symbol, n, rank = item
+            cumulative, options = expansions.get((symbol, n)) or self._expansion(symbol, n)
+            if len(options) > 1:
+                k = bisect_right(cumulative, rank)
+                if k:
+                    rank -= cumulative[k - 1]
+                option = options[k]
+            else:
+                option = options[0]
+            if option.__class__ is int:
+                option, rank = self._unrank_sizes(option, n, rank)
+            prefix, parts = option
+            out.append(prefix)
+            for part in parts:
+                if part.__class__ is str:
+                    stack.append(part)
+                else:
+                    rank, sub = divmod(rank, part[2])
+                    stack.append((part[0], part[1], sub))
+        return ''.join(out)
+
+    def strings(self, length, count=None, seed=None):
+        rng = random.Random(seed)
+        self.extend(length)
+        produced = 0
+        while count is None or produced < count:
+            yield self.sample(length, rng)
+            produced += 1
@@ -0,0 +1,91 @@
+import codecs
+import mmap
+
+from finite_automaton import FiniteAutomaton, DEAD
+
+
+def _compiled(automaton):
+    if isinstance(automaton, FiniteAutomaton):
+        return automaton.compiled
+    return automaton
+
+
+class StreamMatcher:
+    # Resumable matcher: feed the input in chunks (str or bytes) and ask for
+    # the verdict at the end. Only the current state is kept between chunks.
+    def __init__(self, automaton, encoding='utf-8'):
+        self.dfa = _compiled(automaton)
+        self.encoding = encoding
+        self.reset()
+
+    def reset(self):
+        self.state = self.dfa.start
+        self._decoder = codecs.getincrementaldecoder(self.encoding)()
+
+    def feed(self, chunk):
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            # multi-byte characters may be split across chunk boundaries
+            chunk = self._decoder.decode(chunk)
+        if self.state != DEAD and chunk:
+            self.state = self.dfa.run(chunk, self.state)
+        return self
+
+    def feed_all(self, chunks):
+        for chunk in chunks:
+            self.feed(chunk)
+        return self
+
+    @property
+    def rejected(self):
+        # True once no continuation of the input can be accepted
+        return self.state == DEAD
+
+    @property
+    def accepted(self):
+        return self.dfa.is_accepting(self.state)
+
+    def finish(self):
+        self.feed(self._decoder.decode(b'', final=True))
+        return self.accepted
+
+
+def match_file(path, automaton, chunk_size=1 << 16, encoding='utf-8'):
+    # Check whether the whole file content is accepted, reading it in chunks
+    matcher = StreamMatcher(automaton, encoding)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            matcher.feed(chunk)
+            if matcher.rejected:
+                return False
+    return matcher.finish()
+
+
+def match_lines(path, automaton, encoding='utf-8'):
+    # Memory-map the file and yield (line_number, accepted) for every line,
+    # line numbers starting at 1. Line endings ('\n' or '\r\n') are not
+    # part of the matched input.
+    dfa = _compiled(automaton)
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files cannot be mapped
+            return
+        with mm:
+            size = len(mm)
+            start = 0
+            line_number = 0
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = size
+                stop = end - 1 if end > start and mm[end - 1] == 13 else end
+                line_number += 1
+                yield line_number, dfa.accepts(mm[start:stop].decode(encoding))
+                start = end + 1
+
+
+def accepted_lines(path, automaton, encoding='utf-8'):
+    # Line numbers of the lines the automaton accepts
+    for line_number, accepted in match_lines(path, automaton, encoding):
+        if accepted:
+            yield line_number
@@ -0,0 +1,352 @@
+import functools
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from collections import Counter
+from grammar import Grammar, UniformSampler
+import finite_automaton
+from finite_automaton import CompiledDFA, FiniteAutomaton, convert_grammar_to_fa, DEAD
+from streaming import StreamMatcher, match_file, match_lines, accepted_lines
+from earley import EarleyParser
+from automaton_cache import AutomatonCache, dfa_from_buffer, dfa_to_bytes, dfa_from_tuple
+
+
+class TestFiniteAutomaton(unittest.TestCase):
+
+    def make_fa(self):
+        transition_function = {
+            ('q0', '0'): 'q0',
+            ('q0', '1'): 'q1',
+            ('q1', '0'): 'q2',
+            ('q1', '1'): 'q0',
+            ('q2', '0'): 'q1',
+            ('q2', '1'): 'q2'
+        }
+        return FiniteAutomaton({'q0', 'q1', 'q2'}, {'0', '1'}, transition_function, 'q0', {'q2'})
+
+    def reference_accepts(self, fa, input_string):
+        """ The original dict-walking acceptance check. """
+        current_state = fa.start_state
+        for symbol in input_string:
+            if (current_state, symbol) not in fa.transition_function:
+                return False
+            current_state = fa.transition_function[(current_state, symbol)]
+        return current_state in fa.accept_states
+
+    def test_compiled_matches_dict_walk(self):
+        fa = self.make_fa()
+        for string in ['', '01', '010', '0101', '1111', '000', '110', '1100', '012', 'x']:
+            self.assertEqual(fa.accepts(string), self.reference_accepts(fa, string), string)
+
+    def test_compiled_lazily(self):
+        fa = self.make_fa()
+        self.assertIsNone(fa._compiled)
+        fa.accepts('01')
+        self.assertIsNotNone(fa._compiled)
+
+    def test_dead_state(self):
+        fa = convert_grammar_to_fa(Grammar({'S', 'B', 'D'}, {'a', 'b', 'c'}, {
+            'S': [['a', 'B']],
+            'B': [['a', 'D'], ['b', 'B'], ['c', 'S']],
+            'D': [['a', 'D'], ['b', 'S'], ['c']]
+        }))
+        self.assertTrue(fa.accepts('aac'))
+        self.assertFalse(fa.accepts('aaca'))
+        self.assertEqual(fa.compiled.run('b'), DEAD)
+
+    def test_accepts_many(self):
+        fa = self.make_fa()
+        strings = ['', '01', '010', '0101', '1111', '000', '110', '1100', '012', '0100000000001']
+        result = fa.accepts_many(strings)
+        self.assertEqual(result.tolist(), [fa.accepts(string) for string in strings])
+        # Empty alphabet: only '' can be accepted, and only from a final start
+        for accept_states in (['q0'], []):
+            dfa = CompiledDFA.from_transitions(['q0'], [], {}, 'q0', accept_states)
+            strings = ['', 'a', '', 'ab']
+            self.assertEqual(dfa.accepts_many(strings).tolist(), [dfa.accepts(string) for string in strings])
+            self.assertEqual(dfa.accepts_many(['']).tolist(), [bool(accept_states)])
+
+    def test_counters(self):
+        fa = self.make_fa()
+        finite_automaton.counters = Counter()
+        try:
+            fa.accepts('0101')
+            fa.accepts_many(['01', '110'])
+            self.assertEqual(finite_automaton.counters, {'accepts': 3, 'symbols': 9})
+        finally:
+            finite_automaton.counters = None
+
+    def test_stream_matcher_chunks(self):
+        fa = self.make_fa()
+        matcher = StreamMatcher(fa)
+        matcher.feed_all(['0', b'10', '1'])
+        self.assertTrue(matcher.finish())
+        matcher.reset()
+        matcher.feed('2')
+        self.assertTrue(matcher.rejected)
+        self.assertFalse(matcher.finish())
+
+    def test_match_file_and_lines(self):
+        fa = self.make_fa()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'input.txt')
+            with open(path, 'wb') as f:
+                f.write(b'01\n010\r\n0101\n\n110')
+            self.assertEqual(list(match_lines(path, fa)),
+                             [(1, False), (2, True), (3, True), (4, False), (5, False)])
+            self.assertEqual(list(accepted_lines(path, fa)), [2, 3])
+            with open(path, 'wb') as f:
+                f.write(b'0101')
+            self.assertTrue(match_file(path, fa, chunk_size=1))
+
+
+class TestEarley(unittest.TestCase):
+
+    def expr_grammar(self):
+        return Grammar({'E', 'T', 'F'}, {'+', '*', '(', ')', 'a'}, {
+            'E': [['E', '+', 'T'], ['T']],
+            'T': [['T', '*', 'F'], ['F']],
+            'F': [['(', 'E', ')'], ['a']],
+        })
+
+    def test_accepts_with_and_without_leo(self):
+        for leo in (True, False):
+            parser = EarleyParser(self.expr_grammar(), 'E', leo=leo)
+            for word in ['a', 'a+a*a', '(a+a)*a', '((a))']:
+                self.assertTrue(parser.accepts(word), word)
+            for word in ['', '+', 'a+', '(a', 'a)', 'aa', 'b']:
+                self.assertFalse(parser.accepts(word), word)
+
+    def test_nullable_symbols(self):
+        grammar = Grammar({'S', 'A', 'B'}, {'a', 'b'}, {
+            'S': [['A', 'B', 'A']],
+            'A': [['a', 'A'], []],
+            'B': [['A'], ['b']],
+        })
+        parser = EarleyParser(grammar, 'S')
+        for word in ['', 'a', 'aaa', 'ab', 'aba', 'ba']:
+            self.assertTrue(parser.accepts(word), word)
+        for word in ['bb', 'abab']:
+            self.assertFalse(parser.accepts(word), word)
+
+    def test_tree(self):
+        forest = EarleyParser(self.expr_grammar(), 'E').parse('a+a*a')
+        self.assertFalse(forest.is_ambiguous())
+        self.assertEqual(forest.count(), 1)
+        self.assertEqual(forest.tree(),
+                         ('E', ('E', ('T', ('F', 'a'))), '+',
+                          ('T', ('T', ('F', 'a')), '*', ('F', 'a'))))
+        self.assertIsNone(EarleyParser(self.expr_grammar(), 'E').parse('a+'))
+
+    def test_right_recursion_with_leo(self):
+        grammar = Grammar({'S'}, {'a'}, {'S': [['a', 'S'], ['a']]})
+        forest = EarleyParser(grammar, 'S').parse('a' * 500)
+        self.assertEqual(forest.count(), 1)
+        tree = forest.tree()
+        depth = 0
+        while len(tree) == 3:
+            tree = tree[2]
+            depth += 1
+        self.assertEqual((depth, tree), (499, ('S', 'a')))
+
+    def test_ambiguous_forest_is_shared(self):
+        # S -> S S | a: Catalan many trees over a forest of O(n^2) nodes
+        grammar = Grammar({'S'}, {'a'}, {'S': [['S', 'S'], ['a']]})
+        forest = EarleyParser(grammar, 'S').parse('a' * 10)
+        self.assertTrue(forest.is_ambiguous())
+        self.assertEqual(forest.count(), 4862)
+        self.assertEqual(len(forest.families), 110)
+
+    def test_cyclic_grammar(self):
+        grammar = Grammar({'S'}, {'a'}, {'S': [['S'], ['a']]})
+        forest = EarleyParser(grammar, 'S').parse('a')
+        self.assertEqual(forest.count(), float('inf'))
+        self.assertEqual(forest.tree(), ('S', 'a'))
+
+
+class TestUniformGeneration(unittest.TestCase):
+
+    def lab_grammar(self):
+        return Grammar({'S', 'B', 'D'}, {'a', 'b', 'c'}, {
+            'S': [['a', 'B']],
+            'B': [['a', 'D'], ['b', 'B'], ['c', 'S']],
+            'D': [['a', 'D'], ['b', 'S'], ['c']],
+        })
+
+    def test_counts_match_enumeration(self):
+        grammar = self.lab_grammar()
+        fa = convert_grammar_to_fa(grammar)
+        sampler = UniformSampler(grammar, 'S')
+        for length in range(8):
+            words = [''.join(w) for w in itertools.product('abc', repeat=length)]
+            self.assertEqual(sampler.count(length), sum(map(fa.accepts, words)), length)
+
+    def test_catalan_counts(self):
+        grammar = Grammar({'S'}, {'(', ')'}, {'S': [['(', 'S', ')', 'S'], ['']]})
+        sampler = UniformSampler(grammar, 'S')
+        self.assertEqual([sampler.count(2 * n) for n in range(8)], [1, 1, 2, 5, 14, 42, 132, 429])
+        self.assertEqual(sampler.count(7), 0)
+
+    def test_samples_cover_every_string_evenly(self):
+        grammar = Grammar({'S'}, {'(', ')'}, {'S': [['(', 'S', ')', 'S'], ['']]})
+        parser = EarleyParser(grammar, 'S')
+        counts = Counter(grammar.generate_uniform('S', 8, 7000, seed=3))
+        self.assertEqual(len(counts), 14)
+        self.assertTrue(all(parser.accepts(word) for word in counts))
+        self.assertLess(max(counts.values()) - min(counts.values()), 150)
+
+    def test_every_rank_is_one_derivation(self):
+        # Two or more nonterminals before the last symbol of a body
+        grammar = Grammar({'S', 'A'}, {'a', 'b', 'c'}, {
+            'S': [[''], ['S', 'S', 'a'], ['b', 'A']],
+            'A': [['a'], ['S', 'A', 'S', 'c']],
+        })
+        rules = {head: [tuple(body) for body in bodies] for head, bodies in grammar.P.items()}
+        shortest = {'S': 0, 'A': 1}
+
+        # Derivation trees of word from symbol, by brute force; the rest of
+        # a body keeps at least its shortest yield, so every call shrinks
+        @functools.lru_cache(maxsize=None)
+        def trees(symbol, word):
+            if symbol not in rules:
+                return 1 if symbol == word else 0
+            return sum(splits(body, word) for body in rules[symbol])
+
+        @functools.lru_cache(maxsize=None)
+        def splits(body, word):
+            if not body:
+                return 1 if word == '' else 0
+            rest = sum(shortest.get(symbol, len(symbol)) for symbol in body[1:])
+            return sum(trees(body[0], word[:k]) * splits(body[1:], word[k:]) for k in range(len(word) - rest + 1))
+
+        class Ranks:
+            def __init__(self):
+                self.next = 0
+
+            def randrange(self, total):
+                self.next += 1
+                return self.next - 1
+
+        sampler = UniformSampler(grammar, 'S')
+        for length in range(7):
+            ranks = Ranks()
+            sampled = Counter(sampler.sample(length, ranks) for _ in range(sampler.count(length)))
+            expected = Counter()
+            for word in map(''.join, itertools.product('abc', repeat=length)):
+                if trees('S', word):
+                    expected[word] = trees('S', word)
+            self.assertEqual(sampled, expected, length)
+
+    def test_seeded_and_bounded(self):
+        grammar = self.lab_grammar()
+        first = list(grammar.generate_uniform('S', 30, 100, seed=7))
+        self.assertEqual(first, list(grammar.generate_uniform('S', 30, 100, seed=7)))
+        self.assertTrue(all(len(word) == 30 for word in first))
+        self.assertEqual(next(grammar.generate_uniform('S', 30, seed=7)), first[0])
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            list(self.lab_grammar().generate_uniform('S', 1, 1))
+        cyclic = Grammar({'S', 'A'}, {'a'}, {'S': [['A', 'S'], ['a']], 'A': [['S'], ['']]})
+        with self.assertRaises(ValueError):
+            cyclic.generate_uniform('S', 3)
+
+
+class TestAutomatonCache(unittest.TestCase):
+
+    def lab_grammar(self):
+        return Grammar({'S', 'B', 'D'}, {'a', 'b', 'c'}, {
+            'S': [['a', 'B']],
+            'B': [['a', 'D'], ['b', 'B'], ['c', 'S']],
+            'D': [['a', 'D'], ['b', 'S'], ['c']],
+        })
+
+    def test_bytes_round_trip(self):
+        dfa = convert_grammar_to_fa(self.lab_grammar()).compiled
+        loaded = dfa_from_buffer(dfa_to_bytes(dfa))
+        self.assertEqual((loaded.states, loaded.symbols, loaded.start), (dfa.states, dfa.symbols, dfa.start))
+        self.assertEqual(loaded.table.tolist(), dfa.table.tolist())
+        for word in ['aac', 'abac', 'aabc', 'ab', '', 'x']:
+            self.assertEqual(loaded.accepts(word), dfa.accepts(word), word)
+        self.assertEqual(loaded.accepts_many(['aac', 'ab']).tolist(), [True, False])
+        with self.assertRaises(ValueError):
+            dfa_from_buffer(dfa_to_bytes(dfa)[:-3])
+
+    def test_hits_misses_and_changes(self):
+        grammar = self.lab_grammar()
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AutomatonCache(tmp)
+            first = cache.grammar_dfa(grammar)
+            second = cache.grammar_dfa(grammar)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+            self.assertIsInstance(second.table, memoryview)
+            self.assertTrue(second.accepts('aac'))
+            self.assertEqual(first.accepts('abac'), second.accepts('abac'))
+
+            grammar.P['D'].append(['b'])
+            self.assertTrue(cache.grammar_dfa(grammar).accepts('aab'))
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+            # An unreadable entry is rebuilt
+            for name in os.listdir(tmp):
+                with open(os.path.join(tmp, name), 'wb') as f:
+                    f.write(b'DFA1')
+            self.assertTrue(cache.grammar_dfa(grammar).accepts('aab'))
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_nfa_adapter(self):
+        calls = []
+
+        def convert(Q, Sigma, F, delta, start):
+            calls.append(start)
+            return ['q0', 'q1'], Sigma, ['q1'], {'q0': {'a': 'q1'}, 'q1': {'a': 'q1', 'b': 'q0'}}
+
+        delta = {('q0', 'a'): ['q0', 'q1'], ('q1', 'b'): ['q0']}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AutomatonCache(tmp)
+            for _ in range(2):
+                dfa = cache.nfa_dfa(['q0', 'q1'], ['a', 'b'], ['q1'], delta, convert)
+                self.assertTrue(dfa.accepts('aaba'))
+                self.assertFalse(dfa.accepts('ab'))
+        self.assertEqual(calls, ['q0'])
+        with self.assertRaises(ValueError):
+            dfa_from_tuple(['q0'], ['a'], [], {('q0', 'a'): ['q0', 'q1']})
+
+    def test_nfa_keyed_by_converter(self):
+        def subsets(Q, Sigma, F, delta, start):
+            return ['q0', 'q1'], Sigma, ['q1'], {'q0': {'a': 'q1'}, 'q1': {'a': 'q1'}}
+
+        def only_empty(Q, Sigma, F, delta, start):
+            return ['q0'], Sigma, ['q0'], {}
+
+        delta = {('q0', 'a'): ['q1'], ('q1', 'a'): ['q1']}
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = AutomatonCache(tmp)
+            first = cache.nfa_dfa(['q0', 'q1'], ['a'], ['q1'], delta, subsets)
+            second = cache.nfa_dfa(['q0', 'q1'], ['a'], ['q1'], delta, only_empty)
+            tagged = cache.nfa_dfa(['q0', 'q1'], ['a'], ['q1'], delta, subsets, tag='v2')
+            self.assertEqual((cache.hits, cache.misses), (0, 3))
+            self.assertTrue(first.accepts('aa'))
+            self.assertFalse(second.accepts('aa'))
+            self.assertTrue(second.accepts(''))
+            self.assertTrue(tagged.accepts('a'))
+            cache.nfa_dfa(['q0', 'q1'], ['a'], ['q1'], delta, only_empty)
+            self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_nfa_key_ignores_hash_seed(self):
+        script = ("from automaton_cache import content_hash, nfa_source\n"
+                  "print(content_hash('nfa', nfa_source({'q0', 'q1', 'q2'}, {'a', 'b', 'c'}, {'q1', 'q2'},"
+                  " {('q0', 'a'): {'q0', 'q1', 'q2'}, ('q1', 'b'): frozenset({'q0', 'q2'})}, 'q0')))")
+        keys = set()
+        for seed in ('1', '2', '3'):
+            env = dict(os.environ, PYTHONHASHSEED=seed)
+            keys.add(subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True,
+                                    cwd=os.path.dirname(os.path.abspath(__file__)), env=env).stdout)
+        self.assertEqual(len(keys), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import argparse
+import random
+import time
+
+import equivalence
+import functions as func
+
+
+# Random NFA with states q0..q{n-1}; each (state, symbol) pair gets a
+# transition with probability `density`, to up to `fanout` states, and a
+# ring q0 -> q1 -> ... keeps every state reachable
+def random_nfa(n_states, n_symbols=2, density=0.6, fanout=2, n_final=None, seed=0):
+    rng = random.Random(seed)
+    Q = [f'q{i}' for i in range(n_states)]
+    Sigma = [chr(ord('a') + i) for i in range(n_symbols)]
+    delta = {}
+    for state in Q:
+        for input_symbol in Sigma:
+            if rng.random() < density:
+                delta[(state, input_symbol)] = rng.sample(Q, rng.randint(1, min(fanout, n_states)))
+    for i, state in enumerate(Q):
+        targets = delta.setdefault((state, rng.choice(Sigma)), [])
+        if Q[(i + 1) % n_states] not in targets:
+            targets.append(Q[(i + 1) % n_states])
+    F = rng.sample(Q, n_final or max(1, n_states // 4))
+    return Q, Sigma, F, delta
+
+
+def random_strings(Sigma, count, max_length, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choices(Sigma, k=rng.randint(0, max_length))) for _ in range(count)]
+
+
+def time_acceptance(delta, start, F, strings):
+    F = set(F)
+    t0 = time.perf_counter()
+    accepted = sum(func.dfa_accepts(delta, start, F, string) for string in strings)
+    return time.perf_counter() - t0, accepted
+
+
+def bench_minimization(sizes, n_symbols, n_strings, max_length, seed):
+    print(f"{'NFA':>6} {'DFA':>8} {'min DFA':>8} {'subset s':>9} {'minimize s':>11} "
+          f"{'DFA acc/s':>11} {'min acc/s':>11}")
+    for n in sizes:
+        Q, Sigma, F, delta = random_nfa(n, n_symbols, seed=seed)
+
+        t0 = time.perf_counter()
+        dfa = func.ndfa_to_dfa(Q, Sigma, F, delta)
+        t1 = time.perf_counter()
+        minimal = func.minimize_dfa(*dfa)
+        t2 = time.perf_counter()
+
+        strings = random_strings(Sigma, n_strings, max_length, seed)
+        dfa_time, dfa_accepted = time_acceptance(dfa[3], 'q0', dfa[2], strings)
+        min_time, min_accepted = time_acceptance(minimal[3], 'q0', minimal[2], strings)
+        assert dfa_accepted == min_accepted, 'minimized DFA disagrees with the original'
+
+        print(f'{n:>6} {len(dfa[0]):>8} {len(minimal[0]):>8} {t1 - t0:>9.3f} {t2 - t1:>11.3f} '
+              f'{n_strings / dfa_time:>11.0f} {n_strings / min_time:>11.0f}')
+
+
+# Checking that subset construction and minimization kept the language:
+# Hopcroft-Karp on the NFA against the minimal DFA, the inclusion check
+# both ways, and, for scale, comparing acceptance on sampled strings
+def bench_equivalence(sizes, n_symbols, n_strings, max_length, seed):
+    print(f"{'NFA':>6} {'min DFA':>8} {'equal s':>8} {'A<=B s':>8} {'B<=A s':>8} {'sampled s':>10}")
+    for n in sizes:
+        Q, Sigma, F, delta = random_nfa(n, n_symbols, seed=seed)
+        dfa = func.ndfa_to_dfa(Q, Sigma, F, delta)
+        minimal = func.minimize_dfa(*dfa)
+        nfa = (Q, Sigma, F, delta)
+
+        t0 = time.perf_counter()
+        assert equivalence.are_equivalent(nfa, minimal), 'minimized DFA disagrees with the NFA'
+        t1 = time.perf_counter()
+        assert equivalence.is_included(nfa, minimal)
+        t2 = time.perf_counter()
+        assert equivalence.is_included(minimal, nfa)
+        t3 = time.perf_counter()
+        strings = random_strings(Sigma, n_strings, max_length, seed)
+        time_acceptance(dfa[3], 'q0', dfa[2], strings)
+        time_acceptance(minimal[3], 'q0', minimal[2], strings)
+        t4 = time.perf_counter()
+
+        print(f'{n:>6} {len(minimal[0]):>8} {t1 - t0:>8.3f} {t2 - t1:>8.3f} {t3 - t2:>8.3f} {t4 - t3:>10.3f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='NFA -> DFA -> minimal DFA benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[4, 8, 12, 16])
+    parser.add_argument('--symbols', type=int, default=2)
+    parser.add_argument('--strings', type=int, default=20000)
+    parser.add_argument('--max-length', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    bench_minimization(args.sizes, args.symbols, args.strings, args.max_length, args.seed)
+    bench_equivalence(args.sizes, args.symbols, args.strings, args.max_length, args.seed)
@@ -0,0 +1,181 @@
+from collections import deque
+
+from functions import EPSILON, index_states, successor_masks, epsilon_closure_masks, has_epsilon, iter_bits
+
+
+class SubsetStepper:
+    # An automaton explored on the fly as sets of its states (bitsets), the
+    # way ndfa_to_dfa would see it, but only for the sets actually reached.
+    # `automaton` is (Q, Sigma, F, delta) or (Q, Sigma, F, delta, start);
+    # delta may be {(state, symbol): [next, ...]} with ε-moves, or the
+    # {state: {symbol: next}} DFA shape ndfa_to_dfa returns. The start
+    # state defaults to Q[0].
+    def __init__(self, automaton, alphabet=None):
+        Q, Sigma, F, delta = automaton[:4]
+        start = automaton[4] if len(automaton) > 4 else Q[0]
+        delta = normalize_delta(delta)
+        self.alphabet = list(alphabet if alphabet is not None else Sigma)
+        self.states, self.index = index_states(Q, delta, start)
+        closures = epsilon_closure_masks(delta, self.index) if has_epsilon(delta) else None
+        self.closures = closures
+        self.successors = successor_masks(self.alphabet, delta, self.index, closures)
+        self.start = closures[self.index[start]] if closures else 1 << self.index[start]
+        self.final = 0
+        for state in F:
+            if state in self.index:
+                self.final |= 1 << self.index[state]
+        self._steps = {}
+
+    def step(self, mask, symbol_id):
+        key = (mask, symbol_id)
+        if key not in self._steps:
+            successor = self.successors[symbol_id]
+            next_mask = 0
+            for i in iter_bits(mask):
+                next_mask |= successor[i]
+            self._steps[key] = next_mask
+        return self._steps[key]
+
+    def accepting(self, mask):
+        return bool(mask & self.final)
+
+
+# Every delta shape as {(state, symbol): [next, ...]}
+def normalize_delta(delta):
+    normalized = {}
+    for key, value in delta.items():
+        if isinstance(key, tuple):
+            if isinstance(value, (list, tuple, set, frozenset)):
+                normalized.setdefault(key, []).extend(value)
+            else:
+                normalized.setdefault(key, []).append(value)
+        else:
+            for input_symbol, next_state in value.items():
+                normalized.setdefault((key, input_symbol), []).append(next_state)
+    return normalized
+
+
+def _alphabet(*automata):
+    symbols = []
+    for automaton in automata:
+        for input_symbol in automaton[1]:
+            if input_symbol != EPSILON and input_symbol not in symbols:
+                symbols.append(input_symbol)
+    return symbols
+
+
+def _word(trail, node):
+    symbols = []
+    while trail[node] is not None:
+        node, input_symbol = trail[node]
+        symbols.append(input_symbol)
+    symbols.reverse()
+    if all(isinstance(symbol, str) and len(symbol) == 1 for symbol in symbols):
+        return ''.join(symbols)
+    return tuple(symbols)
+
+
+# Union of two steppers over the same alphabet: its sets are a set of
+# `left` in the low bits and a set of `right` above them
+class UnionStepper:
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.shift = len(left.states)
+        self.low = (1 << self.shift) - 1
+        self.start = left.start | right.start << self.shift
+
+    def step(self, mask, symbol_id):
+        return (self.left.step(mask & self.low, symbol_id)
+                | self.right.step(mask >> self.shift, symbol_id) << self.shift)
+
+    def accepting(self, mask):
+        return self.left.accepting(mask & self.low) or self.right.accepting(mask >> self.shift)
+
+
+# Hopcroft-Karp: breadth-first over pairs of subset states, merging the two
+# sides of every pair in a union-find. A pair whose sides are already in
+# one class is skipped, since the classes are only ever unions of pairs
+# that must be equivalent, so the search visits at most as many pairs as
+# the two subset automata have states together, and usually far fewer. It
+# stops at the first pair where one side accepts and the other does not,
+# and returns the word leading there (a shortest one among the pairs
+# visited), or None when the languages are equal.
+def _hopcroft_karp(left, right, alphabet):
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    start = ((0, left.start), (1, right.start))
+    parent[start[0]] = start[1]
+    trail = {start: None}
+    queue = deque([start])
+    while queue:
+        pair = queue.popleft()
+        (_, p), (_, q) = pair
+        if left.accepting(p) != right.accepting(q):
+            return _word(trail, pair)
+        for symbol_id, input_symbol in enumerate(alphabet):
+            next_pair = ((0, left.step(p, symbol_id)), (1, right.step(q, symbol_id)))
+            a, b = find(next_pair[0]), find(next_pair[1])
+            if a != b:
+                parent[a] = b
+                trail[next_pair] = (pair, input_symbol)
+                queue.append(next_pair)
+    return None
+
+
+def equivalence_counterexample(A, B):
+    alphabet = _alphabet(A, B)
+    return _hopcroft_karp(SubsetStepper(A, alphabet), SubsetStepper(B, alphabet), alphabet)
+
+
+def are_equivalent(A, B):
+    return equivalence_counterexample(A, B) is None
+
+
+# A word of L(A) missing from L(B), or None when L(A) ⊆ L(B): the same
+# check as equivalence, of A ∪ B against B. The union accepts everything
+# B does, so any word they disagree on is in L(A) and not in L(B). Both
+# sides are determinized on the fly, so the search stays within the
+# subset pairs actually reached, like equivalence_counterexample.
+def inclusion_counterexample(A, B):
+    alphabet = _alphabet(A, B)
+    right = SubsetStepper(B, alphabet)
+    return _hopcroft_karp(UnionStepper(SubsetStepper(A, alphabet), right), right, alphabet)
+
+
+def is_included(A, B):
+    return inclusion_counterexample(A, B) is None
+
+
+# Right-linear grammar in the shape fa_to_rg returns ({state: ['aB', 'a',
+# 'B', 'ε', ...]}) as an NFA: a body naming a variable is an ε-move,
+# otherwise its longest prefix in Sigma is read and the rest is the next
+# state. Bodies that end after the terminal go to a new final state.
+def rg_to_nfa(grammar, Sigma, start):
+    symbols = sorted(Sigma, key=len, reverse=True)
+    final = 'F'
+    while final in grammar:
+        final += "'"
+    Q = [start] + [state for state in grammar if state != start] + [final]
+    F = [final]
+    delta = {}
+    for state, bodies in grammar.items():
+        for body in bodies:
+            if body in ('', EPSILON):
+                F.append(state)
+            elif body in grammar:
+                delta.setdefault((state, EPSILON), []).append(body)
+            else:
+                input_symbol = next((symbol for symbol in symbols if body.startswith(symbol)), None)
+                if input_symbol is None:
+                    raise ValueError(f'{state} -> {body} does not start with a symbol of {Sigma}')
+                delta.setdefault((state, input_symbol), []).append(body[len(input_symbol):] or final)
+    return Q, list(Sigma), F, delta, start
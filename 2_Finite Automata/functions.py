@@ -1,9 +1,25 @@
-from collections import defaultdict
+from collections import defaultdict, deque
 import matplotlib.pyplot as plt
 import networkx as nx
 
+# Symbol used for ε-transitions, e.g. delta[('q0', EPSILON)] = ['q1']
+EPSILON = 'ε'
+
+# Work counters (subset states and transitions built, partition splits)
+# collected into a collections.Counter assigned here; None turns them off
+counters = None
+
+
+# Only NFA-shaped deltas ({(state, symbol): [...]}) can hold ε-moves; the
+# {state: {symbol: next}} shape ndfa_to_dfa returns has plain state keys
+def has_epsilon(delta):
+    return any(isinstance(key, tuple) and key[1] == EPSILON for key in delta)
+
+
 # Determine if FA is DFA or NDFA
 def is_dfa(Q, Sigma, delta):
+    if has_epsilon(delta):
+        return False  # ε-NFA
     for state in Q:
         for input_symbol in Sigma:
             if (state, input_symbol) in delta:
@@ -23,6 +39,11 @@ def fa_to_rg(Q, Sigma, F, delta):
                     if state not in grammar:
                         grammar[state] = []
                     grammar[state].append(f"{input_symbol}{next_state if next_state not in F else ''}")
+        # ε-transitions become unit productions: state -> next_state
+        for next_state in delta.get((state, EPSILON), []):
+            if state not in grammar:
+                grammar[state] = []
+            grammar[state].append(f"{next_state}")
     # Add final state production rule
     for final_state in F:
         if final_state not in grammar:
@@ -31,44 +52,299 @@ def fa_to_rg(Q, Sigma, F, delta):
     return grammar
 
 
-# Convert NDFA to DFA
-def ndfa_to_dfa(Q, Sigma, F, delta):
-    initial_state = ['q0']
-    dfa_states = [initial_state]
-    dfa_delta = {}
-    dfa_final_states = []
-    state_map = {'q0': initial_state}
+# Give every NFA state (including ones only mentioned in delta) a bit position
+def index_states(Q, delta, start=None):
+    states = list(Q)
+    index = {state: i for i, state in enumerate(states)}
+    extra = [start] if start is not None else []
+    for (state, _), next_states in delta.items():
+        extra.append(state)
+        extra.extend(next_states)
+    for state in extra:
+        if state not in index:
+            index[state] = len(states)
+            states.append(state)
+    return states, index
 
-    while dfa_states:
-        current_dfa_state = dfa_states.pop(0)
-        for input_symbol in Sigma:
-            # Find the union of transitions for all NDFA states in the current DFA state
-            next_states = set()
-            for ndfa_state in current_dfa_state:
-                if (ndfa_state, input_symbol) in delta:
-                    next_states.update(delta[(ndfa_state, input_symbol)])
-            next_states = sorted(list(next_states))
-
-            if not next_states:
+
+# Per-symbol successor index: successors[j][i] is the bitset of states
+# reachable from state i on Sigma[j]. With ε-closures given, every
+# successor is replaced by its closure, so the result is already closed.
+def successor_masks(Sigma, delta, index, closures=None):
+    symbol_ids = {input_symbol: j for j, input_symbol in enumerate(Sigma) if input_symbol != EPSILON}
+    successors = [[0] * len(index) for _ in Sigma]
+    for (state, input_symbol), next_states in delta.items():
+        j = symbol_ids.get(input_symbol)
+        if j is None:
+            continue
+        mask = 0
+        for next_state in next_states:
+            if closures is None:
+                mask |= 1 << index[next_state]
+            else:
+                mask |= closures[index[next_state]]
+        successors[j][index[state]] |= mask
+    return successors
+
+
+# ε-closure of every state as a bitset, closures[i] for state index i.
+# The ε-graph is condensed into strongly connected components (iterative
+# Tarjan); all states of a component share one closure, which is its own
+# states plus the closures of the components it reaches, so each closure
+# is computed exactly once.
+def epsilon_closure_masks(delta, index):
+    n = len(index)
+    closures = [1 << i for i in range(n)]
+    edges = defaultdict(list)
+    for (state, input_symbol), next_states in delta.items():
+        if input_symbol == EPSILON:
+            edges[index[state]].extend(index[next_state] for next_state in next_states)
+    if not edges:
+        return closures
+
+    order = [-1] * n
+    low = [0] * n
+    component = [-1] * n
+    on_stack = [False] * n
+    stack = []
+    counter = 0
+    for root in list(edges):
+        if order[root] != -1:
+            continue
+        order[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(edges.get(root, ())))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if order[w] == -1:
+                    order[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append((w, iter(edges.get(w, ()))))
+                    break
+                if on_stack[w]:
+                    low[v] = min(low[v], order[w])
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
+                if low[v] == order[v]:
+                    # v is the root of a component; components it reaches are done
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack[w] = False
+                        component[w] = v
+                        members.append(w)
+                        if w == v:
+                            break
+                    mask = 0
+                    for w in members:
+                        mask |= 1 << w
+                        for x in edges.get(w, ()):
+                            if component[x] != v:
+                                mask |= closures[x]
+                    for w in members:
+                        closures[w] = mask
+    return closures
+
+
+# ε-closure of every state, as {state: frozenset of states}
+def epsilon_closure(Q, delta):
+    states, index = index_states(Q, delta)
+    closures = epsilon_closure_masks(delta, index)
+    return {state: frozenset(states[i] for i in iter_bits(closures[index[state]])) for state in states}
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Convert NDFA to DFA by subset construction. DFA states are bitsets over
+# the NFA states, explored breadth-first; each is named by joining its
+# sorted NFA state names with ','. ε-transitions are followed through
+# precomputed closures.
+def ndfa_to_dfa(Q, Sigma, F, delta, start='q0'):
+    states, index = index_states(Q, delta, start)
+    closures = epsilon_closure_masks(delta, index) if has_epsilon(delta) else None
+    successors = successor_masks(Sigma, delta, index, closures)
+    final_mask = 0
+    for state in F:
+        if state in index:
+            final_mask |= 1 << index[state]
+
+    def subset_name(mask):
+        return ','.join(sorted(states[i] for i in iter_bits(mask)))
+
+    start_mask = closures[index[start]] if closures else 1 << index[start]
+    names = {start_mask: start if start_mask == 1 << index[start] else subset_name(start_mask)}
+    dfa_final_states = [names[start_mask]] if start_mask & final_mask else []
+    dfa_delta = defaultdict(dict)
+    worklist = deque([start_mask])
+
+    while worklist:
+        mask = worklist.popleft()
+        name = names[mask]
+        members = list(iter_bits(mask))
+        for input_symbol, successor in zip(Sigma, successors):
+            # Union of transitions for all NDFA states in the current DFA state
+            next_mask = 0
+            for i in members:
+                next_mask |= successor[i]
+            if not next_mask:
                 continue
 
             # Check if these next states form a new DFA state
-            dfa_state_name = ','.join(next_states)
-            if dfa_state_name not in state_map:
-                state_map[dfa_state_name] = next_states
-                dfa_states.append(next_states)
-                if any(state in F for state in next_states):
-                    dfa_final_states.append(dfa_state_name)
+            if next_mask not in names:
+                names[next_mask] = subset_name(next_mask)
+                worklist.append(next_mask)
+                if next_mask & final_mask:
+                    dfa_final_states.append(names[next_mask])
 
             # Record the transition
-            dfa_delta[(','.join(current_dfa_state), input_symbol)] = dfa_state_name
+            dfa_delta[name][input_symbol] = names[next_mask]
+
+    if counters is not None:
+        counters['subset_states'] += len(names)
+        counters['subset_transitions'] += sum(map(len, dfa_delta.values()))
+    return list(names.values()), Sigma, dfa_final_states, dict(dfa_delta)
+
+
+# Transitions of a DFA as {state: {symbol: next_state}}; accepts both the
+# ndfa_to_dfa output shape and the (state, symbol) -> [next_state] shape
+def dfa_transitions(delta):
+    transitions = defaultdict(dict)
+    for key, value in delta.items():
+        if isinstance(key, tuple):
+            state, input_symbol = key
+            if isinstance(value, (list, tuple, set, frozenset)):
+                if len(value) != 1:
+                    raise ValueError(f'{key} has {len(value)} successors, expected a DFA')
+                value = next(iter(value))
+            transitions[state][input_symbol] = value
+        else:
+            transitions[key].update(value)
+    return transitions
+
+
+# Check whether a DFA accepts the input string
+def dfa_accepts(delta, start, F, input_string):
+    current_state = start
+    for input_symbol in input_string:
+        transitions = delta.get(current_state)
+        if transitions is None or input_symbol not in transitions:
+            return False
+        current_state = transitions[input_symbol]
+    return current_state in F
+
+
+# Minimize a DFA with Hopcroft's partition refinement, O(n·k·log n).
+# Unreachable states and states that cannot reach a final state are dropped,
+# every other block is named after its first member in Q order (the start
+# state for the start block). Returns (states, Sigma, F, delta) like ndfa_to_dfa.
+def minimize_dfa(Q, Sigma, F, delta, start=None):
+    transitions = dfa_transitions(delta)
+    if start is None:
+        start = Q[0]
+
+    # Keep only states reachable from the start state
+    order = {state: i for i, state in enumerate(Q)}
+    reachable = [start]
+    seen = {start}
+    for state in reachable:
+        for next_state in transitions.get(state, {}).values():
+            if next_state not in seen:
+                seen.add(next_state)
+                reachable.append(next_state)
+    reachable.sort(key=lambda state: order.get(state, len(order)))
+
+    # Dense ids, with an explicit dead state so the DFA is complete
+    index = {state: i for i, state in enumerate(reachable)}
+    dead = len(reachable)
+    n = dead + 1
+    symbols = list(Sigma)
+    inverse = [[[] for _ in range(n)] for _ in symbols]
+    for j, input_symbol in enumerate(symbols):
+        for state in reachable:
+            target = transitions.get(state, {}).get(input_symbol)
+            inverse[j][index[target] if target is not None else dead].append(index[state])
+        inverse[j][dead].append(dead)
+
+    final = {index[state] for state in F if state in index}
+    blocks = [block for block in (set(final), set(range(n)) - final) if block]
+    initial_blocks = len(blocks)
+    block_of = [0] * n
+    for b, block in enumerate(blocks):
+        for state in block:
+            block_of[state] = b
+
+    smaller = 0 if len(blocks) == 1 or len(blocks[0]) <= len(blocks[1]) else 1
+    worklist = deque((smaller, j) for j in range(len(symbols)))
+    pending = set(worklist)
+    while worklist:
+        splitter = worklist.popleft()
+        pending.discard(splitter)
+        b, j = splitter
+        predecessors = set()
+        for state in blocks[b]:
+            predecessors.update(inverse[j][state])
+
+        touched = defaultdict(set)
+        for state in predecessors:
+            touched[block_of[state]].add(state)
+        for y, inside in touched.items():
+            if len(inside) == len(blocks[y]):
+                continue
+            # Split block y; the part moved out gets a new block id
+            blocks[y] -= inside
+            blocks.append(inside)
+            z = len(blocks) - 1
+            for state in inside:
+                block_of[state] = z
+            for c in range(len(symbols)):
+                if (y, c) in pending:
+                    new = (z, c)
+                else:
+                    new = (y, c) if len(blocks[y]) <= len(blocks[z]) else (z, c)
+                pending.add(new)
+                worklist.append(new)
+
+    if counters is not None:
+        counters['minimized_states'] += n
+        counters['partition_splits'] += len(blocks) - initial_blocks
+
+    # Name every live block after its first member and rebuild delta
+    dead_block = block_of[dead]
+    if block_of[index[start]] == dead_block:
+        return [start], Sigma, [], {}
+    names = {}
+    for state in reachable:
+        b = block_of[index[state]]
+        if b != dead_block and b not in names:
+            names[b] = state
+    if block_of[index[start]] in names:
+        names[block_of[index[start]]] = start
 
-    # Convert delta to a more standard form
-    dfa_delta_standardized = defaultdict(dict)
-    for (state, symbol), next_state in dfa_delta.items():
-        dfa_delta_standardized[state][symbol] = next_state
+    min_states = [names[b] for b in sorted(names, key=lambda b: order.get(names[b], len(order)))]
+    min_final = [name for b, name in names.items() if b != dead_block and next(iter(blocks[b])) in final]
+    min_final.sort(key=lambda state: order.get(state, len(order)))
+    min_delta = defaultdict(dict)
+    for b, name in names.items():
+        representative = index[name]
+        for input_symbol in symbols:
+            target = transitions.get(reachable[representative], {}).get(input_symbol)
+            if target is not None and block_of[index[target]] != dead_block:
+                min_delta[name][input_symbol] = names[block_of[index[target]]]
 
-    return list(state_map.keys()), Sigma, dfa_final_states, dict(dfa_delta_standardized)
+    return min_states, Sigma, min_final, dict(min_delta)
 
 
 def visualize_ndfa(Q, Sigma, F, delta, title="Finite Automaton"):
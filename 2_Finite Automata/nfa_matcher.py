@@ -0,0 +1,63 @@
+from functools import lru_cache
+
+from functions import index_states, successor_masks, epsilon_closure_masks, has_epsilon, iter_bits
+
+
+class NFAMatcher:
+    # Runs an NFA (or ε-NFA) directly, tracking the set of active states as
+    # a bitmask, so no full subset construction is needed. Each computed
+    # (active set, symbol) -> next set step is kept in a bounded LRU cache,
+    # which lazily builds the part of the DFA the inputs actually visit.
+    # cache_size=0 disables the cache, None makes it unbounded.
+    def __init__(self, Q, Sigma, F, delta, start='q0', cache_size=4096):
+        self.states, self.index = index_states(Q, delta, start)
+        closures = epsilon_closure_masks(delta, self.index) if has_epsilon(delta) else None
+        self.successors = successor_masks(Sigma, delta, self.index, closures)
+        self.symbol_ids = {input_symbol: j for j, input_symbol in enumerate(Sigma)}
+        self.start_mask = closures[self.index[start]] if closures else 1 << self.index[start]
+        self.final_mask = 0
+        for state in F:
+            if state in self.index:
+                self.final_mask |= 1 << self.index[state]
+
+        if cache_size == 0:
+            self.step = self._step
+        else:
+            self.step = lru_cache(maxsize=cache_size)(self._step)
+
+    def _step(self, mask, symbol_id):
+        successor = self.successors[symbol_id]
+        next_mask = 0
+        while mask:
+            low = mask & -mask
+            next_mask |= successor[low.bit_length() - 1]
+            mask ^= low
+        return next_mask
+
+    def run(self, input_string, mask=None):
+        # Active state set after reading the input (0 once it is rejected)
+        step = self.step
+        symbol_ids = self.symbol_ids
+        if mask is None:
+            mask = self.start_mask
+        for input_symbol in input_string:
+            symbol_id = symbol_ids.get(input_symbol)
+            if symbol_id is None:
+                return 0
+            mask = step(mask, symbol_id)
+            if not mask:
+                return 0
+        return mask
+
+    def accepts(self, input_string):
+        return bool(self.run(input_string) & self.final_mask)
+
+    def active_states(self, input_string):
+        return {self.states[i] for i in iter_bits(self.run(input_string))}
+
+    def cache_info(self):
+        return self.step.cache_info() if hasattr(self.step, 'cache_info') else None
+
+    def clear_cache(self):
+        if hasattr(self.step, 'cache_clear'):
+            self.step.cache_clear()
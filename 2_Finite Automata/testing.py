@@ -0,0 +1,162 @@
+import itertools
+import unittest
+from collections import Counter
+import functions as func
+import equivalence
+from nfa_matcher import NFAMatcher
+from benchmark import random_nfa
+
+
+class TestFunctions(unittest.TestCase):
+
+    def setUp(self):
+        self.Q = ['q0', 'q1', 'q2', 'q3']
+        self.Sigma = ['a', 'b']
+        self.F = ['q3']
+        self.delta = {
+            ('q0', 'a'): ['q0'],
+            ('q0', 'b'): ['q1'],
+            ('q1', 'a'): ['q1', 'q2'],
+            ('q1', 'b'): ['q3'],
+            ('q2', 'a'): ['q2'],
+            ('q2', 'b'): ['q3']
+        }
+
+    def all_strings(self, Sigma, max_length):
+        for length in range(max_length + 1):
+            yield from itertools.product(Sigma, repeat=length)
+
+    def test_minimize_dfa(self):
+        dfa = func.ndfa_to_dfa(self.Q, self.Sigma, self.F, self.delta)
+        states, Sigma, F, delta = func.minimize_dfa(*dfa)
+        self.assertEqual(states, ['q0', 'q1', 'q3'])
+        self.assertEqual(F, ['q3'])
+        self.assertEqual(delta, {'q0': {'a': 'q0', 'b': 'q1'}, 'q1': {'a': 'q1', 'b': 'q3'}})
+
+    def test_counters(self):
+        func.counters = Counter()
+        try:
+            func.minimize_dfa(*func.ndfa_to_dfa(self.Q, self.Sigma, self.F, self.delta))
+            self.assertEqual(func.counters, {'subset_states': 4, 'subset_transitions': 6,
+                                             'minimized_states': 5, 'partition_splits': 2})
+        finally:
+            func.counters = None
+
+    def test_ndfa_to_dfa_start_state(self):
+        # Start from q1 instead of q0: q0 is never reached
+        states, Sigma, F, delta = func.ndfa_to_dfa(self.Q, self.Sigma, self.F, self.delta, start='q1')
+        self.assertEqual(states[0], 'q1')
+        self.assertNotIn('q0', states)
+        self.assertEqual(F, ['q3'])
+        self.assertEqual(delta['q1'], {'a': 'q1,q2', 'b': 'q3'})
+        for string in ['b', 'ab', 'aab', 'bb', '']:
+            self.assertEqual(func.dfa_accepts(delta, 'q1', F, string), string in ('b', 'ab', 'aab'), string)
+
+    def test_final_start_state(self):
+        # q0 accepts the empty word, so the DFA start state is final too
+        states, Sigma, F, delta = func.ndfa_to_dfa(self.Q, self.Sigma, ['q0', 'q3'], self.delta)
+        self.assertEqual(states[0], 'q0')
+        self.assertEqual(F[0], 'q0')
+        self.assertTrue(func.dfa_accepts(delta, 'q0', F, ''))
+        self.assertTrue(func.dfa_accepts(delta, 'q0', F, 'aa'))
+        # with an ε-closure as start state, the closure is final
+        states, Sigma, F, delta = func.ndfa_to_dfa(['p', 'q'], ['a'], ['q'], {('p', func.EPSILON): ['q']}, 'p')
+        self.assertEqual((states, F), (['p,q'], ['p,q']))
+
+    def test_is_dfa_on_subset_construction(self):
+        self.assertFalse(func.is_dfa(self.Q, self.Sigma, self.delta))
+        states, Sigma, F, delta = func.ndfa_to_dfa(self.Q, self.Sigma, self.F, self.delta)
+        self.assertIn('q1,q2', states)
+        self.assertFalse(func.has_epsilon(delta))
+        self.assertTrue(func.is_dfa(states, Sigma, delta))
+        # two-character state names must not be read as (state, symbol)
+        self.assertFalse(func.has_epsilon({'pε': {'a': 'pε'}}))
+
+    def test_minimize_preserves_language(self):
+        for seed in range(20):
+            Q, Sigma, F, delta = random_nfa(6, seed=seed)
+            dfa = func.ndfa_to_dfa(Q, Sigma, F, delta)
+            minimal = func.minimize_dfa(*dfa)
+            self.assertLessEqual(len(minimal[0]), len(dfa[0]))
+            for string in self.all_strings(Sigma, 6):
+                self.assertEqual(func.dfa_accepts(dfa[3], 'q0', dfa[2], string),
+                                 func.dfa_accepts(minimal[3], 'q0', minimal[2], string))
+
+    def test_epsilon_nfa(self):
+        # ε-cycle q0 <-> q1, then q1 -a-> q2 -ε-> q3
+        delta = {
+            ('q0', func.EPSILON): ['q1'],
+            ('q1', func.EPSILON): ['q0'],
+            ('q1', 'a'): ['q2'],
+            ('q2', func.EPSILON): ['q3'],
+            ('q3', 'b'): ['q0']
+        }
+        Q = ['q0', 'q1', 'q2', 'q3']
+        closures = func.epsilon_closure(Q, delta)
+        self.assertEqual(closures['q0'], {'q0', 'q1'})
+        self.assertEqual(closures['q1'], {'q0', 'q1'})
+        self.assertEqual(closures['q2'], {'q2', 'q3'})
+        self.assertFalse(func.is_dfa(Q, ['a', 'b'], delta))
+
+        states, Sigma, F, dfa_delta = func.ndfa_to_dfa(Q, ['a', 'b'], ['q3'], delta)
+        self.assertEqual(states, ['q0,q1', 'q2,q3'])
+        self.assertEqual(F, ['q2,q3'])
+        self.assertEqual(dfa_delta, {'q0,q1': {'a': 'q2,q3'}, 'q2,q3': {'b': 'q0,q1'}})
+        self.assertIn('q1', func.fa_to_rg(Q, ['a', 'b'], ['q3'], delta)['q0'])
+
+
+    def test_nfa_matcher(self):
+        dfa_states, _, dfa_F, dfa_delta = func.ndfa_to_dfa(self.Q, self.Sigma, self.F, self.delta)
+        for cache_size in (0, 1, None):
+            matcher = NFAMatcher(self.Q, self.Sigma, self.F, self.delta, cache_size=cache_size)
+            for string in self.all_strings(self.Sigma, 7):
+                self.assertEqual(matcher.accepts(string), func.dfa_accepts(dfa_delta, 'q0', dfa_F, string))
+        self.assertEqual(matcher.active_states('ba'), {'q1', 'q2'})
+        self.assertEqual(matcher.active_states('c'), set())
+
+    def test_equivalence(self):
+        A = (self.Q, self.Sigma, self.F, self.delta, 'q0')
+        dfa = func.ndfa_to_dfa(*A)
+        self.assertTrue(equivalence.are_equivalent(A, dfa))
+        self.assertTrue(equivalence.are_equivalent(A, func.minimize_dfa(*dfa)))
+        self.assertEqual(equivalence.equivalence_counterexample(A, (self.Q, self.Sigma, ['q1'], self.delta)), 'b')
+        grammar = func.fa_to_rg(self.Q, self.Sigma, self.F, self.delta)
+        self.assertTrue(equivalence.are_equivalent(A, equivalence.rg_to_nfa(grammar, self.Sigma, 'q0')))
+
+    def test_inclusion(self):
+        A = (self.Q, self.Sigma, self.F, self.delta, 'q0')
+        everything = (['p'], self.Sigma, ['p'], {('p', 'a'): ['p'], ('p', 'b'): ['p']})
+        self.assertTrue(equivalence.is_included(A, everything))
+        self.assertEqual(equivalence.inclusion_counterexample(everything, A), '')
+        # q1 accepting as well adds 'b', 'ba', ...: a superset of L(A)
+        wider = (self.Q, self.Sigma, ['q1', 'q3'], self.delta)
+        self.assertTrue(equivalence.is_included(A, wider))
+        self.assertEqual(equivalence.inclusion_counterexample(wider, A), 'b')
+
+    def test_counterexamples_against_enumeration(self):
+        def language(automaton, length):
+            Q, Sigma, F, delta = automaton[:4]
+            dfa = func.ndfa_to_dfa(Q, Sigma, F, equivalence.normalize_delta(delta), Q[0])
+            return {''.join(string) for string in self.all_strings(automaton[1], length)
+                    if func.dfa_accepts(dfa[3], dfa[0][0], set(dfa[2]), string)}
+
+        for seed in range(30):
+            A = random_nfa(5, seed=seed)
+            B = random_nfa(5, seed=seed + 1000)
+            if seed % 3 == 0:
+                B = func.ndfa_to_dfa(*A, 'q0')
+            A_words, B_words = language(A, 8), language(B, 8)
+            word = equivalence.equivalence_counterexample(A, B)
+            if word is None:
+                self.assertEqual(A_words, B_words)
+            else:
+                self.assertNotEqual(word in A_words, word in B_words)
+            word = equivalence.inclusion_counterexample(A, B)
+            if word is None:
+                self.assertLessEqual(A_words, B_words)
+            else:
+                self.assertIn(word, A_words - B_words)
+
+
+if __name__ == '__main__':
+    unittest.main()
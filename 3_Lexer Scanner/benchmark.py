@@ -0,0 +1,81 @@
+import argparse
+import random
+import time
+
+from lexer import Lexer, EOF
+from mytoken import Token, INTEGER, PLUS, MINUS
+
+
+# The original scanner: one character per advance() call and one token
+# per tokenize() call
+class CharLexer(Lexer):
+    def tokenize(self):
+        while self.current_char is not None:
+            if self.current_char.isspace():
+                self.skip_whitespace()
+                continue
+
+            if self.current_char.isdigit():
+                return Token(INTEGER, self.integer())
+
+            if self.current_char == '+':
+                self.advance()
+                return Token(PLUS, '+')
+
+            if self.current_char == '-':
+                self.advance()
+                return Token(MINUS, '-')
+
+            self.error()
+
+        return Token(EOF, None)
+
+
+def random_expression(n_terms, seed=0, max_value=10 ** 6):
+    rng = random.Random(seed)
+    parts = [str(rng.randint(0, max_value))]
+    for _ in range(n_terms - 1):
+        parts.append(rng.choice('+-'))
+        parts.append(str(rng.randint(0, max_value)))
+    return ' '.join(parts)
+
+
+def one_per_call(lexer):
+    tokens = []
+    token = lexer.tokenize()
+    while token.type != EOF:
+        tokens.append(token)
+        token = lexer.tokenize()
+    return tokens
+
+
+def bulk(lexer):
+    return lexer.tokenize_all()[:-1]
+
+
+def bench(sizes, repeat):
+    modes = [('char-by-char', CharLexer, one_per_call), ('batch, per call', Lexer, one_per_call),
+             ('batch, bulk', Lexer, bulk)]
+    print(f"{'terms':>9} {'mode':>16} {'seconds':>8} {'tokens/s':>12}")
+    for n in sizes:
+        text = random_expression(n)
+        reference = None
+        for name, cls, run in modes:
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                tokens = run(cls(text))
+                elapsed = time.perf_counter() - t0
+                best = elapsed if best is None else min(best, elapsed)
+            values = [(token.type, token.value) for token in tokens]
+            reference = reference or values
+            assert values == reference, f'{name} disagrees with the original scanner'
+            print(f'{n:>9} {name:>16} {best:>8.3f} {len(tokens) / best:>12.0f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lexer throughput benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    bench(args.sizes, args.repeat)
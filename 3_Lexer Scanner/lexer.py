@@ -1,5 +1,20 @@
+import re
+from collections import deque
+
 from mytoken import *
 
+# Character classes for the fast scanner; characters outside ASCII fall
+# back to str.isspace / str.isdigit
+SPACE, DIGIT = 'SPACE', 'DIGIT'
+_CHAR_CLASS = {ch: SPACE for ch in ' \t\n\r\f\v\x1c\x1d\x1e\x1f\x85'}
+_CHAR_CLASS.update({ch: DIGIT for ch in '0123456789'})
+_CHAR_CLASS.update({'+': PLUS, '-': MINUS})
+_SPACES = re.compile(r'\s+')
+_DIGITS = re.compile(r'\d+')
+
+# Tokens scanned, per batch, into a collections.Counter when one is set
+counters = None
+
 
 class Lexer:
     # lexer class to tokenize the input
@@ -8,6 +23,7 @@ class Lexer:
         self.text = text
         self.pos = 0
         self.current_char = self.text[self.pos]
+        self._pending = deque()
 
     def error(self):
         raise Exception('Invalid character')
@@ -30,24 +46,75 @@ class Lexer:
             self.advance()
         return int(result)
 
-    # lexical tokenizer
-    def tokenize(self):
-        while self.current_char is not None:
-            if self.current_char.isspace():
-                self.skip_whitespace()
-                continue
-
-            if self.current_char.isdigit():
-                return Token(INTEGER, self.integer())
+    def _seek(self, pos):
+        self.pos = pos
+        self.current_char = self.text[pos] if pos < len(self.text) else None
 
-            if self.current_char == '+':
-                self.advance()
-                return Token(PLUS, '+')
+    # Scan up to max_tokens tokens in one pass with index arithmetic over the
+    # text: whitespace runs and integers are matched as whole slices. The
+    # batch stops early before an invalid character, which raises only once
+    # it is the next thing to scan. Returns [] at end of input.
+    def tokenize_batch(self, max_tokens=4096):
+        text = self.text
+        n = len(text)
+        pos = self.pos
+        tokens = []
+        append = tokens.append
+        char_class = _CHAR_CLASS.get
+        match_digits = _DIGITS.match
+        limit = max_tokens
+        while pos < n and limit:
+            ch = text[pos]
+            if ch == ' ':  # the common single-space separator
+                pos += 1
+                continue
+            kind = char_class(ch)
+            if kind is None and not ch.isascii():
+                kind = SPACE if ch.isspace() else DIGIT if ch.isdigit() else None
+            if kind is SPACE:
+                pos = _SPACES.match(text, pos).end()
+            elif kind is DIGIT:
+                end = match_digits(text, pos).end() if ch.isdecimal() else pos
+                if end == pos:
+                    break  # a digit int() cannot read, like the slow path
+                append(Token(INTEGER, int(text[pos:end]), pos, end))
+                pos = end
+                limit -= 1
+            elif kind is not None:
+                append(Token(kind, ch, pos, pos + 1))
+                pos += 1
+                limit -= 1
+            else:
+                break
+        self._seek(pos)
+        if not tokens and pos < n:
+            self.error()
+        if counters is not None:
+            counters['tokens'] += len(tokens)
+            counters['batches'] += 1
+        return tokens
 
-            if self.current_char == '-':
-                self.advance()
-                return Token(MINUS, '-')
+    # Yield lists of tokens until the input is exhausted
+    def tokenize_batches(self, batch_size=4096):
+        while True:
+            batch = self.tokenize_batch(batch_size)
+            if not batch:
+                return
+            yield batch
 
-            self.error()
+    # All remaining tokens, followed by the EOF token
+    def tokenize_all(self):
+        tokens = list(self._pending)
+        self._pending.clear()
+        for batch in self.tokenize_batches():
+            tokens.extend(batch)
+        tokens.append(Token(EOF, None, self.pos, self.pos))
+        return tokens
 
-        return Token(EOF, None)
\ No newline at end of file
+    # lexical tokenizer, one token per call on top of the batch scanner
+    def tokenize(self):
+        if not self._pending:
+            self._pending.extend(self.tokenize_batch())
+            if not self._pending:
+                return Token(EOF, None, self.pos, self.pos)
+        return self._pending.popleft()
@@ -3,9 +3,14 @@ INTEGER, PLUS, MINUS, EOF = 'INTEGER', 'PLUS', 'MINUS', 'EOF'
 
 
 class Token:
-    def __init__(self, type, value):
+    # start/end is the token's span in the input text, when known
+    __slots__ = ('type', 'value', 'start', 'end')
+
+    def __init__(self, type, value, start=None, end=None):
         self.type = type
         self.value = value
+        self.start = start
+        self.end = end
 
     # string representation
     def __str__(self):
@@ -0,0 +1,39 @@
+import unittest
+from lexer import Lexer, EOF
+from mytoken import INTEGER, PLUS, MINUS
+from benchmark import CharLexer, random_expression
+
+
+class TestLexer(unittest.TestCase):
+
+    def values(self, tokens):
+        return [(token.type, token.value) for token in tokens]
+
+    def one_per_call(self, lexer):
+        tokens = [lexer.tokenize()]
+        while tokens[-1].type != EOF:
+            tokens.append(lexer.tokenize())
+        return tokens
+
+    def test_tokenize(self):
+        tokens = self.one_per_call(Lexer("12 + 24 - 8"))
+        self.assertEqual(self.values(tokens), [(INTEGER, 12), (PLUS, '+'), (INTEGER, 24), (MINUS, '-'),
+                                               (INTEGER, 8), (EOF, None)])
+        self.assertEqual([(token.start, token.end) for token in tokens[:3]], [(0, 2), (3, 4), (5, 7)])
+
+    def test_matches_char_lexer(self):
+        for text in [random_expression(300), '  1+2\t-\n30  ', '7']:
+            expected = self.values(self.one_per_call(CharLexer(text)))
+            self.assertEqual(self.values(self.one_per_call(Lexer(text))), expected)
+            self.assertEqual(self.values(Lexer(text).tokenize_all()), expected)
+
+    def test_error_is_raised_in_order(self):
+        lexer = Lexer('1 + x')
+        self.assertEqual(lexer.tokenize().value, 1)
+        self.assertEqual(lexer.tokenize().value, '+')
+        with self.assertRaises(Exception):
+            lexer.tokenize()
+
+
+if __name__ == '__main__':
+    unittest.main()
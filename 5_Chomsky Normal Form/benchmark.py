@@ -0,0 +1,260 @@
+import argparse
+import random
+import time
+
+from converter import ChomskyNormalForm
+from cyk import CYKParser
+
+# Dyck language over a/b and a small expression grammar, both run through
+# the converter first
+GRAMMARS = {
+    'dyck': ({'S'}, {'a', 'b'}, {'S': ['aSb', 'SS', 'ab']}, 'S'),
+    'expr': ({'E', 'T', 'F'}, {'+', '*', '(', ')', 'a'},
+             {'E': ['E+T', 'T'], 'T': ['T*F', 'F'], 'F': ['(E)', 'a']}, 'E'),
+}
+
+
+# Balanced word of length n (n even)
+def random_dyck(n, rng):
+    word = []
+    depth = 0
+    for i in range(n):
+        if depth == 0 or (depth < n - i and rng.random() < 0.5):
+            word.append('a')
+            depth += 1
+        else:
+            word.append('b')
+            depth -= 1
+    return ''.join(word)
+
+
+# Expression with roughly n symbols
+def random_expr(n, rng):
+    parts = []
+    depth = 0
+    while True:
+        while rng.random() < 0.2:
+            parts.append('(')
+            depth += 1
+        parts.append('a')
+        while depth and rng.random() < 0.3:
+            parts.append(')')
+            depth -= 1
+        if len(parts) + depth >= n:
+            break
+        parts.append(rng.choice('+*'))
+    parts.extend(')' * depth)
+    return ''.join(parts)
+
+
+WORDS = {'dyck': random_dyck, 'expr': random_expr}
+
+
+def bench_cyk(sizes, seed):
+    print(f"{'grammar':>8} {'symbols':>8} {'bitset s':>9} {'numpy s':>8} {'parse s':>8}")
+    rng = random.Random(seed)
+    for name, (variables, terminals, productions, start) in GRAMMARS.items():
+        productions = {var: list(prods) for var, prods in productions.items()}
+        cnf = ChomskyNormalForm(set(variables), terminals, productions, start)
+        parser = CYKParser(cnf.convert_to_cnf(), cnf.start_symbol)
+        for n in sizes:
+            word = WORDS[name](n, rng)
+            times = []
+            for use_numpy in (False, True):
+                t0 = time.perf_counter()
+                assert parser.accepts(word, use_numpy)
+                times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            parser.parse(word)
+            times.append(time.perf_counter() - t0)
+            print(f'{name:>8} {len(word):>8} {times[0]:>9.3f} {times[1]:>8.3f} {times[2]:>8.3f}')
+
+
+# The original algorithm, kept for comparison: string productions,
+# fixpoint passes that rescan all productions until nothing changes, and
+# bodies rebuilt by string concatenation. It is not the original code:
+# empty bodies left by the null pass are dropped, and unit closures merge
+# the non-unit bodies computed up front, so its output can be checked
+# against ChomskyNormalForm. Its timings are the algorithm's, not the
+# old code's.
+class FixpointCNF:
+    def __init__(self, variables, terminals, productions, start_symbol):
+        self.variables = variables
+        self.terminals = terminals
+        self.productions = productions
+        self.start_symbol = start_symbol
+        self.new_variables = set(variables)
+
+    def convert_to_cnf(self):
+        self.remove_null_productions()
+        self.remove_unit_productions()
+        self.convert_to_proper_form()
+        return self.productions
+
+    def remove_null_productions(self):
+        nullable = set()
+        for var, prods in self.productions.items():
+            if 'ε' in prods:
+                nullable.add(var)
+
+        changes = True
+        while changes:
+            changes = False
+            for var, prods in self.productions.items():
+                for prod in prods:
+                    if all(symbol in nullable for symbol in prod):
+                        if var not in nullable:
+                            nullable.add(var)
+                            changes = True
+
+        for var in list(self.productions):
+            self.productions[var] = [prod for prod in self.productions[var] if prod != 'ε']
+            new_prods = set()
+            for prod in self.productions[var]:
+                new_prods.update(self.find_nullable_subsets(prod, nullable))
+            new_prods.discard('')
+            self.productions[var] = list(new_prods)
+
+    def find_nullable_subsets(self, production, nullable):
+        if not production:
+            return {''}
+        first, rest = production[0], production[1:]
+        subsets = self.find_nullable_subsets(rest, nullable)
+        if first in nullable:
+            return subsets | {first + subset for subset in subsets}
+        else:
+            return {first + subset for subset in subsets}
+
+    def remove_unit_productions(self):
+        units = {var: {var} for var in self.productions}
+        changes = True
+        while changes:
+            changes = False
+            for var, prods in self.productions.items():
+                for prod in prods:
+                    if len(prod) == 1 and prod in self.variables:
+                        new_units = units[var] | units[prod]
+                        if new_units != units[var]:
+                            units[var] = new_units
+                            changes = True
+        non_unit = {var: [prod for prod in prods if len(prod) != 1 or prod not in self.variables]
+                    for var, prods in self.productions.items()}
+        for var in units:
+            self.productions[var] = list(non_unit[var])
+            for unit in units[var]:
+                if unit != var:
+                    self.productions[var].extend(non_unit[unit])
+            self.productions[var] = list(set(self.productions[var]))
+
+
+    def convert_to_proper_form(self):
+        for var in list(self.productions):
+            new_prods = []
+            for prod in self.productions[var]:
+                if len(prod) <= 2:
+                    new_prods.append(prod)
+                else:
+                    current_var = prod[0]
+                    for i in range(1, len(prod) - 1):
+                        new_var = 'X' + str(len(self.new_variables))
+                        self.new_variables.add(new_var)
+                        self.productions[new_var] = [current_var + prod[i]]
+                        current_var = new_var
+                    new_prods.append(current_var + prod[-1])
+            self.productions[var] = list(set(new_prods))
+
+
+# Random grammar with n_vars one-character variables (taken from a Unicode
+# range so thousands fit). Variables come in chains of chain_length where
+# each derives the next one twice over and the last derives ε, so
+# nullability (and, once ε is removed, unit productions) has to travel
+# against the production order. The other bodies always hold a terminal.
+def random_grammar(n_vars, prods_per_var=4, max_length=4, chain_length=50, seed=0):
+    rng = random.Random(seed)
+    variables = [chr(0x100 + i) for i in range(n_vars)]
+    terminals = ['a', 'b', 'c']
+    productions = {}
+    for i, var in enumerate(variables):
+        last = (i + 1) % chain_length == 0 or i + 1 == n_vars
+        prods = ['ε' if last else variables[i + 1] * 2]
+        for _ in range(prods_per_var):
+            body = [rng.choice(variables) for _ in range(rng.randint(1, max_length - 1))]
+            body.insert(rng.randint(0, len(body)), rng.choice(terminals))
+            prods.append(''.join(body))
+        productions[var] = prods
+    return set(variables), set(terminals), productions, variables[0]
+
+
+def bench_passes(sizes, seed):
+    # Null and unit production removal on random grammars
+    print(f"{'variables':>9} {'rules':>7} {'fixpoint s':>11} {'worklist s':>11}")
+    for n in sizes:
+        results = []
+        for cls in (FixpointCNF, ChomskyNormalForm):
+            variables, terminals, productions, start = random_grammar(n, seed=seed)
+            cnf = cls(variables, terminals, productions, start)
+            t0 = time.perf_counter()
+            cnf.remove_null_productions()
+            cnf.remove_unit_productions()
+            results.append((time.perf_counter() - t0, {var: set(prods) for var, prods in cnf.productions.items()}))
+        assert results[0][1] == results[1][1]
+        n_rules = sum(map(len, random_grammar(n, seed=seed)[2].values()))
+        print(f'{n:>9} {n_rules:>7} {results[0][0]:>11.3f} {results[1][0]:>11.3f}')
+
+
+# The same kind of grammar with multi-character names and tuple bodies
+def named_grammar(n_vars, seed=0, **kwargs):
+    variables, terminals, productions, start = random_grammar(n_vars, seed=seed, **kwargs)
+    names = {chr(0x100 + i): f'N{i}' for i in range(n_vars)}
+    names.update({terminal: terminal.upper() + 'TOK' for terminal in terminals})
+    productions = {names[var]: [tuple(names[symbol] for symbol in prod) if prod != 'ε' else ()
+                                for prod in prods]
+                   for var, prods in productions.items()}
+    return set(names[var] for var in variables), set(names[t] for t in terminals), productions, names[start]
+
+
+def bench_convert(sizes, seed):
+    # Whole conversion: FixpointCNF and the interned converter on
+    # one-character symbols, and the interned one on named symbols. The
+    # interned times include decoding the result back to names.
+    print(f"{'variables':>9} {'fixpoint s':>14} {'fixpoint rules':>14} {'interned s':>11} {'named s':>8} "
+          f"{'rules':>8}")
+    for n in sizes:
+        times = []
+        sizes_out = []
+        for cls, make in [(FixpointCNF, random_grammar), (ChomskyNormalForm, random_grammar),
+                          (ChomskyNormalForm, named_grammar)]:
+            variables, terminals, productions, start = make(n, seed=seed)
+            t0 = time.perf_counter()
+            result = cls(variables, terminals, productions, start).convert_to_cnf()
+            times.append(time.perf_counter() - t0)
+            sizes_out.append(sum(map(len, result.values())))
+        print(f'{n:>9} {times[0]:>14.3f} {sizes_out[0]:>14} {times[1]:>11.3f} {times[2]:>8.3f} {sizes_out[1]:>8}')
+
+
+def bench_stages(n, seed):
+    # Grammar size after every stage of one conversion
+    cnf = ChomskyNormalForm(*random_grammar(n, seed=seed))
+    cnf.convert_to_cnf()
+    print(f"{'stage':>8} {'variables':>10} {'rules':>8} {'symbols':>8}")
+    for stage, n_variables, n_rules, n_symbols in cnf.stage_sizes:
+        print(f'{stage:>8} {n_variables:>10} {n_rules:>8} {n_symbols:>8}')
+
+
+BENCHMARKS = {
+    'cyk': lambda args: bench_cyk(args.sizes, args.seed),
+    'passes': lambda args: bench_passes(args.grammar_sizes, args.seed),
+    'convert': lambda args: bench_convert(args.grammar_sizes, args.seed),
+    'stages': lambda args: bench_stages(args.grammar_sizes[-1], args.seed),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='CNF/CYK benchmarks')
+    parser.add_argument('benchmarks', nargs='*', choices=[[]] + list(BENCHMARKS), default=[])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 1000, 2000, 4000])
+    parser.add_argument('--grammar-sizes', type=int, nargs='+', default=[250, 500, 1000, 2000])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    for name in args.benchmarks or BENCHMARKS:
+        print(f'== {name}')
+        BENCHMARKS[name](args)
@@ -1,83 +1,349 @@
+from collections import defaultdict, deque
+from itertools import product
+
+from cyk import split_body
+
+# Counter of conversions, worklist pops and fresh variables when set to a
+# collections.Counter; updated once per pass, never inside one
+counters = None
+
+
+# Variables reachable from each variable of a graph {var: [successors]},
+# itself included. The strongly connected components are found with an
+# iterative Tarjan; they complete in reverse topological order, so each
+# component's closure is its members plus the closures it points to,
+# computed once for all its members.
+def unit_closure(graph):
+    closures = {}
+    order = {}
+    low = {}
+    on_stack = set()
+    stack = []
+    for root in graph:
+        if root in order:
+            continue
+        order[root] = low[root] = len(order)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(graph.get(root, ())))]
+        while work:
+            v, successors = work[-1]
+            for w in successors:
+                if w not in order:
+                    order[w] = low[w] = len(order)
+                    stack.append(w)
+                    on_stack.add(w)
+                    work.append((w, iter(graph.get(w, ()))))
+                    break
+                if w in on_stack:
+                    low[v] = min(low[v], order[w])
+            else:
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    low[u] = min(low[u], low[v])
+                if low[v] == order[v]:
+                    members = []
+                    while True:
+                        w = stack.pop()
+                        on_stack.discard(w)
+                        members.append(w)
+                        if w == v:
+                            break
+                    closure = set(members)
+                    for member in members:
+                        for w in graph.get(member, ()):
+                            if w not in closure:
+                                closure |= closures[w]
+                    closure = frozenset(closure)
+                    for member in members:
+                        closures[member] = closure
+    return closures
+
+
 class ChomskyNormalForm:
+    # Productions are kept as {variable id: [tuple of symbol ids]} over a
+    # symbol table (symbols: id -> name, ids: name -> id). Bodies may be
+    # given as strings, split on the known variable and terminal names, or
+    # as sequences of names; `productions` gives them back in the same
+    # shape, strings again for string input, tuples of names otherwise.
     def __init__(self, variables, terminals, productions, start_symbol):
         self.variables = variables
         self.terminals = terminals
-        self.productions = productions
         self.start_symbol = start_symbol
         self.new_variables = set(variables)
+        self.symbols = []
+        self.ids = {}
+        self.variable_ids = set()
+        self.fresh_start = False
+        self.stage_sizes = []
+        self.string_bodies = all(isinstance(body, str) for bodies in productions.values() for body in bodies)
+        for var in variables:
+            self.variable_ids.add(self.intern(var))
+        self.productions = productions
+
+    def intern(self, symbol):
+        symbol_id = self.ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return symbol_id
+
+    @property
+    def productions(self):
+        # Equal bodies are shared between variables, so decode each once
+        symbols = self.symbols
+        decoded = {}
+        result = {}
+        for var, bodies in self.rules.items():
+            names = []
+            for body in bodies:
+                name = decoded.get(body)
+                if name is None:
+                    name = tuple(map(symbols.__getitem__, body))
+                    if self.string_bodies:
+                        name = ''.join(name) or 'ε'
+                    decoded[body] = name
+                names.append(name)
+            result[symbols[var]] = names
+        return result
+
+    @productions.setter
+    def productions(self, productions):
+        known = set(self.variables) | set(self.terminals) | set(productions)
+        max_length = max(map(len, known), default=1)
+        self.rules = {}
+        for var, bodies in productions.items():
+            var_id = self.intern(var)
+            self.variable_ids.add(var_id)
+            rule = self.rules[var_id] = []
+            for body in bodies:
+                if isinstance(body, str):
+                    body = split_body(body, known, max_length)
+                rule.append(tuple(self.intern(symbol) for symbol in body))
+
+    # Fresh variable X<n>, numbered as before but skipping taken names
+    def new_variable(self):
+        number = len(self.new_variables)
+        name = 'X' + str(number)
+        while name in self.ids:
+            number += 1
+            name = 'X' + str(number)
+        return self.add_variable(name)
 
+    def add_variable(self, name):
+        self.new_variables.add(name)
+        var_id = self.ids[name] = len(self.symbols)
+        self.symbols.append(name)
+        self.variable_ids.add(var_id)
+        return var_id
+
+    # (variables, productions, symbols on right-hand sides)
+    def size(self):
+        return (len(self.rules), sum(map(len, self.rules.values())),
+                sum(len(body) for bodies in self.rules.values() for body in bodies))
+
+    def record_size(self, stage):
+        self.stage_sizes.append((stage,) + self.size())
+
+    # START, TERM, DEL, UNIT, drop useless symbols, then BIN. Binarizing
+    # last keeps the shared fresh variables out of the nullable and unit
+    # passes, which would otherwise multiply the unit productions.
+    # stage_sizes records the grammar size after each stage.
     def convert_to_cnf(self):
-        self.remove_null_productions()
-        self.remove_unit_productions()
-        self.convert_to_proper_form()
+        self.stage_sizes = []
+        self.record_size('input')
+        for stage, step in [('START', self.add_start_symbol), ('TERM', self.replace_terminals),
+                            ('DEL', self.remove_null_productions), ('UNIT', self.remove_unit_productions),
+                            ('USELESS', self.remove_useless_symbols), ('BIN', self.convert_to_proper_form)]:
+            step()
+            self.record_size(stage)
+        if counters is not None:
+            counters['conversions'] += 1
+            counters['output_productions'] += self.stage_sizes[-1][2]
         return self.productions
 
+    # New start variable deriving the old one, when the old one appears on
+    # some right-hand side
+    def add_start_symbol(self):
+        start = self.intern(self.start_symbol)
+        if not any(start in body for bodies in self.rules.values() for body in bodies):
+            return
+        number = 0
+        while self.start_symbol + str(number) in self.ids:
+            number += 1
+        new_start = self.add_variable(self.start_symbol + str(number))
+        self.rules = {new_start: [(start,)], **self.rules}
+        self.start_symbol = self.symbols[new_start]
+        self.fresh_start = True
+
+    # Terminals inside bodies of two or more symbols get a variable of
+    # their own, one per terminal
+    def replace_terminals(self):
+        lifted = {}
+        for var, bodies in list(self.rules.items()):
+            new_bodies = []
+            for body in bodies:
+                if len(body) >= 2:
+                    new_body = []
+                    for symbol in body:
+                        if symbol not in self.variable_ids:
+                            if symbol not in lifted:
+                                lifted[symbol] = self.new_variable()
+                                self.rules[lifted[symbol]] = [(symbol,)]
+                            symbol = lifted[symbol]
+                        new_body.append(symbol)
+                    body = tuple(new_body)
+                new_bodies.append(body)
+            self.rules[var] = new_bodies
+
+    # The empty body survives only on a nullable start variable that no
+    # right-hand side mentions: the fresh one from START, or the original
+    # start when START had no reason to add one
     def remove_null_productions(self):
+        nullable = self.find_nullable()
+        start = self.intern(self.start_symbol)
+        keeps_empty = start in nullable and not any(start in body for bodies in self.rules.values()
+                                                    for body in bodies)
+        for var, bodies in self.rules.items():
+            new_bodies = {}
+            for body in bodies:
+                new_bodies.update(dict.fromkeys(self.find_nullable_subsets(body, nullable)))
+            if not (keeps_empty and var == start):
+                new_bodies.pop((), None)
+            self.rules[var] = list(new_bodies)
+
+    # Worklist: every production counts its symbols not yet known to be
+    # nullable, and is only looked at again when one of them becomes so
+    def find_nullable(self):
         nullable = set()
-        for var, prods in self.productions.items():
-            if 'ε' in prods:
-                nullable.add(var)
-
-        changes = True
-        while changes:
-            changes = False
-            for var, prods in self.productions.items():
-                for prod in prods:
-                    if all(symbol in nullable for symbol in prod):
-                        if var not in nullable:
-                            nullable.add(var)
-                            changes = True
-
-        for var in list(self.productions):
-            self.productions[var] = [prod for prod in self.productions[var] if prod != 'ε']
-            new_prods = set()
-            for prod in self.productions[var]:
-                subsets = self.find_nullable_subsets(prod, nullable)
-                new_prods.update(subsets)
-            self.productions[var] = list(new_prods)
+        queue = deque()
+        pending = []
+        heads = []
+        occurrences = defaultdict(list)
+        for var, bodies in self.rules.items():
+            for body in bodies:
+                if not body:
+                    if var not in nullable:
+                        nullable.add(var)
+                        queue.append(var)
+                    continue
+                index = len(pending)
+                pending.append(len(body))
+                heads.append(var)
+                for symbol in body:
+                    occurrences[symbol].append(index)
+
+        while queue:
+            symbol = queue.popleft()
+            for index in occurrences.pop(symbol, ()):
+                pending[index] -= 1
+                if pending[index] == 0 and heads[index] not in nullable:
+                    nullable.add(heads[index])
+                    queue.append(heads[index])
+        if counters is not None:
+            counters['nullable_pops'] += len(nullable)
+        return nullable
 
     def find_nullable_subsets(self, production, nullable):
-        if not production:
-            return {''}
-        first, rest = production[0], production[1:]
-        subsets = self.find_nullable_subsets(rest, nullable)
-        if first in nullable:
-            return subsets | {first + subset for subset in subsets}
-        else:
-            return {first + subset for subset in subsets}
+        choices = [(symbol, None) if symbol in nullable else (symbol,) for symbol in production]
+        return {tuple(symbol for symbol in choice if symbol is not None) for choice in product(*choices)}
+
+    def is_unit(self, body):
+        return len(body) == 1 and body[0] in self.variable_ids
 
     def remove_unit_productions(self):
-        units = {var: {var} for var in self.productions}
-        changes = True
-        while changes:
-            changes = False
-            for var, prods in self.productions.items():
-                for prod in prods:
-                    if len(prod) == 1 and prod in self.variables:
-                        new_units = units[var] | units[prod]
-                        if new_units != units[var]:
-                            units[var] = new_units
-                            changes = True
-        for var in units:
-            self.productions[var] = [prod for prod in self.productions[var] if
-                                     len(prod) != 1 or prod not in self.variables]
+        units = unit_closure({var: [body[0] for body in bodies if self.is_unit(body)]
+                              for var, bodies in self.rules.items()})
+        non_unit = {var: [body for body in bodies if not self.is_unit(body)]
+                    for var, bodies in self.rules.items()}
+        for var in self.rules:
+            new_bodies = dict.fromkeys(non_unit[var])
             for unit in units[var]:
                 if unit != var:
-                    self.productions[var].extend(self.productions[unit])
-            self.productions[var] = list(set(self.productions[var]))
+                    new_bodies.update(dict.fromkeys(non_unit.get(unit, ())))
+            self.rules[var] = list(new_bodies)
 
+    # Left-nested: A -> B C D becomes A -> X D, X -> B C. Equal prefixes
+    # share one fresh variable across all productions.
     def convert_to_proper_form(self):
-        for var in list(self.productions):
-            new_prods = []
-            for prod in self.productions[var]:
-                if len(prod) <= 2:
-                    new_prods.append(prod)
-                else:
-                    current_var = prod[0]
-                    for i in range(1, len(prod) - 1):
-                        new_var = 'X' + str(len(self.new_variables))
-                        self.new_variables.add(new_var)
-                        self.productions[new_var] = [current_var + prod[i]]
+        rules = self.rules
+        pairs = {}
+        for var in list(rules):
+            new_bodies = {}
+            for body in rules[var]:
+                if len(body) > 2:
+                    current_var = body[0]
+                    for symbol in body[1:-1]:
+                        pair = (current_var, symbol)
+                        new_var = pairs.get(pair)
+                        if new_var is None:
+                            new_var = pairs[pair] = self.new_variable()
+                            rules[new_var] = [pair]
                         current_var = new_var
-                    new_prods.append(current_var + prod[-1])
-            self.productions[var] = list(set(new_prods))
+                    body = (current_var, body[-1])
+                new_bodies[body] = None
+            rules[var] = list(new_bodies)
+        if counters is not None:
+            counters['binary_variables'] += len(pairs)
+
+    # Drop variables that derive no terminal string, then those the start
+    # symbol cannot reach, with every production that mentions them. After
+    # unit removal many variables share the same bodies, so both passes
+    # look at each distinct body once.
+    def remove_useless_symbols(self):
+        variable_ids = self.variable_ids
+        body_heads = defaultdict(list)
+        for var, bodies in self.rules.items():
+            for body in bodies:
+                body_heads[body].append(var)
+
+        productive = set()
+        queue = deque()
+        pending = {}
+        occurrences = defaultdict(list)
+        for body, heads in body_heads.items():
+            variables = variable_ids.intersection(body)
+            if variables:
+                pending[body] = len(variables)
+                for symbol in variables:
+                    occurrences[symbol].append(body)
+                continue
+            for var in heads:
+                if var not in productive:
+                    productive.add(var)
+                    queue.append(var)
+        while queue:
+            symbol = queue.popleft()
+            for body in occurrences.pop(symbol, ()):
+                pending[body] -= 1
+                if pending[body] == 0:
+                    for var in body_heads[body]:
+                        if var not in productive:
+                            productive.add(var)
+                            queue.append(var)
+        unproductive = variable_ids - productive
+
+        start = self.intern(self.start_symbol)
+        reachable = {start}
+        queue = deque([start])
+        seen = set()
+        rules = {}
+        while queue:
+            var = queue.popleft()
+            bodies = self.rules.get(var, [])
+            if unproductive:
+                bodies = [body for body in bodies if unproductive.isdisjoint(body)]
+            rules[var] = bodies
+            for body in bodies:
+                if body in seen:
+                    continue
+                seen.add(body)
+                for symbol in body:
+                    if symbol not in reachable and symbol in variable_ids:
+                        reachable.add(symbol)
+                        queue.append(symbol)
+        # Keep the original variable order
+        self.rules = {var: rules[var] for var in self.rules if var in rules}
+        if start not in self.rules:
+            self.rules[start] = []
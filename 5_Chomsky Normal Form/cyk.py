@@ -0,0 +1,291 @@
+from collections import deque
+
+EPSILON = 'ε'
+
+
+def iter_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Split a string body such as 'X1c' into symbols, longest known symbol
+# first (variables, and terminals longer than one character); anything
+# else is a one-character terminal. 'ε' is the empty body. Tuple and list
+# bodies are already split.
+def split_body(body, known, max_length=None):
+    if not isinstance(body, str):
+        return tuple(body)
+    if body == EPSILON:
+        return ()
+    if max_length is None:
+        max_length = max(map(len, known), default=1)
+    symbols = []
+    i = 0
+    while i < len(body):
+        for length in range(min(max_length, len(body) - i), 0, -1):
+            if body[i:i + length] in known:
+                break
+        else:
+            length = 1
+        symbols.append(body[i:i + length])
+        i += length
+    return tuple(symbols)
+
+
+class CYKParser:
+    # CYK over a grammar in the shape convert_to_cnf returns: bodies of one
+    # or two symbols, where a terminal may also appear in a two-symbol body
+    # and one-symbol bodies may still be unit productions. Every symbol,
+    # terminals included, is interned to a bit. One-symbol rules are folded
+    # into closures (the heads deriving a symbol through a chain of them),
+    # and the binary rules are indexed by (B, C) pair and by left symbol.
+    #
+    # The chart keeps, per symbol X, starts[X][i]: a bitset of the ends k
+    # with X =>* w[i:k], and ends[X][k]: a bitset of the starts i. A rule
+    # A -> B C covers w[i:k] iff starts[B][i] & ends[C][k] is non-zero,
+    # which tests every split point at once.
+    def __init__(self, productions, start_symbol):
+        self.start_symbol = start_symbol
+        nonterminals = set(productions)
+        max_length = max(map(len, nonterminals), default=1)
+        self.symbols = []
+        self.ids = {}
+
+        def intern(symbol):
+            if symbol not in self.ids:
+                self.ids[symbol] = len(self.symbols)
+                self.symbols.append(symbol)
+            return self.ids[symbol]
+
+        self.nullable_start = False
+        self.unit_rules = {}    # body symbol -> heads with head -> symbol
+        self.binary_rules = []  # (head, B, C)
+        intern(start_symbol)
+        for head in productions:
+            intern(head)
+        for head, bodies in productions.items():
+            head_id = self.ids[head]
+            for body in bodies:
+                if body == EPSILON or len(body) == 0:
+                    self.nullable_start = self.nullable_start or head == start_symbol
+                    continue
+                symbols = [intern(symbol) for symbol in split_body(body, nonterminals, max_length)]
+                if len(symbols) == 1:
+                    self.unit_rules.setdefault(symbols[0], set()).add(head_id)
+                elif len(symbols) == 2:
+                    self.binary_rules.append((head_id, symbols[0], symbols[1]))
+                else:
+                    raise ValueError(f'Production {head} -> {body} is not in CNF')
+        self.is_terminal = [symbol not in nonterminals for symbol in self.symbols]
+        self.unit_bodies = {}
+        for body, heads in self.unit_rules.items():
+            for head in heads:
+                self.unit_bodies.setdefault(head, []).append(body)
+
+        # closure[Y]: bitset of the symbols X with X =>* Y by one-symbol rules
+        self.closure = []
+        for symbol_id in range(len(self.symbols)):
+            mask = 1 << symbol_id
+            queue = deque([symbol_id])
+            while queue:
+                for head in self.unit_rules.get(queue.popleft(), ()):
+                    if not mask >> head & 1:
+                        mask |= 1 << head
+                        queue.append(head)
+            self.closure.append(mask)
+
+        self.pair_heads = {}
+        for head, left, right in self.binary_rules:
+            self.pair_heads[(left, right)] = self.pair_heads.get((left, right), 0) | self.closure[head]
+        self.by_left = {}
+        for (left, right), heads in self.pair_heads.items():
+            self.by_left.setdefault(left, []).append((right, heads))
+
+    def symbol_ids(self, word):
+        # Terminal ids of the input, None when a symbol is not in the grammar
+        ids = []
+        for symbol in word:
+            symbol_id = self.ids.get(symbol)
+            if symbol_id is None or not self.is_terminal[symbol_id]:
+                return None
+            ids.append(symbol_id)
+        return ids
+
+    def chart(self, word, use_numpy=False):
+        ids = self.symbol_ids(word)
+        if ids is None:
+            return None
+        if use_numpy:
+            return _NumpyChart(self, ids)
+        return _BitChart(self, ids)
+
+    def accepts(self, word, use_numpy=False):
+        if len(word) == 0:
+            return self.nullable_start
+        chart = self.chart(word, use_numpy)
+        return chart is not None and chart.contains(self.ids[self.start_symbol], 0, len(word))
+
+    def parse(self, word, use_numpy=False):
+        # Parse tree as nested tuples (symbol, child, ...), a leaf being
+        # (symbol, terminal); None when the word is rejected
+        if len(word) == 0:
+            return (self.start_symbol, EPSILON) if self.nullable_start else None
+        chart = self.chart(word, use_numpy)
+        start = self.ids[self.start_symbol]
+        if chart is None or not chart.contains(start, 0, len(word)):
+            return None
+        return self._build_tree(chart, list(word), start)
+
+    # Shortest chain of one-symbol rules from symbol_id down to each
+    # symbol it derives that way, as {symbol: [symbol_id, ..., symbol]}
+    def _unit_paths(self, symbol_id):
+        paths = {symbol_id: [symbol_id]}
+        queue = deque([symbol_id])
+        while queue:
+            current = queue.popleft()
+            for body in self.unit_bodies.get(current, ()):
+                if body not in paths:
+                    paths[body] = paths[current] + [body]
+                    queue.append(body)
+        return paths
+
+    def _build_tree(self, chart, word, start):
+        unit_paths = {}
+        rules_by_head = {}
+        for head, left, right in self.binary_rules:
+            rules_by_head.setdefault(head, []).append((left, right))
+
+        # Explicit stack of (symbol, i, k, parent node); nodes are lists
+        # until the end, a unit chain becoming nested one-child nodes
+        root = []
+        stack = [(start, 0, len(word), root)]
+        while stack:
+            symbol_id, i, k, node = stack.pop()
+            if symbol_id not in unit_paths:
+                unit_paths[symbol_id] = self._unit_paths(symbol_id)
+            paths = unit_paths[symbol_id]
+            if k - i == 1:
+                path = paths[self.ids[word[i]]]
+                for symbol in path[:-1]:
+                    child = [self.symbols[symbol]]
+                    node.append(child)
+                    node = child
+                node.append(word[i])
+                continue
+            path, (left, right, j) = self._find_split(chart, paths, rules_by_head, i, k)
+            for symbol in path:
+                child = [self.symbols[symbol]]
+                node.append(child)
+                node = child
+            stack.append((right, j, k, node))
+            stack.append((left, i, j, node))
+        return _freeze(root[0])
+
+    def _find_split(self, chart, paths, rules_by_head, i, k):
+        for target, path in paths.items():
+            for left, right in rules_by_head.get(target, ()):
+                j = chart.first_split(left, right, i, k)
+                if j is not None:
+                    return path, (left, right, j)
+        raise AssertionError('Chart entry without a derivation')
+
+
+def _freeze(node):
+    # Nested lists -> nested tuples, iteratively
+    stack = [(node, False)]
+    results = []
+    while stack:
+        current, visited = stack.pop()
+        if not isinstance(current, list):
+            results.append(current)
+        elif not visited:
+            stack.append((current, True))
+            stack.extend((child, False) for child in reversed(current))
+        else:
+            n = len(current)
+            items = results[-n:]
+            del results[-n:]
+            results.append(tuple(items))
+    return results.pop()
+
+
+class _BitChart:
+    # Chart of Python int bitsets
+    def __init__(self, parser, ids):
+        n = len(ids)
+        size = len(parser.symbols)
+        self.starts = starts = [[0] * (n + 1) for _ in range(size)]
+        self.ends = ends = [[0] * (n + 1) for _ in range(size)]
+        closure = parser.closure
+        for i, symbol_id in enumerate(ids):
+            for x in iter_bits(closure[symbol_id]):
+                starts[x][i] |= 1 << (i + 1)
+                ends[x][i + 1] |= 1 << i
+
+        by_left = list(parser.by_left.items())
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                k = i + length
+                cell = 0
+                for left, rules in by_left:
+                    left_ends = starts[left][i]
+                    if not left_ends:
+                        continue
+                    for right, heads in rules:
+                        if heads & ~cell and left_ends & ends[right][k]:
+                            cell |= heads
+                for x in iter_bits(cell):
+                    starts[x][i] |= 1 << k
+                    ends[x][k] |= 1 << i
+
+    def contains(self, symbol_id, i, k):
+        return bool(self.starts[symbol_id][i] >> k & 1)
+
+    def first_split(self, left, right, i, k):
+        splits = self.starts[left][i] & self.ends[right][k]
+        return (splits & -splits).bit_length() - 1 if splits else None
+
+
+class _NumpyChart:
+    # Same chart as packed uint64 rows; each span length is filled for all
+    # start positions at once, one vectorized AND per (B, C) pair
+    def __init__(self, parser, ids):
+        import numpy as np
+        self.np = np
+        n = len(ids)
+        size = len(parser.symbols)
+        words = n // 64 + 1
+        self.starts = starts = np.zeros((size, n + 1, words), dtype=np.uint64)
+        self.ends = ends = np.zeros((size, n + 1, words), dtype=np.uint64)
+        closure = parser.closure
+        for i, symbol_id in enumerate(ids):
+            for x in iter_bits(closure[symbol_id]):
+                starts[x, i, (i + 1) >> 6] |= np.uint64(1 << ((i + 1) & 63))
+                ends[x, i + 1, i >> 6] |= np.uint64(1 << (i & 63))
+
+        pairs = [(left, right, list(iter_bits(heads))) for (left, right), heads in parser.pair_heads.items()]
+        for length in range(2, n + 1):
+            count = n - length + 1
+            cells = np.zeros((size, count), dtype=bool)
+            for left, right, heads in pairs:
+                hits = (starts[left, :count] & ends[right, length:]).any(axis=1)
+                cells[heads] |= hits
+            positions = np.arange(count)
+            for x in np.flatnonzero(cells.any(axis=1)):
+                i = positions[cells[x]]
+                k = i + length
+                starts[x, i, k >> 6] |= np.left_shift(np.uint64(1), (k & 63).astype(np.uint64))
+                ends[x, k, i >> 6] |= np.left_shift(np.uint64(1), (i & 63).astype(np.uint64))
+
+    def contains(self, symbol_id, i, k):
+        return bool(int(self.starts[symbol_id, i, k >> 6]) >> (k & 63) & 1)
+
+    def first_split(self, left, right, i, k):
+        row = self.starts[left, i] & self.ends[right, k]
+        nonzero = self.np.flatnonzero(row)
+        if not len(nonzero):
+            return None
+        word = int(row[nonzero[0]])
+        return int(nonzero[0]) * 64 + (word & -word).bit_length() - 1
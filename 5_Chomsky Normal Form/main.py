@@ -14,4 +14,7 @@ start_symbol = 'S'
 
 cnf_converter = ChomskyNormalForm(variables, terminals, productions, start_symbol)
 cnf_productions = cnf_converter.convert_to_cnf()
-print(cnf_productions)
\ No newline at end of file
+print(cnf_productions)
+
+for stage, n_variables, n_productions, n_symbols in cnf_converter.stage_sizes:
+    print(f'{stage}: {n_variables} variables, {n_productions} productions, {n_symbols} symbols')
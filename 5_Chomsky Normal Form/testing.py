@@ -1,5 +1,7 @@
+import itertools
 import unittest
 from converter import ChomskyNormalForm
+from cyk import CYKParser, split_body
 class TestChomskyNormalForm(unittest.TestCase):
 
     def sort_productions(self, productions):
@@ -17,13 +19,24 @@ class TestChomskyNormalForm(unittest.TestCase):
         start_symbol = 'S'
         cnf = ChomskyNormalForm(variables, terminals, productions, start_symbol)
         cnf.remove_null_productions()
+        # S is on no right-hand side, so it keeps the empty word
         expected_productions = {
-            'S': ['AB', 'B'],
+            'S': ['AB', 'B', 'ε'],
             'A': ['a'],
             'B': ['b']
         }
         self.assertDictEqual(self.sort_productions(cnf.productions), self.sort_productions(expected_productions))
 
+    def test_nullable_start_without_fresh_start(self):
+        cnf = ChomskyNormalForm({'S'}, {'a', 'b'}, {'S': ['ab', 'ε']}, 'S')
+        productions = cnf.convert_to_cnf()
+        self.assertFalse(cnf.fresh_start)
+        self.assertIn('ε', productions['S'])
+        parser = CYKParser(productions, cnf.start_symbol)
+        self.assertTrue(parser.accepts(''))
+        self.assertTrue(parser.accepts('ab'))
+        self.assertFalse(parser.accepts('a'))
+
     def test_remove_unit_productions(self):
         variables = {'S', 'A', 'B'}
         terminals = {'a', 'b'}
@@ -35,8 +48,9 @@ class TestChomskyNormalForm(unittest.TestCase):
         start_symbol = 'S'
         cnf = ChomskyNormalForm(variables, terminals, productions, start_symbol)
         cnf.remove_unit_productions()
+        # S -> A is itself a unit production and must not survive
         expected_productions = {
-            'S': ['a', 'A'],
+            'S': ['a'],
             'A': ['a'],
             'B': ['a']
         }
@@ -57,6 +71,23 @@ class TestChomskyNormalForm(unittest.TestCase):
         }
         self.assertDictEqual(self.sort_productions(cnf.productions), self.sort_productions(expected_productions))
 
+    def test_proper_form_shares_prefixes(self):
+        variables = {'S', 'A'}
+        terminals = {'a', 'b', 'c', 'd'}
+        productions = {
+            'S': ['abc', 'abd'],
+            'A': ['abcd']
+        }
+        cnf = ChomskyNormalForm(variables, terminals, productions, 'S')
+        cnf.convert_to_proper_form()
+        expected_productions = {
+            'S': ['X2c', 'X2d'],
+            'A': ['X3d'],
+            'X2': ['ab'],
+            'X3': ['X2c']
+        }
+        self.assertDictEqual(self.sort_productions(cnf.productions), self.sort_productions(expected_productions))
+
     def test_full_conversion_to_cnf(self):
         variables = {'S', 'A', 'B', 'C'}
         terminals = {'a', 'b'}
@@ -69,13 +100,126 @@ class TestChomskyNormalForm(unittest.TestCase):
         start_symbol = 'S'
         cnf = ChomskyNormalForm(variables, terminals, productions, start_symbol)
         cnf_productions = cnf.convert_to_cnf()
+        # S appears in B -> S, so a fresh start S0 takes over; S itself
+        # becomes unreachable once unit productions are gone
         expected_productions = {
-            'S': ['b', 'S', 'AB', 'BC'],
+            'S0': ['b', 'AB', 'BC'],
             'A': ['a'],
-            'B': ['b', 'S', 'AB', 'BC'],
+            'B': ['b', 'AB', 'BC'],
             'C': ['c']
         }
         self.assertDictEqual(self.sort_productions(cnf_productions), self.sort_productions(expected_productions))
+        self.assertEqual(cnf.start_symbol, 'S0')
+        self.assertEqual([stage for stage, *_ in cnf.stage_sizes],
+                         ['input', 'START', 'TERM', 'DEL', 'UNIT', 'USELESS', 'BIN'])
+        self.assertEqual(cnf.stage_sizes[0][1:], (4, 8, 8))
+        self.assertEqual(cnf.stage_sizes[-1][1:], (4, 8, 12))
+
+    def test_terminals_and_useless_symbols(self):
+        variables = {'S', 'A', 'U', 'R'}
+        terminals = {'a', 'b'}
+        productions = {
+            'S': ['aSb', 'ε', 'A'],
+            'A': ['aU', 'a'],
+            'U': ['Ub'],  # Unproductive
+            'R': ['a']  # Unreachable
+        }
+        cnf = ChomskyNormalForm(variables, terminals, productions, 'S')
+        cnf_productions = cnf.convert_to_cnf()
+        self.assertNotIn('U', cnf_productions)
+        self.assertNotIn('R', cnf_productions)
+        self.assertIn('ε', cnf_productions[cnf.start_symbol])
+        for var, bodies in cnf_productions.items():
+            for body in bodies:
+                self.assertTrue(body in terminals or body == 'ε' and var == cnf.start_symbol or
+                                len(body) >= 2 and all(symbol not in terminals for symbol in body))
+        parser = CYKParser(cnf_productions, cnf.start_symbol)
+        for word in ['', 'a', 'ab', 'aab', 'aaabb']:
+            self.assertTrue(parser.accepts(word))
+        for word in ['b', 'ba', 'abb', 'aabbb']:
+            self.assertFalse(parser.accepts(word))
+
+    def test_named_symbols(self):
+        variables = {'Expr', 'Term'}
+        terminals = {'NUM', 'PLUS', 'LP', 'RP'}
+        productions = {
+            'Expr': [('Expr', 'PLUS', 'Term'), ('Term',)],
+            'Term': [('NUM',), ('LP', 'Expr', 'RP')]
+        }
+        cnf = ChomskyNormalForm(variables, terminals, productions, 'Expr')
+        cnf_productions = cnf.convert_to_cnf()
+        for bodies in cnf_productions.values():
+            for body in bodies:
+                self.assertTrue(len(body) == 1 and body[0] in terminals or
+                                len(body) == 2 and not terminals & set(body))
+        parser = CYKParser(cnf_productions, cnf.start_symbol)
+        self.assertTrue(parser.accepts(['NUM', 'PLUS', 'LP', 'NUM', 'PLUS', 'NUM', 'RP']))
+        self.assertFalse(parser.accepts(['NUM', 'PLUS']))
+
+    def test_fresh_variables_skip_taken_names(self):
+        variables = {'S', 'X2'}
+        terminals = {'a', 'b', 'c'}
+        productions = {
+            'S': ['abX2'],
+            'X2': ['c']
+        }
+        cnf = ChomskyNormalForm(variables, terminals, productions, 'S')
+        cnf.convert_to_proper_form()
+        expected_productions = {
+            'S': ['X3X2'],
+            'X2': ['c'],
+            'X3': ['ab']
+        }
+        self.assertDictEqual(self.sort_productions(cnf.productions), self.sort_productions(expected_productions))
+
+
+class TestCYK(unittest.TestCase):
+
+    def dyck_parser(self):
+        cnf = ChomskyNormalForm({'S'}, {'a', 'b'}, {'S': ['aSb', 'SS', 'ab']}, 'S')
+        return CYKParser(cnf.convert_to_cnf(), cnf.start_symbol)
+
+    def is_balanced(self, word):
+        depth = 0
+        for symbol in word:
+            depth += 1 if symbol == 'a' else -1
+            if depth < 0:
+                return False
+        return depth == 0 and word != ''
+
+    def test_accepts_matches_language(self):
+        parser = self.dyck_parser()
+        for n in range(9):
+            for word in map(''.join, itertools.product('ab', repeat=n)):
+                self.assertEqual(parser.accepts(word), self.is_balanced(word))
+                self.assertEqual(parser.accepts(word, use_numpy=True), self.is_balanced(word))
+        self.assertFalse(parser.accepts('abc'))
+
+    def test_parse_tree(self):
+        parser = self.dyck_parser()
+        tree = parser.parse('aabbab')
+        self.assertEqual(tree, ('S0', ('S', ('X4', ('X2', 'a'), ('S', ('X2', 'a'), ('X3', 'b'))), ('X3', 'b')),
+                                ('S', ('X2', 'a'), ('X3', 'b'))))
+        self.assertEqual(parser.parse('aabbab', use_numpy=True), tree)
+        self.assertIsNone(parser.parse('abba'))
+
+    def test_unit_chains_and_named_symbols(self):
+        self.assertEqual(split_body('X10c', {'S', 'X1', 'X10'}), ('X10', 'c'))
+        productions = {
+            'Sentence': [('NP', 'VP')],
+            'NP': [('Det', 'Noun'), ('Noun',)],
+            'VP': [('Verb', 'NP'), ('Verb',)],
+            'Det': [('the',)],
+            'Noun': [('cat',), ('fish',)],
+            'Verb': [('eats',)],
+        }
+        parser = CYKParser(productions, 'Sentence')
+        self.assertTrue(parser.accepts(['the', 'cat', 'eats', 'fish']))
+        self.assertFalse(parser.accepts(['the', 'eats']))
+        self.assertEqual(parser.parse(['fish', 'eats']),
+                         ('Sentence', ('NP', ('Noun', 'fish')), ('VP', ('Verb', 'eats'))))
+        self.assertTrue(CYKParser({'S': ['ε', 'ab']}, 'S').accepts(''))
+
 
 if __name__ == '__main__':
     unittest.main()
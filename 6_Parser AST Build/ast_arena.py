@@ -0,0 +1,218 @@
+import struct
+from array import array
+
+from my_ast import BinOp, Num
+from my_token import Token, TokenArray
+from token_type import TokenType
+
+# Node kinds
+NUM, BINOP = 0, 1
+NO_CHILD = -1
+
+_HEADER = struct.Struct('<4sqqq')  # magic, node count, root, overflow count
+_MAGIC = b'AST1'
+_OP_SYMBOLS = {TokenType.PLUS: '+', TokenType.MINUS: '-'}
+
+
+# AST stored as parallel typed arrays instead of one object per node.
+# Node i is kinds[i]; a BinOp has children lefts[i], rights[i] and operator
+# ops[i] (a TokenType id), a Num keeps its value in values[i]. Integers
+# that do not fit in 64 bits are kept in `overflow`. Children are always
+# added before their parent, so every child index is smaller.
+class ASTArena:
+    def __init__(self):
+        self.kinds = array('B')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.ops = array('B')
+        self.values = array('q')
+        self.overflow = {}
+        self.root = NO_CHILD
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def add_num(self, value):
+        index = len(self.kinds)
+        try:
+            self.values.append(value)
+        except OverflowError:
+            self.values.append(0)
+            self.overflow[index] = value
+        self.kinds.append(NUM)
+        self.lefts.append(NO_CHILD)
+        self.rights.append(NO_CHILD)
+        self.ops.append(0)
+        return index
+
+    def add_binop(self, left, op_type, right):
+        index = len(self.kinds)
+        self.kinds.append(BINOP)
+        self.lefts.append(left)
+        self.rights.append(right)
+        self.ops.append(TokenArray.TYPE_IDS[op_type])
+        self.values.append(0)
+        return index
+
+    def value(self, index):
+        if index in self.overflow:
+            return self.overflow[index]
+        return self.values[index]
+
+    def op(self, index):
+        return TokenArray.TYPES[self.ops[index]]
+
+    def node(self, index):
+        return ArenaNode(self, index)
+
+    @property
+    def root_node(self):
+        return None if self.root == NO_CHILD else ArenaNode(self, self.root)
+
+    @classmethod
+    def from_ast(cls, node):
+        # Post-order copy of an object AST (BinOp, Num or NaryOp)
+        arena = cls()
+        if node is None:
+            return arena
+        indices = []
+        stack = [(node, False)]
+        while stack:
+            current, visited = stack.pop()
+            if isinstance(current, Num):
+                indices.append(arena.add_num(current.value))
+            elif not visited:
+                stack.append((current, True))
+                if isinstance(current, BinOp):
+                    stack.extend([(current.right, False), (current.left, False)])
+                else:
+                    stack.extend((operand, False) for operand in reversed(current.operands))
+            elif isinstance(current, BinOp):
+                right = indices.pop()
+                indices.append(arena.add_binop(indices.pop(), current.op.type, right))
+            else:
+                n = len(current.operands)
+                operands = indices[-n:]
+                del indices[-n:]
+                left = operands[0]
+                for op, right in zip(current.ops, operands[1:]):
+                    left = arena.add_binop(left, op.type, right)
+                indices.append(left)
+        arena.root = indices.pop()
+        return arena
+
+    def to_ast(self):
+        # Rebuild BinOp/Num objects; children come first, so one pass will do
+        if self.root == NO_CHILD:
+            return None
+        nodes = []
+        for i in range(self.root + 1):
+            if self.kinds[i] == NUM:
+                nodes.append(Num(Token(TokenType.INTEGER, self.value(i))))
+            else:
+                op = self.op(i)
+                nodes.append(BinOp(nodes[self.lefts[i]], Token(op, _OP_SYMBOLS[op]), nodes[self.rights[i]]))
+        return nodes[self.root]
+
+    def evaluate(self):
+        # One linear pass in index order, children before parents
+        if self.root == NO_CHILD:
+            return None
+        kinds, lefts, rights, ops = self.kinds, self.lefts, self.rights, self.ops
+        plus = TokenArray.TYPE_IDS[TokenType.PLUS]
+        results = []
+        for i in range(self.root + 1):
+            if kinds[i] == NUM:
+                results.append(self.value(i))
+            elif ops[i] == plus:
+                results.append(results[lefts[i]] + results[rights[i]])
+            else:
+                results.append(results[lefts[i]] - results[rights[i]])
+        return results[self.root]
+
+    def print_ast(self, index=None, level=0):
+        # Same output as my_ast.print_ast, from the arrays
+        stack = [(self.root if index is None else index, level)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                print(item)
+                continue
+            i, level = item
+            if i == NO_CHILD:
+                continue
+            indent = '  ' * level
+            if self.kinds[i] == NUM:
+                print(f'{indent}Num: {self.value(i)}')
+                continue
+            stack.extend(reversed([
+                f'{indent}BinOp:',
+                f'{indent}  Left:', (self.lefts[i], level + 2),
+                f'{indent}  Op: {_OP_SYMBOLS[self.op(i)]}',
+                f'{indent}  Right:', (self.rights[i], level + 2),
+            ]))
+
+    def to_bytes(self):
+        overflow = b''.join(struct.pack('<qi', i, len(str(v))) + str(v).encode('ascii')
+                            for i, v in sorted(self.overflow.items()))
+        return b''.join([_HEADER.pack(_MAGIC, len(self), self.root, len(self.overflow)),
+                         self.kinds.tobytes(), self.lefts.tobytes(), self.rights.tobytes(),
+                         self.ops.tobytes(), self.values.tobytes(), overflow])
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = memoryview(data)
+        magic, n, root, n_overflow = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError('Not a serialized AST arena')
+        arena = cls()
+        arena.root = root
+        offset = _HEADER.size
+        for name in ('kinds', 'lefts', 'rights', 'ops', 'values'):
+            column = getattr(arena, name)
+            size = n * column.itemsize
+            column.frombytes(data[offset:offset + size])
+            offset += size
+        for _ in range(n_overflow):
+            i, length = struct.unpack_from('<qi', data, offset)
+            offset += 12
+            arena.overflow[i] = int(bytes(data[offset:offset + length]))
+            offset += length
+        return arena
+
+
+# Thin read-only view of one arena node, with the attribute names of the
+# object AST
+class ArenaNode:
+    __slots__ = ('arena', 'index')
+
+    def __init__(self, arena, index):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def is_num(self):
+        return self.arena.kinds[self.index] == NUM
+
+    @property
+    def value(self):
+        return self.arena.value(self.index) if self.is_num else None
+
+    @property
+    def left(self):
+        return None if self.is_num else ArenaNode(self.arena, self.arena.lefts[self.index])
+
+    @property
+    def right(self):
+        return None if self.is_num else ArenaNode(self.arena, self.arena.rights[self.index])
+
+    # Operator as a Token, like BinOp.op
+    @property
+    def op(self):
+        if self.is_num:
+            return None
+        op = self.arena.op(self.index)
+        return Token(op, _OP_SYMBOLS[op])
+
+    def children(self):
+        return [] if self.is_num else [self.left, self.right]
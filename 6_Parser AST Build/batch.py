@@ -0,0 +1,104 @@
+import argparse
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from my_lexer import Lexer, get_token_dfa
+from my_parser import Parser
+
+# What each input turns into: its value, or its AST as ASTArena.to_bytes()
+MODES = ('value', 'arena')
+
+
+def process_one(source, mode='value', is_file=False):
+    lexer = Lexer.from_file(source) if is_file else Lexer(source)
+    with lexer:
+        lexer.tokenize_array()
+        arena = Parser(lexer).parse_arena()
+        return arena.evaluate() if mode == 'value' else arena.to_bytes()
+
+
+# Results of one shard as (index, result); an input that fails to lex or
+# parse gets its exception as the result instead of stopping the batch
+def _process_chunk(mode, is_file, start, chunk):
+    results = []
+    for index, source in enumerate(chunk, start):
+        try:
+            results.append((index, process_one(source, mode, is_file)))
+        except Exception as error:
+            results.append((index, error))
+    return results
+
+
+def _chunks(inputs, chunk_size):
+    iterator = iter(inputs)
+    start = 0
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+# Lex and parse many inputs (texts, or file paths with files=True) across a
+# process pool, yielding (index, result) pairs. Inputs are read lazily and
+# sent in shards of chunk_size; at most max_pending shards (2 per worker by
+# default) are in flight or waiting to be delivered, so a huge or endless
+# input iterable is never read ahead. ordered=False yields each shard as
+# soon as it is done. workers=0 runs everything in this process.
+# The token DFA is compiled once here and once in every worker.
+def parse_batch(inputs, mode='value', workers=None, chunk_size=64, max_pending=None, ordered=True, files=False):
+    if mode not in MODES:
+        raise ValueError(f'Unknown mode {mode!r}, expected one of {MODES}')
+    get_token_dfa()
+    chunks = _chunks(inputs, chunk_size)
+    if workers == 0:
+        for start, chunk in chunks:
+            yield from _process_chunk(mode, files, start, chunk)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * workers
+    pool = ProcessPoolExecutor(workers, initializer=get_token_dfa)
+    try:
+        running = {}   # future -> shard number
+        done = {}      # shard number -> results not yet delivered
+        next_shard = 0
+        submitted = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(running) + len(done) < max_pending:
+                shard = next(chunks, None)
+                if shard is None:
+                    exhausted = True
+                    break
+                running[pool.submit(_process_chunk, mode, files, *shard)] = submitted
+                submitted += 1
+            if not running and not done:
+                return
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    done[running.pop(future)] = future.result()
+            if ordered:
+                while next_shard in done:
+                    yield from done.pop(next_shard)
+                    next_shard += 1
+            else:
+                for shard in list(done):
+                    yield from done.pop(shard)
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Evaluate expression files in parallel')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=64)
+    parser.add_argument('--unordered', action='store_true')
+    args = parser.parse_args()
+    for index, result in parse_batch(args.paths, 'value', args.workers, args.chunk_size,
+                                     ordered=not args.unordered, files=True):
+        print(f'{args.paths[index]}: {result}')
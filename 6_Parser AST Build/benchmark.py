@@ -0,0 +1,257 @@
+import argparse
+import os
+import random
+import re
+import time
+import tracemalloc
+
+from my_lexer import Lexer, token_specification, get_token_dfa
+from my_parser import Parser
+from evaluator import evaluate, compile_ast, run
+from incremental import IncrementalDocument
+from batch import parse_batch
+from token_type import TokenType
+
+
+# Random arithmetic expression with n_terms integer terms
+def random_expression(n_terms, seed=0, max_value=10 ** 6):
+    rng = random.Random(seed)
+    parts = [str(rng.randint(0, max_value))]
+    for _ in range(n_terms - 1):
+        parts.append(rng.choice('+-'))
+        parts.append(str(rng.randint(0, max_value)))
+    return ' '.join(parts)
+
+
+# The previous Lexer.tokenize: a regex alternation run with re.finditer
+def tokenize_with_re(text):
+    token_regex = '|'.join(f'(?P<{tok.name}>{pattern})' for tok, pattern in token_specification)
+    tokens = []
+    for mo in re.finditer(token_regex, text):
+        kind = mo.lastgroup
+        value = mo.group()
+        tok_type = TokenType[kind]
+        if tok_type == TokenType.INTEGER:
+            value = int(value)
+        tokens.append((tok_type, value))
+    tokens.append((TokenType.EOF, None))
+    return tokens
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_lexer(sizes, repeat):
+    get_token_dfa()  # compile outside the timed region
+    print(f"{'terms':>9} {'tokens':>9} {'re.finditer s':>14} {'DFA scan s':>11} {'speedup':>8}")
+    for n in sizes:
+        text = random_expression(n)
+        re_time, re_tokens = best_of(repeat, tokenize_with_re, text)
+
+        def dfa_tokenize():
+            lexer = Lexer(text)
+            lexer.tokenize()
+            return lexer.tokens
+
+        dfa_time, dfa_tokens = best_of(repeat, dfa_tokenize)
+        assert [(t.type, t.value) for t in dfa_tokens] == re_tokens
+        print(f'{n:>9} {len(dfa_tokens):>9} {re_time:>14.3f} {dfa_time:>11.3f} {re_time / dfa_time:>8.2f}')
+
+
+# The previous Token layout, a plain object with a __dict__, carrying the
+# same fields as the __slots__ Token
+class DictToken:
+    def __init__(self, type, value, start=None, end=None):
+        self.type = type
+        self.value = value
+        self.start = start
+        self.end = end
+
+
+def tokenize_dict_tokens(text):
+    tokens = []
+    for tok_type, start, end in get_token_dfa().scan(text):
+        value = text[start:end]
+        tokens.append(DictToken(tok_type, int(value) if tok_type == TokenType.INTEGER else value, start, end))
+    tokens.append(DictToken(TokenType.EOF, None))
+    return tokens
+
+
+def tokenize_slots_tokens(text):
+    lexer = Lexer(text)
+    lexer.tokenize()
+    return lexer.tokens
+
+
+def tokenize_token_array(text):
+    return Lexer(text).tokenize_array()
+
+
+def measure(func, *args):
+    # (seconds, bytes still held by the result, peak bytes while building it)
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - t0
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, current, peak
+
+
+def bench_tokens(sizes):
+    get_token_dfa()
+    layouts = [('__dict__ Token', tokenize_dict_tokens), ('__slots__ Token', tokenize_slots_tokens),
+               ('TokenArray', tokenize_token_array)]
+    print(f"{'terms':>9} {'layout':>16} {'peak MiB':>9} {'bytes/token':>12} {'seconds':>8}")
+    for n in sizes:
+        text = random_expression(n)
+        n_tokens = 2 * n + 1
+        for name, func in layouts:
+            elapsed, _, peak = measure(func, text)
+            print(f'{n:>9} {name:>16} {peak / 2 ** 20:>9.2f} {peak / n_tokens:>12.1f} {elapsed:>8.3f}')
+
+
+def parse(text):
+    return Parser(Lexer(text)).parse()
+
+
+def bench_eval(sizes, evaluations):
+    # Repeated evaluation of one parsed expression
+    print(f"{'terms':>9} {'tree walk s':>12} {'bytecode s':>11} {'folded s':>9} {'compile s':>10}")
+    for n in sizes:
+        ast = parse(random_expression(n))
+        t0 = time.perf_counter()
+        code = compile_ast(ast, fold=False)
+        folded = compile_ast(ast)
+        compile_time = time.perf_counter() - t0
+
+        results = []
+        for func, arg in [(evaluate, ast), (run, code), (run, folded)]:
+            t0 = time.perf_counter()
+            for _ in range(evaluations):
+                value = func(arg)
+            results.append((time.perf_counter() - t0, value))
+        assert len({value for _, value in results}) == 1
+        (walk, _), (bytecode, _), (constant, _) = results
+        print(f'{n:>9} {walk:>12.3f} {bytecode:>11.3f} {constant:>9.4f} {compile_time:>10.3f}')
+
+
+def bench_arena(sizes):
+    get_token_dfa()
+    layouts = [('BinOp/Num objects', lambda text: Parser(Lexer(text)).parse()),
+               ('ASTArena', lambda text: Parser(Lexer(text)).parse_arena())]
+    print(f"{'terms':>9} {'layout':>18} {'held MiB':>9} {'peak MiB':>9} {'bytes/node':>11} {'seconds':>8}")
+    for n in sizes:
+        text = random_expression(n)
+        n_nodes = 2 * n - 1
+        for name, func in layouts:
+            elapsed, current, peak = measure(func, text)
+            print(f'{n:>9} {name:>18} {current / 2 ** 20:>9.2f} {peak / 2 ** 20:>9.2f} '
+                  f'{current / n_nodes:>11.1f} {elapsed:>8.3f}')
+
+
+# Small edits that keep the expression valid: a digit replaced, inserted
+# before another digit, or a new term typed in after one
+def random_edits(text, n_edits, seed=0):
+    rng = random.Random(seed)
+    edits = []
+    for _ in range(n_edits):
+        offset = rng.randrange(len(text))
+        while not text[offset].isdigit():
+            offset = rng.randrange(len(text))
+        kind = rng.randrange(3)
+        if kind == 0:
+            edit = (offset, 1, rng.choice('123456789'))
+        elif kind == 1:
+            edit = (offset, 0, rng.choice('123456789'))
+        else:
+            edit = (offset, 0, f'{rng.randrange(1, 1000)} + ')
+        edits.append(edit)
+        offset, deleted, inserted = edit
+        text = text[:offset] + inserted + text[offset + deleted:]
+    return edits
+
+
+def bench_incremental(sizes, n_edits):
+    # Every edit followed by fetching the new tree, against a full re-lex
+    # and re-parse of the edited text
+    get_token_dfa()
+    print(f"{'terms':>9} {'mode':>18} {'ms/edit':>9} {'tokens lexed/edit':>18}")
+    for n in sizes:
+        text = random_expression(n)
+        edits = random_edits(text, n_edits)
+
+        t0 = time.perf_counter()
+        current = text
+        for offset, deleted, inserted in edits:
+            current = current[:offset] + inserted + current[offset + deleted:]
+            expected = parse(current)
+        elapsed = time.perf_counter() - t0
+        print(f'{n:>9} {"full re-parse":>18} {1000 * elapsed / n_edits:>9.3f} {current.count(" ") + 1:>18}')
+
+        for name, flat in [('incremental', False), ('incremental flat', True)]:
+            document = IncrementalDocument(text, flat=flat)
+            document.tree
+            relexed = 0
+            t0 = time.perf_counter()
+            for edit in edits:
+                tree = document.edit(*edit)
+                start, end = document.last_window
+                relexed += end - start
+            elapsed = time.perf_counter() - t0
+            assert document.text == current and evaluate(tree) == evaluate(expected)
+            print(f'{n:>9} {name:>18} {1000 * elapsed / n_edits:>9.3f} {relexed / n_edits:>18.1f}')
+
+
+def bench_batch(n_inputs, n_terms, worker_counts, chunk_size):
+    # Throughput of parse_batch over many small expressions; workers=0 is
+    # the same loop in this process, without the pool
+    texts = [random_expression(n_terms, seed=i) for i in range(n_inputs)]
+    print(f'{os.cpu_count()} CPUs, {n_inputs} inputs of {n_terms} terms, shards of {chunk_size}')
+    print(f"{'workers':>8} {'mode':>6} {'ordered':>8} {'inputs/s':>10} {'speedup':>8}")
+    for mode in ('value', 'arena'):
+        baseline = None
+        for workers in worker_counts:
+            for ordered in ((True, False) if workers else (True,)):
+                t0 = time.perf_counter()
+                count = sum(1 for _ in parse_batch(texts, mode, workers, chunk_size, ordered=ordered))
+                elapsed = time.perf_counter() - t0
+                assert count == n_inputs
+                baseline = baseline or elapsed
+                print(f'{workers:>8} {mode:>6} {str(ordered):>8} {n_inputs / elapsed:>10.0f} {baseline / elapsed:>8.2f}')
+
+
+BENCHMARKS = {
+    'lexer': lambda args: bench_lexer(args.sizes, args.repeat),
+    'tokens': lambda args: bench_tokens(args.sizes),
+    'eval': lambda args: bench_eval(args.eval_sizes, args.evaluations),
+    'arena': lambda args: bench_arena(args.sizes),
+    'incremental': lambda args: bench_incremental(args.sizes, args.edits),
+    'batch': lambda args: bench_batch(args.inputs, args.terms, args.workers, args.chunk_size),
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lexer/parser benchmarks')
+    parser.add_argument('benchmarks', nargs='*', choices=[[]] + list(BENCHMARKS), default=[])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--eval-sizes', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--evaluations', type=int, default=100)
+    parser.add_argument('--edits', type=int, default=200)
+    parser.add_argument('--inputs', type=int, default=20000)
+    parser.add_argument('--terms', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({0, 1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument('--chunk-size', type=int, default=256)
+    args = parser.parse_args()
+    for name in args.benchmarks or BENCHMARKS:
+        print(f'== {name}')
+        BENCHMARKS[name](args)
@@ -0,0 +1,162 @@
+from array import array
+
+from my_ast import BinOp, Num, children
+from token_type import TokenType
+
+# Opcodes of the stack machine; every instruction is an (opcode, argument)
+# pair, the argument indexing Bytecode.consts where one is needed
+PUSH_CONST, ADD, SUB, ADD_CONST, SUB_CONST = range(5)
+OPCODE_NAMES = ['PUSH_CONST', 'ADD', 'SUB', 'ADD_CONST', 'SUB_CONST']
+
+
+def _apply(op, left, right):
+    return left + right if op.type == TokenType.PLUS else left - right
+
+
+def _chain(operands, ops):
+    value = operands[0]
+    for op, operand in zip(ops, operands[1:]):
+        value = _apply(op, value, operand)
+    return value
+
+
+# Evaluate by walking the tree, post-order with an explicit value stack
+def evaluate(node):
+    if node is None:
+        return None
+    values = []
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if isinstance(current, Num):
+            values.append(current.value)
+        elif not visited:
+            stack.append((current, True))
+            stack.extend((child, False) for child in reversed(children(current)))
+        elif isinstance(current, BinOp):
+            right = values.pop()
+            values.append(_apply(current.op, values.pop(), right))
+        else:
+            n = len(current.operands)
+            operands = values[-n:]
+            del values[-n:]
+            values.append(_chain(operands, current.ops))
+    return values.pop()
+
+
+class Bytecode:
+    __slots__ = ('code', 'consts')
+
+    def __init__(self, code, consts):
+        self.code = code      # array of interleaved opcode, argument
+        self.consts = consts
+
+    def __len__(self):
+        return len(self.code) // 2
+
+    def disassemble(self):
+        code = self.code
+        lines = []
+        for i in range(0, len(code), 2):
+            op, arg = code[i], code[i + 1]
+            name = OPCODE_NAMES[op]
+            lines.append(f'{name} {self.consts[arg]!r}' if op in (PUSH_CONST, ADD_CONST, SUB_CONST) else name)
+        return lines
+
+
+# Values of the constant subtrees, keyed by id(node), found with an
+# explicit post-order walk
+def fold_constants(node):
+    folded = {}
+    stack = [(node, False)]
+    while stack:
+        current, visited = stack.pop()
+        if isinstance(current, Num):
+            folded[id(current)] = current.value
+        elif not visited:
+            stack.append((current, True))
+            stack.extend((child, False) for child in reversed(children(current)))
+        elif all(id(child) in folded for child in children(current)):
+            operands = [folded[id(child)] for child in children(current)]
+            ops = [current.op] if isinstance(current, BinOp) else current.ops
+            folded[id(current)] = _chain(operands, ops)
+    return folded
+
+
+# Flatten the AST into stack-machine code, without recursion. With
+# fold=True constant subtrees (in this language, every subtree) are
+# evaluated at compile time; a constant right operand always becomes a
+# single ADD_CONST/SUB_CONST instruction.
+def compile_ast(node, fold=True):
+    code = array('q')
+    consts = []
+    const_ids = {}
+
+    def const(value):
+        key = (type(value), value)
+        if key not in const_ids:
+            const_ids[key] = len(consts)
+            consts.append(value)
+        return const_ids[key]
+
+    if node is None:
+        return Bytecode(code, consts)
+    folded = fold_constants(node) if fold else {}
+
+    def constant(current):
+        if id(current) in folded:
+            return True, folded[id(current)]
+        if isinstance(current, Num):
+            return True, current.value
+        return False, None
+
+    # The stack holds nodes still to emit and (operator, right operand)
+    # pairs whose instruction follows the operand's code
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, tuple):
+            op, operand = item
+            plus = op.type == TokenType.PLUS
+            is_const, value = constant(operand)
+            if is_const:
+                code.extend((ADD_CONST if plus else SUB_CONST, const(value)))
+            else:
+                code.extend((ADD if plus else SUB, 0))
+            continue
+        is_const, value = constant(item)
+        if is_const:
+            code.extend((PUSH_CONST, const(value)))
+            continue
+        operands = children(item)
+        ops = [item.op] if isinstance(item, BinOp) else item.ops
+        for op, operand in reversed(list(zip(ops, operands[1:]))):
+            stack.append((op, operand))
+            if not constant(operand)[0]:
+                stack.append(operand)
+        stack.append(operands[0])
+    return Bytecode(code, consts)
+
+
+# Run compiled code in one linear pass
+def run(bytecode):
+    code = bytecode.code
+    consts = bytecode.consts
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    for i in range(0, len(code), 2):
+        op = code[i]
+        if op == ADD_CONST:
+            stack[-1] += consts[code[i + 1]]
+        elif op == SUB_CONST:
+            stack[-1] -= consts[code[i + 1]]
+        elif op == PUSH_CONST:
+            push(consts[code[i + 1]])
+        elif op == ADD:
+            right = pop()
+            stack[-1] += right
+        else:
+            right = pop()
+            stack[-1] -= right
+    return stack[-1] if stack else None
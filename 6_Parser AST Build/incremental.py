@@ -0,0 +1,149 @@
+from operator import attrgetter
+
+from my_ast import BinOp, Num, NaryOp
+from my_lexer import get_token_dfa
+from my_token import Token
+from token_type import TokenType
+
+_get_type = attrgetter('type')
+_OPERATORS = {TokenType.PLUS, TokenType.MINUS}
+
+
+class IncrementalDocument:
+    # Keeps the tokens and AST of a text and updates them in place on edits.
+    # An edit re-lexes only from the token before the change until the new
+    # token stream lines up again with the old one; tokens after that are
+    # reused, their offsets shifted lazily and settled when the tree, which
+    # hands the tokens out, is built. In the default BinOp form the
+    # prefix chain up to the first changed token is reused and only the
+    # chain above it is rebuilt; with flat=True the tree is one NaryOp over
+    # the reused Num nodes.
+    def __init__(self, text, flat=False):
+        self.text = text
+        self.flat = flat
+        self.tokens = list(self._lex(text, 0))
+        self._nums = [Num(token) if token.type == TokenType.INTEGER else None for token in self.tokens]
+        self._chain = []   # _chain[k]: tree of terms 0..k, i.e. tokens 0..2k
+        # Tokens from index _shift_from on are stored _shift characters
+        # before their real position
+        self._shift_from = len(self.tokens)
+        self._shift = 0
+        self.last_window = (0, len(self.tokens))
+
+    @staticmethod
+    def _lex(text, start):
+        for tok_type, token_start, token_end in get_token_dfa().scan(text, start):
+            if tok_type == TokenType.EOF:
+                return
+            value = text[token_start:token_end]
+            if tok_type == TokenType.INTEGER:
+                value = int(value)
+            yield Token(tok_type, value, token_start, token_end)
+
+    def start(self, i):
+        return self.tokens[i].start + (self._shift if i >= self._shift_from else 0)
+
+    def end(self, i):
+        return self.tokens[i].end + (self._shift if i >= self._shift_from else 0)
+
+    # First token index whose key (start or end) is >= pos
+    def _search(self, key, pos):
+        lo, hi = 0, len(self.tokens)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if key(mid) < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _add_offset(self, lo, hi, delta):
+        for token in self.tokens[lo:hi]:
+            token.start += delta
+            token.end += delta
+
+    # Make the pending shift start at token index m
+    def _move_shift(self, m):
+        if self._shift:
+            if self._shift_from < m:
+                self._add_offset(self._shift_from, m, self._shift)
+            elif self._shift_from > m:
+                self._add_offset(m, self._shift_from, -self._shift)
+        self._shift_from = m
+
+    # Apply the pending shift to every token. Costs no more than the tree
+    # built right after, which reaches every token past the edit anyway.
+    def _settle(self):
+        self._move_shift(len(self.tokens))
+        self._shift = 0
+
+    def spans(self):
+        return [(self.start(i), self.end(i)) for i in range(len(self.tokens))]
+
+    def edit(self, offset, deleted, inserted):
+        # Replace text[offset:offset + deleted] with `inserted` and return the new tree
+        text = self.text
+        if not 0 <= offset <= offset + deleted <= len(text):
+            raise ValueError('Edit outside the document')
+        new_text = text[:offset] + inserted + text[offset + deleted:]
+        delta = len(inserted) - deleted
+        edit_end = offset + deleted
+        n = len(self.tokens)
+
+        # Re-lex from the token before the first one touching the edit, to
+        # allow for the scanner's one-token lookahead
+        lo = max(0, self._search(self.end, offset) - 1)
+        relex_start = min(self.start(lo), offset) if n else 0
+        m = self._search(self.start, edit_end)
+
+        new_tokens = []
+        for token in self._lex(new_text, relex_start):
+            # Stop once a token starts where an old, unchanged token starts:
+            # the text from there on is identical, so are its tokens
+            while m < n and self.start(m) + delta < token.start:
+                m += 1
+            if m < n and self.start(m) + delta == token.start and token.start >= offset + len(inserted):
+                break
+            new_tokens.append(token)
+        else:
+            m = n
+
+        self._move_shift(m)
+        self._shift += delta
+        self.tokens[lo:m] = new_tokens
+        self._nums[lo:m] = [Num(token) if token.type == TokenType.INTEGER else None for token in new_tokens]
+        self._shift_from = lo + len(new_tokens)
+        del self._chain[(lo + 1) // 2:]
+        self.text = new_text
+        self.last_window = (lo, lo + len(new_tokens))
+        return self.tree
+
+    def error(self):
+        raise Exception('Invalid syntax')
+
+    # Same tree Parser(...).parse() builds: terms joined by +/- up to the
+    # first token that is not an operator
+    @property
+    def tree(self):
+        self._settle()
+        tokens = self.tokens
+        if not tokens:
+            return None
+        if self.flat:
+            op_types = list(map(_get_type, tokens[1::2]))
+            n_ops = len(op_types)
+            if not set(op_types) <= _OPERATORS:
+                n_ops = next(i for i, op_type in enumerate(op_types) if op_type not in _OPERATORS)
+            if 2 * n_ops >= len(tokens) or set(map(_get_type, tokens[0:2 * n_ops + 1:2])) != {TokenType.INTEGER}:
+                self.error()
+            return NaryOp(self._nums[0:2 * n_ops + 1:2], tokens[1:2 * n_ops:2]) if n_ops else self._nums[0]
+
+        chain = self._chain
+        nums = self._nums
+        for k in range(len(chain), len(tokens) // 2 + 1):
+            if k > 0 and tokens[2 * k - 1].type not in _OPERATORS:
+                break
+            if 2 * k >= len(tokens) or tokens[2 * k].type != TokenType.INTEGER:
+                self.error()
+            chain.append(BinOp(chain[k - 1], tokens[2 * k - 1], nums[2 * k]) if k else nums[0])
+        return chain[-1]
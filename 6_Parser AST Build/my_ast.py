@@ -13,15 +13,56 @@ class Num(AST):
         self.token = token
         self.value = token.value
 
+# Flat left-associative chain: operands[0] ops[0] operands[1] ops[1] ...,
+# one node for a whole run of + and - instead of one BinOp per operator
+class NaryOp(AST):
+    def __init__(self, operands, ops):
+        self.operands = operands
+        self.ops = ops
 
-def print_ast(node, level=0):
-    indent = '  ' * level
+
+# Children of a node, left to right
+def children(node):
     if isinstance(node, BinOp):
-        print(f'{indent}BinOp:')
-        print(f'{indent}  Left:')
-        print_ast(node.left, level+2)
-        print(f'{indent}  Op: {node.op.value}')
-        print(f'{indent}  Right:')
-        print_ast(node.right, level+2)
-    elif isinstance(node, Num):
-        print(f'{indent}Num: {node.value}')
\ No newline at end of file
+        return [node.left, node.right]
+    if isinstance(node, NaryOp):
+        return node.operands
+    return []
+
+
+# Pre-order traversal with an explicit stack
+def iter_nodes(node):
+    stack = [node] if node is not None else []
+    while stack:
+        current = stack.pop()
+        yield current
+        stack.extend(reversed(children(current)))
+
+
+# Print the tree without recursion: the stack holds lines still to print
+# and (node, level) pairs still to expand, in reverse order
+def print_ast(node, level=0):
+    stack = [(node, level)]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            print(item)
+            continue
+        node, level = item
+        indent = '  ' * level
+        if isinstance(node, BinOp):
+            stack.extend(reversed([
+                f'{indent}BinOp:',
+                f'{indent}  Left:', (node.left, level + 2),
+                f'{indent}  Op: {node.op.value}',
+                f'{indent}  Right:', (node.right, level + 2),
+            ]))
+        elif isinstance(node, NaryOp):
+            items = [f'{indent}NaryOp:']
+            for i, operand in enumerate(node.operands):
+                if i:
+                    items.append(f'{indent}  Op: {node.ops[i - 1].value}')
+                items.extend((f'{indent}  Operand:', (operand, level + 2)))
+            stack.extend(reversed(items))
+        elif isinstance(node, Num):
+            print(f'{indent}Num: {node.value}')
@@ -1,6 +1,31 @@
-from my_token import Token
+import mmap
+
+from my_token import Token, LazyToken, TokenArray
 from token_type import TokenType
-import re
+from regex_dfa import compile_token_dfa
+
+# Regular expressions for tokens
+token_specification = [
+    (TokenType.INTEGER, r'\d+'),
+    (TokenType.PLUS, r'\+'),
+    (TokenType.MINUS, r'\-'),
+    (TokenType.EOF, r'\Z')
+]
+
+_token_dfa = None
+
+# A collections.Counter set here gets the number of tokens each full
+# tokenize() / tokenize_array() produced; None skips the bookkeeping
+counters = None
+
+
+# Combined DFA for token_specification, compiled once per process
+def get_token_dfa():
+    global _token_dfa
+    if _token_dfa is None:
+        _token_dfa = compile_token_dfa(token_specification)
+    return _token_dfa
+
 
 class Lexer:
     def __init__(self, text):
@@ -8,27 +33,73 @@ class Lexer:
         self.pos = 0
         self.current_token = None
         self.tokens = []
+        self.token_array = None
+        self._file = None
+
+    # Lexer over a memory-mapped file; tokens are scanned straight from the
+    # mapping, so the file is never read into memory as a whole
+    @classmethod
+    def from_file(cls, path):
+        f = open(path, 'rb')
+        try:
+            text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty files cannot be mapped
+            text = b''
+        lexer = cls(text)
+        lexer._file = f
+        return lexer
+
+    def close(self):
+        if self._file is not None:
+            if isinstance(self.text, mmap.mmap):
+                self.text.close()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def error(self):
         raise Exception('Invalid character')
 
     def tokenize(self):
-        # Regular expressions for tokens
-        token_specification = [
-            (TokenType.INTEGER, r'\d+'),
-            (TokenType.PLUS, r'\+'),
-            (TokenType.MINUS, r'\-'),
-            (TokenType.EOF, r'\Z')
-        ]
-
-        # Create a regex that matches the token specifications
-        token_regex = '|'.join(f'(?P<{tok.name}>{pattern})' for tok, pattern in token_specification)
-        for mo in re.finditer(token_regex, self.text):
-            kind = mo.lastgroup
-            value = mo.group()
-            tok_type = TokenType[kind]
+        # Single table-driven scan with maximal munch over the token DFA
+        text = self.text
+        for tok_type, start, end in get_token_dfa().scan(text):
+            value = text[start:end]
             if tok_type == TokenType.INTEGER:
                 value = int(value)  # Convert to integer
-            self.tokens.append(Token(tok_type, value))
+            elif not isinstance(value, str):
+                value = value.decode('ascii')
+            self.tokens.append(Token(tok_type, value, start, end))
 
         self.tokens.append(Token(TokenType.EOF, None))
+        if counters is not None:
+            counters['tokens'] += len(self.tokens)
+
+    # Lazy token stream: same tokens as tokenize(), produced one at a time
+    # as spans into the source, without filling self.tokens
+    def iter_tokens(self):
+        text = self.text
+        for tok_type, start, end in get_token_dfa().scan(text):
+            yield LazyToken(tok_type, text, start, end)
+        yield Token(TokenType.EOF, None)
+
+    def __iter__(self):
+        return self.iter_tokens()
+
+    # Columnar alternative to tokenize(): the same token stream stored in
+    # a TokenArray, with no per-token objects
+    def tokenize_array(self):
+        tokens = TokenArray(self.text)
+        append = tokens.append
+        for tok_type, start, end in get_token_dfa().scan(self.text):
+            append(tok_type, start, end)
+        append(TokenType.EOF)
+        if counters is not None:
+            counters['tokens'] += len(tokens)
+        self.token_array = tokens
+        return tokens
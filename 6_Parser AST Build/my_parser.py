@@ -1,41 +1,117 @@
 from token_type import *
 from my_token import *
 from my_ast import *
+from ast_arena import ASTArena
+
+# Set to a collections.Counter to count parses (every entry point) and
+# arena nodes built
+counters = None
 
 
 class Parser:
-    def __init__(self, lexer):
+    # Reads tokens with one-token lookahead: from lexer.token_array or
+    # lexer.tokens when the lexer was already tokenized, otherwise lazily
+    # from lexer.iter_tokens(). With a TokenArray only the type ids are
+    # read; token objects are created just for the tokens the AST keeps.
+    # flat=True builds one NaryOp per +/- chain instead of nested BinOps.
+    def __init__(self, lexer, flat=False):
         self.lexer = lexer
+        self.flat = flat
         self.tokens = lexer.tokens
-        self.current_token = None
+        self.token_array = getattr(lexer, 'token_array', None)
+        if self.token_array is None:
+            self._stream = iter(self.tokens) if self.tokens else lexer.iter_tokens()
+        self._current = None
+        self.current_type = None
         self.pos = -1
         self.advance()
 
     def advance(self):
         self.pos += 1
-        if self.pos < len(self.tokens):
-            self.current_token = self.tokens[self.pos]
-        else:
-            self.current_token = Token(TokenType.EOF, None)
+        if self.token_array is not None:
+            self._current = None
+            if self.pos < len(self.token_array):
+                self.current_type = self.token_array.type_at(self.pos)
+            else:
+                self.current_type = TokenType.EOF
+            return
+        self._current = next(self._stream, None)
+        if self._current is None:
+            self._current = Token(TokenType.EOF, None)
+        self.current_type = self._current.type
+
+    @property
+    def current_token(self):
+        if self._current is None:
+            if self.pos < len(self.token_array):
+                self._current = self.token_array[self.pos]
+            else:
+                self._current = Token(TokenType.EOF, None)
+        return self._current
 
     def error(self):
         raise Exception('Invalid syntax')
 
     def parse(self):
-        if self.current_token.type == TokenType.EOF:
+        if self.current_type == TokenType.EOF:
             return None
 
+        if self.flat:
+            return self.parse_flat()
+
         left = self.term()
-        while self.current_token.type in (TokenType.PLUS, TokenType.MINUS):
+        while self.current_type in (TokenType.PLUS, TokenType.MINUS):
             op = self.current_token
             self.advance()
             right = self.term()
             left = BinOp(left=left, op=op, right=right)
+        if counters is not None:
+            counters['parses'] += 1
         return left
 
+    def parse_flat(self):
+        operands = [self.term()]
+        ops = []
+        while self.current_type in (TokenType.PLUS, TokenType.MINUS):
+            ops.append(self.current_token)
+            self.advance()
+            operands.append(self.term())
+        if counters is not None:
+            counters['parses'] += 1
+        return NaryOp(operands, ops) if ops else operands[0]
+
+    # Parse straight into an ASTArena, without BinOp/Num objects
+    def parse_arena(self):
+        arena = ASTArena()
+        if self.current_type == TokenType.EOF:
+            return arena
+
+        left = arena.add_num(self.term_value())
+        while self.current_type in (TokenType.PLUS, TokenType.MINUS):
+            op_type = self.current_type
+            self.advance()
+            left = arena.add_binop(left, op_type, arena.add_num(self.term_value()))
+        arena.root = left
+        if counters is not None:
+            counters['parses'] += 1
+            counters['arena_nodes'] += len(arena)
+        return arena
+
+    # Value of the current INTEGER token, read from the TokenArray when
+    # there is one
+    def term_value(self):
+        if self.current_type != TokenType.INTEGER:
+            self.error()
+        if self.token_array is not None:
+            value = self.token_array.value_at(self.pos)
+        else:
+            value = self.current_token.value
+        self.advance()
+        return value
+
     def term(self):
-        token = self.current_token
-        if token.type == TokenType.INTEGER:
+        if self.current_type == TokenType.INTEGER:
+            token = self.current_token
             self.advance()
             return Num(token)
         else:
@@ -1,8 +1,86 @@
-# Token class using TokenType enum
+from array import array
+
+from token_type import TokenType
+
+
+# Token class using TokenType enum; start/end is the token's span in the
+# source text, when known
 class Token:
-    def __init__(self, type, value):
+    __slots__ = ('type', 'value', 'start', 'end')
+
+    def __init__(self, type, value, start=None, end=None):
         self.type = type
         self.value = value
+        self.start = start
+        self.end = end
 
     def __str__(self):
         return f'Token({self.type.name}, {repr(self.value)})'
+
+
+def _span_value(type, source, start, end):
+    if start < 0:
+        return None
+    text = source[start:end]
+    if type == TokenType.INTEGER:
+        return int(text)
+    return text if isinstance(text, str) else text.decode('ascii')
+
+
+# Token that only records its span in the source buffer (a str, bytes or
+# mmap); the value is sliced out, and converted, when first asked for
+class LazyToken:
+    __slots__ = ('type', 'source', 'start', 'end')
+
+    def __init__(self, type, source, start, end):
+        self.type = type
+        self.source = source
+        self.start = start
+        self.end = end
+
+    @property
+    def value(self):
+        return _span_value(self.type, self.source, self.start, self.end)
+
+    def __str__(self):
+        return f'Token({self.type.name}, {repr(self.value)})'
+
+
+# Columnar token store: parallel arrays of type ids and (start, end)
+# offsets into one source buffer, instead of one object per token. A
+# negative start marks a token without source text (value None).
+class TokenArray:
+    TYPES = list(TokenType)
+    TYPE_IDS = {tok_type: i for i, tok_type in enumerate(TYPES)}
+
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('q')
+        self.ends = array('q')
+
+    def append(self, type, start=-1, end=-1):
+        self.types.append(self.TYPE_IDS[type])
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.types)
+
+    def type_at(self, i):
+        return self.TYPES[self.types[i]]
+
+    def value_at(self, i):
+        return _span_value(self.TYPES[self.types[i]], self.source, self.starts[i], self.ends[i])
+
+    # Materialize a single token, only when one is really needed
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('token index out of range')
+        return LazyToken(self.TYPES[self.types[i]], self.source, self.starts[i], self.ends[i])
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
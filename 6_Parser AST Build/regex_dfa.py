@@ -0,0 +1,479 @@
+import re
+import sys
+from array import array
+from bisect import bisect_right
+
+# Regex -> NFA (Thompson) -> DFA (subset construction) -> minimal DFA, for
+# the token specifications of the lexer. The combined DFA tags each
+# accepting state with the earliest token in the specification that
+# accepts there, and TokenDFA.scan tokenizes with maximal munch.
+
+MAX_CODE = 0x10FFFF
+DEAD = -1
+
+
+class RegexError(Exception):
+    pass
+
+
+# Character sets are tuples of inclusive (lo, hi) code point ranges
+def _normalize(ranges):
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return tuple(merged)
+
+
+def _negate(ranges):
+    result = []
+    start = 0
+    for lo, hi in _normalize(ranges):
+        if lo > start:
+            result.append((start, lo - 1))
+        start = hi + 1
+    if start <= MAX_CODE:
+        result.append((start, MAX_CODE))
+    return tuple(result)
+
+
+def _char(ch):
+    return ((ord(ch), ord(ch)),)
+
+
+ANY = _negate(_char('\n'))
+
+# \d, \w and \s mean what they mean in Python's re for str patterns:
+# Unicode decimal digits, alphanumerics and '_', whitespace. Their ranges
+# are read off by running re once over a string of every code point, the
+# first time a pattern uses them.
+_CLASS_ESCAPES = {'d': r'\d', 'w': r'\w', 's': r'\s'}
+_class_ranges = {}
+
+
+def _class_escape(escape):
+    name = escape.lower()
+    if name not in _CLASS_ESCAPES:
+        return None
+    if escape not in _class_ranges:
+        encoding = 'utf-32-le' if sys.byteorder == 'little' else 'utf-32-be'
+        every_code = array('I', range(MAX_CODE + 1)).tobytes().decode(encoding, 'surrogatepass')
+        ranges = tuple((mo.start(), mo.end() - 1) for mo in re.finditer(_CLASS_ESCAPES[name] + '+', every_code))
+        _class_ranges[name] = ranges
+        _class_ranges[name.upper()] = _negate(ranges)
+    return _class_ranges[escape]
+
+
+_LITERAL_ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'f': '\f', 'v': '\v', '0': '\0'}
+
+
+class NFA:
+    def __init__(self):
+        self.epsilon = []   # state -> [state]
+        self.edges = []     # state -> [(charset, state)]
+
+    def new_state(self):
+        self.epsilon.append([])
+        self.edges.append([])
+        return len(self.epsilon) - 1
+
+
+class _RegexParser:
+    # Recursive descent over the pattern, building Thompson fragments
+    # (start, end) directly into a shared NFA
+    def __init__(self, pattern, nfa):
+        self.pattern = pattern
+        self.pos = 0
+        self.nfa = nfa
+
+    def error(self, message):
+        raise RegexError(f'{message} at position {self.pos} in {self.pattern!r}')
+
+    def peek(self):
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def take(self):
+        ch = self.peek()
+        if ch is None:
+            self.error('Unexpected end of pattern')
+        self.pos += 1
+        return ch
+
+    def parse(self):
+        fragment = self.alternation()
+        if self.pos != len(self.pattern):
+            self.error('Unexpected character')
+        return fragment
+
+    def alternation(self):
+        branches = [self.concatenation()]
+        while self.peek() == '|':
+            self.pos += 1
+            branches.append(self.concatenation())
+        if len(branches) == 1:
+            return branches[0]
+        start, end = self.nfa.new_state(), self.nfa.new_state()
+        for branch_start, branch_end in branches:
+            self.nfa.epsilon[start].append(branch_start)
+            self.nfa.epsilon[branch_end].append(end)
+        return start, end
+
+    def concatenation(self):
+        start = end = self.nfa.new_state()
+        while self.peek() not in (None, '|', ')'):
+            atom_start, atom_end = self.repetition()
+            self.nfa.epsilon[end].append(atom_start)
+            end = atom_end
+        return start, end
+
+    # One quantifier per atom, like re: a second one ('a**', 'a{2}*') is a
+    # multiple repeat, and the lazy and possessive forms ('a*?', 'a*+')
+    # would not mean the same under maximal munch, so they are refused
+    def repetition(self):
+        atom_pos = self.pos
+        fragment = self.atom()
+        ch = self.peek()
+        if ch == '{':
+            low, high = self.counted()
+            fragment = self.repeat(atom_pos, fragment, low, high)
+        elif ch in ('*', '+', '?'):
+            self.pos += 1
+            start, end = fragment
+            new_start, new_end = self.nfa.new_state(), self.nfa.new_state()
+            self.nfa.epsilon[new_start].append(start)
+            self.nfa.epsilon[end].append(new_end)
+            if ch in '*?':
+                self.nfa.epsilon[new_start].append(new_end)
+            if ch in '*+':
+                self.nfa.epsilon[end].append(start)
+            fragment = new_start, new_end
+        else:
+            return fragment
+        if self.peek() == '?':
+            self.error('Lazy quantifiers are not supported')
+        if self.peek() in ('*', '+', '{'):
+            self.error('Multiple repeat')
+        return fragment
+
+    def counted(self):
+        close = self.pattern.find('}', self.pos)
+        if close == -1:
+            self.error('Unterminated repetition')
+        body = self.pattern[self.pos + 1:close]
+        try:
+            if ',' in body:
+                low, high = body.split(',', 1)
+                low, high = int(low or 0), (int(high) if high else None)
+            else:
+                low = high = int(body)
+        except ValueError:
+            self.error('Invalid repetition')
+        self.pos = close + 1
+        return low, high
+
+    def repeat(self, atom_pos, fragment, low, high):
+        # {m,n} is m copies of the atom followed by n - m optional copies,
+        # {m,} is m copies followed by a starred copy
+        if high is not None and high < low:
+            self.error('Bad repetition range')
+        count = high if high is not None else low + 1
+        end_pos = self.pos
+        copies = [fragment]
+        for _ in range(count - 1):
+            self.pos = atom_pos
+            copies.append(self.atom())
+        self.pos = end_pos
+
+        start = end = self.nfa.new_state()
+        for i, (copy_start, copy_end) in enumerate(copies[:count]):
+            self.nfa.epsilon[end].append(copy_start)
+            if i < low:
+                end = copy_end
+                continue
+            after = self.nfa.new_state()
+            self.nfa.epsilon[end].append(after)
+            self.nfa.epsilon[copy_end].append(after)
+            if high is None:
+                self.nfa.epsilon[copy_end].append(copy_start)
+            end = after
+        return start, end
+
+    def atom(self):
+        ch = self.take()
+        if ch == '(':
+            if self.pattern.startswith('?:', self.pos):
+                self.pos += 2
+            fragment = self.alternation()
+            if self.take() != ')':
+                self.error('Missing )')
+            return fragment
+        if ch == '[':
+            return self.charset_fragment(self.bracket())
+        if ch == '.':
+            return self.charset_fragment(ANY)
+        if ch in '^$':
+            self.error(f'Anchor {ch} is not supported')
+        if ch == '\\':
+            escape = self.take()
+            if escape == 'Z':
+                self.error('\\Z is only supported as a whole pattern')
+            if escape in 'AbB':
+                self.error(f'Anchor \\{escape} is not supported')
+            charset = _class_escape(escape)
+            if charset is not None:
+                return self.charset_fragment(charset)
+            return self.charset_fragment(_char(_LITERAL_ESCAPES.get(escape, escape)))
+        if ch in '*+?{)|':
+            self.error('Nothing to repeat' if ch in '*+?{' else 'Unexpected character')
+        return self.charset_fragment(_char(ch))
+
+    def bracket(self):
+        negate = self.peek() == '^'
+        if negate:
+            self.pos += 1
+        ranges = []
+        first = True
+        while True:
+            ch = self.take()
+            if ch == ']' and not first:
+                break
+            first = False
+            if ch == '\\':
+                escape = self.take()
+                charset = _class_escape(escape)
+                if charset is not None:
+                    ranges.extend(charset)
+                    continue
+                ch = _LITERAL_ESCAPES.get(escape, escape)
+            if self.peek() == '-' and self.pos + 1 < len(self.pattern) and self.pattern[self.pos + 1] != ']':
+                self.pos += 1
+                high = self.take()
+                if high == '\\':
+                    high = self.take()
+                    high = _LITERAL_ESCAPES.get(high, high)
+                if ord(high) < ord(ch):
+                    self.error('Bad character range')
+                ranges.append((ord(ch), ord(high)))
+            else:
+                ranges.append((ord(ch), ord(ch)))
+        ranges = _normalize(ranges)
+        return _negate(ranges) if negate else ranges
+
+    def charset_fragment(self, charset):
+        start, end = self.nfa.new_state(), self.nfa.new_state()
+        self.nfa.edges[start].append((charset, end))
+        return start, end
+
+
+def _closure(nfa, states):
+    stack = list(states)
+    seen = set(states)
+    while stack:
+        state = stack.pop()
+        for next_state in nfa.epsilon[state]:
+            if next_state not in seen:
+                seen.add(next_state)
+                stack.append(next_state)
+    return frozenset(seen)
+
+
+def _alphabet_partition(charsets):
+    # Split the code point range into intervals on which every charset is
+    # constant, then merge intervals that behave identically into one class.
+    cuts = {0}
+    for charset in charsets:
+        for lo, hi in charset:
+            cuts.add(lo)
+            if hi < MAX_CODE:
+                cuts.add(hi + 1)
+    boundaries = sorted(cuts)
+
+    def members(charset):
+        result = set()
+        for lo, hi in charset:
+            first = bisect_right(boundaries, lo) - 1
+            last = bisect_right(boundaries, hi) - 1
+            result.update(range(first, last + 1))
+        return result
+
+    charset_members = {charset: members(charset) for charset in charsets}
+    signatures = {}
+    interval_class = []
+    for interval in range(len(boundaries)):
+        signature = frozenset(charset for charset, ids in charset_members.items() if interval in ids)
+        interval_class.append(signatures.setdefault(signature, len(signatures)))
+    charset_classes = {charset: {interval_class[i] for i in ids} for charset, ids in charset_members.items()}
+    return boundaries, interval_class, len(signatures), charset_classes
+
+
+def _minimize(table, accept, n_classes):
+    # Moore partition refinement, starting from states grouped by tag
+    n = len(accept)
+    block = list(accept)
+    while True:
+        signatures = {}
+        new_block = []
+        for state in range(n):
+            row = table[state * n_classes:(state + 1) * n_classes]
+            signature = (block[state], tuple(block[t] if t != DEAD else None for t in row))
+            new_block.append(signatures.setdefault(signature, len(signatures)))
+        if len(signatures) == len(set(block)):
+            block = new_block
+            break
+        block = new_block
+
+    # Renumber so the start state's block becomes 0
+    order = {block[0]: 0}
+    for state in range(n):
+        order.setdefault(block[state], len(order))
+    new_table = array('i', [DEAD]) * (len(order) * n_classes)
+    new_accept = [-1] * len(order)
+    for state in range(n):
+        b = order[block[state]]
+        new_accept[b] = accept[state]
+        for c in range(n_classes):
+            t = table[state * n_classes + c]
+            new_table[b * n_classes + c] = order[block[t]] if t != DEAD else DEAD
+    return new_table, new_accept
+
+
+class TokenDFA:
+    # Combined minimal DFA over character classes. table[state * n_classes + c]
+    # is the next state or DEAD; accept[state] is the index of the token
+    # accepted in that state, or -1. rows[state][code] is the same table
+    # expanded for code points below 256, which the scanner uses directly.
+    def __init__(self, tags, table, accept, n_classes, boundaries, interval_class, end_tag=None):
+        self.tags = tags
+        self.table = table
+        self.accept = accept
+        self.n_classes = n_classes
+        self.boundaries = boundaries
+        self.interval_class = interval_class
+        self.end_tag = end_tag
+        low_classes = [self.class_of(code) for code in range(256)]
+        self.rows = [[table[state * n_classes + c] for c in low_classes] for state in range(len(accept))]
+
+    def class_of(self, code):
+        return self.interval_class[bisect_right(self.boundaries, code) - 1]
+
+    def next_state(self, state, code):
+        if code < 256:
+            return self.rows[state][code]
+        return self.table[state * self.n_classes + self.class_of(code)]
+
+    def codes(self, text):
+        # Code points of the input; ASCII text and bytes-like buffers are
+        # scanned in place as bytes with identical offsets
+        if isinstance(text, str):
+            return text.encode('ascii') if text.isascii() else [ord(ch) for ch in text]
+        return text
+
+    def match(self, codes, pos):
+        # Longest match starting at pos: (token index, end) or (-1, pos)
+        accept = self.accept
+        next_state = self.next_state
+        n = len(codes)
+        state = 0
+        last_tag = -1
+        last_end = pos
+        i = pos
+        while i < n:
+            state = next_state(state, codes[i])
+            if state == DEAD:
+                break
+            i += 1
+            if accept[state] >= 0:
+                last_tag = accept[state]
+                last_end = i
+        return last_tag, last_end
+
+    def scan(self, text, start=0):
+        # Yield (tag, start, end) for every token with maximal munch.
+        # Characters where no token matches are skipped, like re.finditer.
+        codes = self.codes(text)
+        n = len(codes)
+        tags = self.tags
+        accept = self.accept
+        rows = self.rows
+        start_row = rows[0]
+        next_state = self.next_state
+        pos = start
+        while pos < n:
+            # Inlined longest match from pos
+            code = codes[pos]
+            state = start_row[code] if code < 256 else next_state(0, code)
+            if state == DEAD:
+                pos += 1
+                continue
+            i = pos + 1
+            last_tag = accept[state]
+            last_end = i
+            while i < n:
+                code = codes[i]
+                state = rows[state][code] if code < 256 else next_state(state, code)
+                if state == DEAD:
+                    break
+                i += 1
+                if accept[state] >= 0:
+                    last_tag = accept[state]
+                    last_end = i
+            if last_tag >= 0:
+                yield tags[last_tag], pos, last_end
+                pos = last_end
+            else:
+                pos += 1
+        if self.end_tag is not None:
+            yield self.end_tag, n, n
+
+
+def compile_token_dfa(token_specification):
+    # token_specification: [(tag, pattern), ...] in priority order. A pattern
+    # of just r'\Z' declares the end-of-input token instead.
+    nfa = NFA()
+    start = nfa.new_state()
+    accepting = {}
+    tags = []
+    end_tag = None
+    for tag, pattern in token_specification:
+        if pattern == r'\Z':
+            end_tag = tag
+            continue
+        fragment_start, fragment_end = _RegexParser(pattern, nfa).parse()
+        if fragment_end in _closure(nfa, [fragment_start]):
+            raise RegexError(f'Pattern {pattern!r} for {tag} matches the empty string')
+        nfa.epsilon[start].append(fragment_start)
+        accepting[fragment_end] = len(tags)
+        tags.append(tag)
+
+    charsets = {charset for edges in nfa.edges for charset, _ in edges}
+    boundaries, interval_class, n_classes, charset_classes = _alphabet_partition(charsets)
+
+    # Subset construction over the character classes
+    start_set = _closure(nfa, [start])
+    ids = {start_set: 0}
+    subsets = [start_set]
+    rows = []
+    for subset in subsets:
+        moves = [set() for _ in range(n_classes)]
+        for state in subset:
+            for charset, next_state in nfa.edges[state]:
+                for c in charset_classes[charset]:
+                    moves[c].add(next_state)
+        row = []
+        for targets in moves:
+            if not targets:
+                row.append(DEAD)
+                continue
+            next_set = _closure(nfa, targets)
+            if next_set not in ids:
+                ids[next_set] = len(subsets)
+                subsets.append(next_set)
+            row.append(ids[next_set])
+        rows.append(row)
+
+    table = array('i', [t for row in rows for t in row])
+    accept = [min((accepting[s] for s in subset if s in accepting), default=-1) for subset in subsets]
+    table, accept = _minimize(table, accept, n_classes)
+    return TokenDFA(tags, table, accept, n_classes, boundaries, interval_class, end_tag)
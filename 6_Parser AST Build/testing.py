@@ -0,0 +1,317 @@
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import unittest
+from collections import Counter
+import my_lexer
+import my_parser
+from my_lexer import Lexer
+from my_parser import Parser
+from my_ast import BinOp, Num, NaryOp, print_ast, iter_nodes
+from regex_dfa import compile_token_dfa, RegexError
+from token_type import TokenType
+from my_token import Token
+from evaluator import evaluate, compile_ast, run
+from ast_arena import ASTArena
+from incremental import IncrementalDocument
+from batch import parse_batch, process_one
+from benchmark import tokenize_with_re, random_expression
+
+
+class TestLexer(unittest.TestCase):
+
+    def tokens(self, text):
+        lexer = Lexer(text)
+        lexer.tokenize()
+        return [(token.type, token.value) for token in lexer.tokens]
+
+    def test_tokenize(self):
+        self.assertEqual(self.tokens('3 + 5 - 2'), [
+            (TokenType.INTEGER, 3), (TokenType.PLUS, '+'), (TokenType.INTEGER, 5),
+            (TokenType.MINUS, '-'), (TokenType.INTEGER, 2), (TokenType.EOF, ''), (TokenType.EOF, None)
+        ])
+
+    def test_matches_regex_lexer(self):
+        rng = random.Random(0)
+        for _ in range(200):
+            text = ''.join(rng.choices('0123456789 +-*xé١٢३੪', k=rng.randint(0, 30)))
+            self.assertEqual(self.tokens(text), tokenize_with_re(text), text)
+        text = random_expression(500)
+        self.assertEqual(self.tokens(text), tokenize_with_re(text))
+        # \d is Unicode, as in re: Arabic-Indic digits lex as one integer
+        self.assertEqual(self.tokens('١٢ + 3')[:3], [(TokenType.INTEGER, 12), (TokenType.PLUS, '+'),
+                                                      (TokenType.INTEGER, 3)])
+
+    def test_maximal_munch_and_priority(self):
+        dfa = compile_token_dfa([('IF', 'if'), ('NAME', r'[a-z]+'), ('NUM', r'\d+(\.\d+)?'), ('OP', r'[-+*/]=?')])
+        tokens = [(tag, 'if ifx 1.5 1. += -'[start:end]) for tag, start, end in dfa.scan('if ifx 1.5 1. += -')]
+        self.assertEqual(tokens, [('IF', 'if'), ('NAME', 'ifx'), ('NUM', '1.5'), ('NUM', '1'), ('OP', '+='), ('OP', '-')])
+
+    def test_regex_features(self):
+        patterns = [r'(ab|a)*c', r'a{2,3}', r'b{2,}', r'[^abc\d\s]', r'x{0,2}y', r'\w+']
+        dfa = compile_token_dfa(list(enumerate(patterns)))
+        rng = random.Random(1)
+        for _ in range(300):
+            text = ''.join(rng.choices('abcxy1 !é١\u3000', k=rng.randint(1, 10)))
+            tag, end = dfa.match(dfa.codes(text), 0)
+            best = (-1, 0)
+            for i, pattern in enumerate(patterns):
+                mo = re.compile(pattern).match(text)
+                if mo and mo.end() > best[1]:
+                    best = (i, mo.end())
+            self.assertEqual((tag, end), best, text)
+        with self.assertRaises(RegexError):
+            compile_token_dfa([('EMPTY', 'a*')])
+        # Rejected by re as a multiple repeat, or not expressible here
+        for pattern in ['a**', 'a+*', 'a{2}*', 'a?{2}', 'a+?', '^a', 'a$', r'\ba']:
+            with self.assertRaises(RegexError, msg=pattern):
+                compile_token_dfa([('BAD', pattern)])
+        dfa = compile_token_dfa([('GROUPED', '(a+)*b'), ('COUNTED', 'c{2}')])
+        self.assertEqual(list(dfa.scan('aab cc')), [('GROUPED', 0, 3), ('COUNTED', 4, 6)])
+
+    def test_counters(self):
+        my_lexer.counters = my_parser.counters = counters = Counter()
+        try:
+            lexer = Lexer('1 + 2 - 3')
+            lexer.tokenize_array()
+            Parser(lexer).parse_arena()
+            other = Lexer('4')
+            other.tokenize()
+            Parser(other).parse()
+            Parser(Lexer('5 - 6'), flat=True).parse()
+        finally:
+            my_lexer.counters = my_parser.counters = None
+        self.assertEqual(counters, {'tokens': len(lexer.token_array) + len(other.tokens),
+                                    'parses': 3, 'arena_nodes': 5})
+
+
+class TestParser(unittest.TestCase):
+
+    def test_parse(self):
+        lexer = Lexer('3 + 5 - 2')
+        lexer.tokenize()
+        ast = Parser(lexer).parse()
+        self.assertIsInstance(ast, BinOp)
+        self.assertEqual(ast.op.value, '-')
+        self.assertIsInstance(ast.left, BinOp)
+        self.assertEqual((ast.left.left.value, ast.left.right.value, ast.right.value), (3, 5, 2))
+        self.assertIsInstance(ast.right, Num)
+
+    def flatten(self, node):
+        if isinstance(node, Num):
+            return node.value
+        return (self.flatten(node.left), node.op.value, self.flatten(node.right))
+
+    def test_streaming_parse(self):
+        text = random_expression(200, seed=3)
+        eager = Lexer(text)
+        eager.tokenize()
+        expected = self.flatten(Parser(eager).parse())
+
+        lazy = Lexer(text)
+        self.assertEqual(self.flatten(Parser(lazy).parse()), expected)
+        self.assertEqual(lazy.tokens, [])
+        self.assertEqual([(t.type, t.value) for t in lazy.iter_tokens()],
+                         [(t.type, t.value) for t in eager.tokens])
+
+        array_lexer = Lexer(text)
+        tokens = array_lexer.tokenize_array()
+        self.assertEqual(len(tokens), len(eager.tokens))
+        self.assertEqual([(tokens.type_at(i), tokens.value_at(i)) for i in range(len(tokens))],
+                         [(t.type, t.value) for t in eager.tokens])
+        self.assertEqual(self.flatten(Parser(array_lexer).parse()), expected)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'expr.txt')
+            with open(path, 'w') as f:
+                f.write(text)
+            with Lexer.from_file(path) as lexer:
+                self.assertEqual(self.flatten(Parser(lexer).parse()), expected)
+
+    def test_flat_and_deep(self):
+        text = random_expression(20000, seed=5)
+        ast = Parser(Lexer(text)).parse()
+        flat = Parser(Lexer(text), flat=True).parse()
+        self.assertIsInstance(flat, NaryOp)
+        self.assertEqual(len(flat.operands), 20000)
+        self.assertEqual(evaluate(flat), evaluate(ast))
+        self.assertEqual(run(compile_ast(flat, fold=False)), evaluate(ast))
+        self.assertEqual(sum(1 for _ in iter_nodes(ast)), 39999)
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            print_ast(Parser(Lexer(random_expression(3000))).parse())
+        self.assertTrue(out.getvalue().startswith('BinOp:\n  Left:\n'))
+
+    def test_print_flat(self):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            print_ast(Parser(Lexer('3 + 5 - 2'), flat=True).parse())
+        self.assertEqual(out.getvalue().splitlines(), [
+            'NaryOp:', '  Operand:', '    Num: 3', '  Op: +', '  Operand:', '    Num: 5',
+            '  Op: -', '  Operand:', '    Num: 2'
+        ])
+
+
+class TestEvaluator(unittest.TestCase):
+
+    def num(self, value):
+        return Num(Token(TokenType.INTEGER, value))
+
+    def test_evaluate_and_compile(self):
+        for text in ['3 + 5 - 2', '42', random_expression(300, seed=7)]:
+            ast = Parser(Lexer(text)).parse()
+            value = evaluate(ast)
+            self.assertEqual(run(compile_ast(ast, fold=False)), value)
+            self.assertEqual(run(compile_ast(ast)), value)
+            self.assertEqual(len(compile_ast(ast)), 1)
+        self.assertEqual(evaluate(Parser(Lexer('3 + 5 - 2')).parse()), 6)
+        self.assertIsNone(run(compile_ast(None)))
+
+    def test_compile_right_nested(self):
+        minus = Token(TokenType.MINUS, '-')
+        plus = Token(TokenType.PLUS, '+')
+        ast = BinOp(self.num(10), minus, BinOp(BinOp(self.num(1), plus, self.num(2)), minus, self.num(4)))
+        code = compile_ast(ast, fold=False)
+        self.assertEqual(code.disassemble(), ['PUSH_CONST 10', 'PUSH_CONST 1', 'ADD_CONST 2', 'SUB_CONST 4', 'SUB'])
+        self.assertEqual(run(code), 11)
+
+
+class TestASTArena(unittest.TestCase):
+
+    def printed(self, func, *args):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            func(*args)
+        return out.getvalue()
+
+    def test_arena_matches_objects(self):
+        text = random_expression(500, seed=11) + ' + 123456789012345678901234567890'
+        ast = Parser(Lexer(text)).parse()
+        arena = Parser(Lexer(text)).parse_arena()
+        self.assertEqual(len(arena), 1001)
+        self.assertEqual(arena.evaluate(), evaluate(ast))
+        self.assertEqual(self.printed(arena.print_ast), self.printed(print_ast, ast))
+        self.assertEqual(arena.to_bytes(), ASTArena.from_ast(ast).to_bytes())
+        self.assertEqual(ASTArena.from_ast(Parser(Lexer(text), flat=True).parse()).evaluate(), evaluate(ast))
+
+        lexer = Lexer(text)
+        lexer.tokenize_array()
+        self.assertEqual(Parser(lexer).parse_arena().to_bytes(), arena.to_bytes())
+
+    def test_serialization_and_views(self):
+        arena = Parser(Lexer('3 + 5 - 2')).parse_arena()
+        copy = ASTArena.from_bytes(arena.to_bytes())
+        self.assertEqual(copy.evaluate(), 6)
+        root = copy.root_node
+        self.assertEqual(root.op.value, '-')
+        self.assertEqual(root.right.value, 2)
+        self.assertEqual(root.left.left.value, 3)
+        self.assertEqual(self.printed(print_ast, copy.to_ast()), self.printed(copy.print_ast))
+        self.assertIsNone(Parser(Lexer('')).parse_arena().evaluate())
+
+
+class TestIncremental(unittest.TestCase):
+
+    def fresh_tokens(self, text):
+        lexer = Lexer(text)
+        lexer.tokenize()
+        return [(token.type, token.value, token.start, token.end)
+                for token in lexer.tokens if token.type != TokenType.EOF]
+
+    def test_edit_relexes_window(self):
+        doc = IncrementalDocument('12 + 34 - 5 + 6')
+        self.assertEqual(evaluate(doc.tree), 47)
+        prefix = doc.tree.left.left
+
+        tree = doc.edit(10, 1, '50')
+        self.assertEqual(doc.text, '12 + 34 - 50 + 6')
+        self.assertEqual(evaluate(tree), 2)
+        self.assertIs(tree.left.left, prefix)
+        self.assertEqual(doc.last_window, (3, 5))
+        self.assertEqual(doc.spans()[-1], (15, 16))
+
+        # Deleting the space merges two tokens
+        tree = doc.edit(2, 3, '')
+        self.assertEqual(doc.text, '1234 - 50 + 6')
+        self.assertEqual(evaluate(tree), 1190)
+        with self.assertRaises(ValueError):
+            doc.edit(20, 0, '1')
+
+    def test_tree_tokens_after_edit(self):
+        doc = IncrementalDocument('1 + 2 + 3 + 4')
+        tree = doc.edit(0, 1, '100')
+        self.assertEqual(doc.text, '100 + 2 + 3 + 4')
+        self.assertEqual((tree.right.token.start, tree.right.token.end), (14, 15))
+        self.assertEqual((tree.op.start, tree.op.end), (12, 13))
+        self.assertEqual([(token.start, token.end) for token in doc.tokens], doc.spans())
+
+    def test_random_edits_match_full_parse(self):
+        rng = random.Random(5)
+        for flat in (False, True):
+            doc = IncrementalDocument(random_expression(40, seed=2), flat=flat)
+            for _ in range(500):
+                text = doc.text
+                offset = rng.randrange(len(text) + 1)
+                deleted = rng.randrange(min(3, len(text) - offset) + 1)
+                inserted = ''.join(rng.choice('0123456789+- ') for _ in range(rng.randrange(4)))
+                if len(text) < 20:
+                    offset, deleted, inserted = len(text), 0, ' + 5 - 6 + 7'
+                try:
+                    tree = doc.edit(offset, deleted, inserted)
+                except Exception:
+                    tree = None
+                tokens = [(token.type, token.value, start, end)
+                          for token, (start, end) in zip(doc.tokens, doc.spans())]
+                self.assertEqual(tokens, self.fresh_tokens(doc.text))
+                self.assertEqual([(token.start, token.end) for token in doc.tokens], doc.spans())
+                try:
+                    expected = evaluate(Parser(Lexer(doc.text), flat=flat).parse())
+                except Exception:
+                    self.assertIsNone(tree)
+                    continue
+                self.assertEqual(evaluate(tree), expected)
+
+
+class TestBatch(unittest.TestCase):
+
+    def inputs(self):
+        return [random_expression(10, seed=i) for i in range(40)] + ['1 + + 2', '', '12 - 5']
+
+    def expected(self, texts):
+        return [evaluate(Parser(Lexer(text)).parse()) if text != '1 + + 2' else 'error' for text in texts]
+
+    def results(self, pairs):
+        return ['error' if isinstance(result, Exception) else result for _, result in pairs]
+
+    def test_in_process(self):
+        texts = self.inputs()
+        pairs = list(parse_batch(texts, workers=0, chunk_size=7))
+        self.assertEqual([index for index, _ in pairs], list(range(len(texts))))
+        self.assertEqual(self.results(pairs), self.expected(texts))
+
+    def test_pool_ordered_and_unordered(self):
+        texts = self.inputs()
+        ordered = list(parse_batch(texts, workers=2, chunk_size=5, max_pending=3))
+        self.assertEqual([index for index, _ in ordered], list(range(len(texts))))
+        self.assertEqual(self.results(ordered), self.expected(texts))
+        unordered = sorted(parse_batch(iter(texts), workers=2, chunk_size=5, ordered=False), key=lambda pair: pair[0])
+        self.assertEqual(self.results(unordered), self.expected(texts))
+
+    def test_arena_mode_and_files(self):
+        texts = self.inputs()[:5]
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for i, text in enumerate(texts):
+                paths.append(os.path.join(tmp, f'{i}.txt'))
+                with open(paths[-1], 'w') as f:
+                    f.write(text)
+            pairs = list(parse_batch(paths, mode='arena', workers=2, files=True))
+        values = [ASTArena.from_bytes(result).evaluate() for _, result in pairs]
+        self.assertEqual(values, self.expected(texts))
+        self.assertEqual(process_one(texts[0]), values[0])
+        with self.assertRaises(ValueError):
+            next(parse_batch(texts, mode='tree'))
+
+
+if __name__ == '__main__':
+    unittest.main()
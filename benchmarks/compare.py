@@ -0,0 +1,46 @@
+import argparse
+import json
+import sys
+
+
+# Ratio of best times per stage, new / old; exits with 1 when a stage got
+# slower by more than the threshold, or processed a different workload
+def compare(old, new, threshold):
+    regressions = []
+    print(f"{'stage':>11} {'old s':>8} {'new s':>8} {'ratio':>7}")
+    for name, result in new['stages'].items():
+        if name not in old['stages']:
+            print(f"{name:>11} {'-':>8} {result['seconds']:>8.3f} {'new':>7}")
+            continue
+        before = old['stages'][name]
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else float('inf')
+        flag = ''
+        if before['items'] != result['items']:
+            flag = ' different workload'
+            regressions.append(name)
+        elif ratio > threshold:
+            flag = ' slower'
+            regressions.append(name)
+        print(f"{name:>11} {before['seconds']:>8.3f} {result['seconds']:>8.3f} {ratio:>7.2f}{flag}")
+        for counter in sorted(set(before.get('counters', {})) | set(result.get('counters', {}))):
+            a = before.get('counters', {}).get(counter)
+            b = result.get('counters', {}).get(counter)
+            if a != b:
+                print(f"{'':>11} {counter}: {a} -> {b}")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two benchmark JSON files')
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=1.10, help='largest accepted new/old time ratio')
+    args = parser.parse_args()
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    for key in ('scale', 'seed'):
+        if old['meta'][key] != new['meta'][key]:
+            print(f"warning: {key} differs ({old['meta'][key]} vs {new['meta'][key]})")
+    sys.exit(1 if compare(old, new, args.threshold) else 0)
@@ -0,0 +1,109 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from stages import STAGES
+
+
+# Time one stage in this process: best of `repeat` runs with the hooks
+# off, then, with counters, one more run with every hook set to a Counter
+def measure(name, scale, seed, repeat, with_counters):
+    unit, run, hooks = STAGES[name](scale, seed)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        items = run()
+        times.append(time.perf_counter() - t0)
+    result = {
+        'unit': unit,
+        'items': items,
+        'seconds': min(times),
+        'runs': times,
+        'per_second': items / min(times) if min(times) else None,
+    }
+    if with_counters:
+        counters = Counter()
+        for module in hooks:
+            module.counters = counters
+        try:
+            t0 = time.perf_counter()
+            run()
+            result['seconds_counted'] = time.perf_counter() - t0
+        finally:
+            for module in hooks:
+                module.counters = None
+        result['counters'] = dict(sorted(counters.items()))
+    return result
+
+
+# Each stage runs in a fresh interpreter: labs reuse module names, and a
+# stage should not inherit another's caches or heap
+def run_stage(name, args):
+    command = [sys.executable, __file__, '--stage', name, '--scale', str(args.scale),
+               '--seed', str(args.seed), '--repeat', str(args.repeat)]
+    if args.counters:
+        command.append('--counters')
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f'Stage {name} failed:\n{completed.stderr}')
+    return json.loads(completed.stdout)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=sys.path[0]).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results):
+    print(f"{'stage':>11} {'items':>10} {'unit':>12} {'best s':>8} {'per second':>12} {'counted s':>10}")
+    for name, result in results['stages'].items():
+        counted = result.get('seconds_counted')
+        counted = f'{counted:>10.3f}' if counted is not None else f"{'-':>10}"
+        print(f"{name:>11} {result['items']:>10} {result['unit']:>12} {result['seconds']:>8.3f} "
+              f"{result['per_second'] or 0:>12.0f} {counted}")
+        for counter, value in result.get('counters', {}).items():
+            print(f"{'':>11} {counter:>23} {value:>12}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks across every lab, with optional JSON output')
+    parser.add_argument('stages', nargs='*', choices=[[]] + list(STAGES), default=[])
+    parser.add_argument('--scale', type=int, default=1, help='multiplies every workload size')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--counters', action='store_true', help='also run once with instrumentation on')
+    parser.add_argument('--json', metavar='PATH', help='write the results here')
+    parser.add_argument('--stage', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.stage:
+        json.dump(measure(args.stage, args.scale, args.seed, args.repeat, args.counters), sys.stdout)
+        sys.exit()
+
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+            'revision': git_revision(),
+            'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'scale': args.scale,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'stages': {},
+    }
+    for name in args.stages or STAGES:
+        results['stages'][name] = run_stage(name, args)
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,166 @@
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Labs are plain script directories whose modules import each other by
+# name, so a stage puts its lab first on the path. Labs share module names
+# (benchmark, testing, main), which is why run.py gives each stage its
+# own process.
+def use_lab(directory):
+    path = os.path.join(ROOT, directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+# Every stage builds its workload up front and returns (unit, run, hooks):
+# run() does the timed work and returns how many units it processed,
+# hooks are the modules whose `counters` attribute it reports.
+
+def stage_generate(scale, seed):
+    use_lab('1_Regular Grammars')
+    import grammar
+    from benchmark import GENERATE_GRAMMARS
+    lab1, start = GENERATE_GRAMMARS['lab1']
+    dyck, _ = GENERATE_GRAMMARS['dyck']
+    count = 10000 * scale
+
+    def run():
+        samplers = [grammar.UniformSampler(lab1, start), grammar.UniformSampler(dyck, 'S')]
+        total = 0
+        for sampler in samplers:
+            for word in sampler.strings(60, count, seed):
+                total += 1
+        return total
+    return 'strings', run, [grammar]
+
+
+def stage_fa(scale, seed):
+    use_lab('1_Regular Grammars')
+    import finite_automaton
+    from benchmark import random_regular_grammar
+    dfa = finite_automaton.convert_grammar_to_fa(random_regular_grammar(2000, seed=seed)).compiled
+    rng = random.Random(seed)
+    symbols = dfa.symbols
+    strings = [''.join(rng.choices(symbols, k=rng.randint(1, 100))) for _ in range(20000 * scale)]
+
+    def run():
+        for string in strings:
+            dfa.accepts(string)
+        dfa.accepts_many(strings)
+        return 2 * sum(map(len, strings))
+    return 'symbols', run, [finite_automaton]
+
+
+def stage_nfa_to_dfa(scale, seed):
+    use_lab('2_Finite Automata')
+    import functions
+    from benchmark import random_nfa
+    nfas = [random_nfa(26, n_symbols=3, density=0.6, fanout=3, seed=seed + i) for i in range(4 * scale)]
+
+    def run():
+        states = 0
+        for Q, Sigma, F, delta in nfas:
+            dfa_Q, dfa_Sigma, dfa_F, dfa_delta = functions.ndfa_to_dfa(Q, Sigma, F, delta, Q[0])
+            min_Q = functions.minimize_dfa(dfa_Q, dfa_Sigma, dfa_F, dfa_delta)[0]
+            states += len(dfa_Q) + len(min_Q)
+        return states
+    return 'states', run, [functions]
+
+
+def stage_equivalence(scale, seed):
+    use_lab('2_Finite Automata')
+    import equivalence
+    import functions
+    from benchmark import random_nfa
+    pairs = []
+    for i in range(4 * scale):
+        nfa = random_nfa(26, n_symbols=3, density=0.6, fanout=3, seed=seed + i)
+        pairs.append((nfa, functions.minimize_dfa(*functions.ndfa_to_dfa(*nfa, nfa[0][0]))))
+
+    def run():
+        for nfa, minimal in pairs:
+            assert equivalence.are_equivalent(nfa, minimal)
+            assert equivalence.is_included(nfa, minimal)
+        return len(pairs)
+    return 'pairs', run, []
+
+
+def stage_scanner(scale, seed):
+    use_lab('3_Lexer Scanner')
+    import lexer
+    from benchmark import random_expression
+    text = random_expression(100000 * scale, seed=seed)
+
+    def run():
+        return len(lexer.Lexer(text).tokenize_all())
+    return 'tokens', run, [lexer]
+
+
+def stage_lexer(scale, seed):
+    use_lab('6_Parser AST Build')
+    import my_lexer
+    from benchmark import random_expression
+    text = random_expression(100000 * scale, seed=seed)
+    my_lexer.get_token_dfa()
+
+    def run():
+        return len(my_lexer.Lexer(text).tokenize_array())
+    return 'tokens', run, [my_lexer]
+
+
+def stage_parser(scale, seed):
+    use_lab('6_Parser AST Build')
+    import my_lexer
+    import my_parser
+    from benchmark import random_expression
+    text = random_expression(100000 * scale, seed=seed)
+    lexer = my_lexer.Lexer(text)
+    lexer.tokenize_array()
+
+    def run():
+        return len(my_parser.Parser(lexer).parse_arena())
+    return 'nodes', run, [my_parser]
+
+
+def stage_cnf(scale, seed):
+    use_lab('5_Chomsky Normal Form')
+    import converter
+    from benchmark import random_grammar
+    grammar = random_grammar(500 * scale, seed=seed)
+
+    def run():
+        cnf = converter.ChomskyNormalForm(*grammar)
+        cnf.convert_to_cnf()
+        return cnf.stage_sizes[-1][2]
+    return 'productions', run, [converter]
+
+
+def stage_earley(scale, seed):
+    use_lab('1_Regular Grammars')
+    import earley
+    from benchmark import GRAMMARS, STARTS, random_expr
+    rng = random.Random(seed)
+    word = random_expr(5000 * scale, rng)
+    parser = earley.EarleyParser(GRAMMARS['expr'], STARTS['expr'])
+
+    def run():
+        forest = parser.parse(word)
+        assert forest is not None
+        return len(word)
+    return 'symbols', run, [earley]
+
+
+STAGES = {
+    'generate': stage_generate,
+    'fa': stage_fa,
+    'nfa_to_dfa': stage_nfa_to_dfa,
+    'equivalence': stage_equivalence,
+    'scanner': stage_scanner,
+    'lexer': stage_lexer,
+    'parser': stage_parser,
+    'cnf': stage_cnf,
+    'earley': stage_earley,
+}